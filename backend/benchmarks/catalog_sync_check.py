@@ -0,0 +1,79 @@
+"""
+Cross-worker check for the custom exercise catalog
+
+Opens two SQLiteRepository instances on one database file, each with its own
+ExerciseCatalog (like two uvicorn workers), and interleaves exercise creation
+between them. After syncing, both catalogs must list every stored exercise in
+id order; an exercise created by one worker must never be skipped by the other
+because that worker created a higher id itself first.
+
+Usage (from the backend directory):
+    python benchmarks/catalog_sync_check.py
+"""
+import asyncio
+import os
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from services.exercise_catalog import ExerciseCatalog  # noqa: E402
+from services.storage import SQLiteRepository  # noqa: E402
+
+
+async def create(storage: SQLiteRepository, catalog: ExerciseCatalog, name: str) -> int:
+    """Create an exercise the way register_custom_exercise does"""
+    exercise = await storage.add_custom_exercise({"name": name, "description": "", "config": {}})
+    catalog.add(exercise)
+    return exercise["id"]
+
+
+async def check() -> list:
+    problems = []
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "catalog.db")
+        workers = [SQLiteRepository(path), SQLiteRepository(path)]
+        for storage in workers:
+            await storage.open()
+        try:
+            catalogs = [ExerciseCatalog([], storage) for storage in workers]
+            for catalog in catalogs:
+                await catalog.sync()
+
+            # Worker A creates an exercise, then worker B creates the next one
+            # before it has synced
+            created = [
+                await create(workers[0], catalogs[0], "Wall Push-Up"),
+                await create(workers[1], catalogs[1], "Heel Raise"),
+                await create(workers[0], catalogs[0], "Side Plank"),
+            ]
+
+            stored = [ex["id"] for ex in await workers[0].list_custom_exercises()]
+            if stored != created:
+                problems.append(f"stored ids {stored}, created {created}")
+            for name, catalog in zip("AB", catalogs):
+                await catalog.sync()
+                ids = [ex["id"] for ex in catalog.custom()]
+                if ids != stored:
+                    problems.append(f"worker {name} catalog has {ids}, storage has {stored}")
+                missing = [exercise_id for exercise_id in stored if exercise_id not in catalog]
+                if missing:
+                    problems.append(f"worker {name} does not recognise ids {missing}")
+        finally:
+            for storage in workers:
+                await storage.close()
+    return problems
+
+
+def main():
+    problems = asyncio.run(check())
+    for problem in problems:
+        print(f"❌ {problem}")
+    if problems:
+        sys.exit(1)
+    print("✅ Catalogs on both workers list every custom exercise")
+
+
+if __name__ == "__main__":
+    main()
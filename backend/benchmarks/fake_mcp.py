@@ -0,0 +1,96 @@
+"""
+Stand-in for the BrightData MCP server (`npx -y @brightdata/mcp`)
+
+A minimal stdio MCP server offering the search_engine and scrape_as_markdown
+tools. Each tool call is forwarded to benchmarks/fake_upstream.py
+(FAKE_UPSTREAM_URL), which applies the BrightData latency / error model,
+counts the call and returns recorded articles as JSON text.
+
+Started by the agent CLI, via:
+    BRIGHTDATA_MCP_COMMAND="python benchmarks/fake_mcp.py" FAKE_UPSTREAM_URL=http://127.0.0.1:8700
+"""
+import json
+import os
+import sys
+import urllib.error
+import urllib.request
+
+FAKE_UPSTREAM_URL = os.getenv("FAKE_UPSTREAM_URL", "http://127.0.0.1:8700").rstrip("/")
+DEFAULT_PROTOCOL_VERSION = "2024-11-05"
+
+TOOLS = [
+    {
+        "name": "search_engine",
+        "description": "Search the web and return the results",
+        "inputSchema": {
+            "type": "object",
+            "properties": {"query": {"type": "string"}},
+            "required": ["query"],
+        },
+    },
+    {
+        "name": "scrape_as_markdown",
+        "description": "Scrape a web page and return its content",
+        "inputSchema": {
+            "type": "object",
+            "properties": {"url": {"type": "string"}},
+            "required": ["url"],
+        },
+    },
+]
+
+
+def call_tool(name: str, arguments: dict) -> dict:
+    request = urllib.request.Request(
+        f"{FAKE_UPSTREAM_URL}/brightdata/{name}",
+        data=json.dumps({"arguments": arguments}).encode(),
+        headers={"Content-Type": "application/json"},
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=120) as response:
+            results = json.load(response)["results"]
+    except (urllib.error.URLError, OSError, ValueError, KeyError) as e:
+        return {"content": [{"type": "text", "text": f"Tool {name} failed: {e}"}], "isError": True}
+    return {"content": [{"type": "text", "text": json.dumps(results)}], "isError": False}
+
+
+def handle(message: dict):
+    """Result of a JSON-RPC request (None for notifications)"""
+    method = message.get("method")
+    params = message.get("params") or {}
+    if method == "initialize":
+        return {
+            "protocolVersion": params.get("protocolVersion", DEFAULT_PROTOCOL_VERSION),
+            "capabilities": {"tools": {}},
+            "serverInfo": {"name": "fake-bright-data", "version": "1.0.0"},
+        }
+    if method == "tools/list":
+        return {"tools": TOOLS}
+    if method == "tools/call":
+        if params.get("name") not in {tool["name"] for tool in TOOLS}:
+            raise LookupError(f"Unknown tool: {params.get('name')}")
+        return call_tool(params["name"], params.get("arguments") or {})
+    if method == "ping":
+        return {}
+    if "id" in message:
+        raise LookupError(f"Method not found: {method}")
+    return None
+
+
+def main():
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        message = json.loads(line)
+        if "id" not in message:
+            continue
+        try:
+            reply = {"jsonrpc": "2.0", "id": message["id"], "result": handle(message)}
+        except LookupError as e:
+            reply = {"jsonrpc": "2.0", "id": message["id"], "error": {"code": -32601, "message": str(e)}}
+        sys.stdout.write(json.dumps(reply) + "\n")
+        sys.stdout.flush()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,331 @@
+"""
+Stand-in for every upstream the PhysioLens API calls, for offline benchmarks
+
+Serves, from recorded responses (benchmarks/recordings.json by default):
+    POST /v1/messages                    Anthropic Messages API, JSON or SSE (stream=true)
+    GET  /entrez/eutils/esearch.fcgi     PubMed E-utilities search
+    GET  /entrez/eutils/esummary.fcgi    PubMed E-utilities summaries
+    POST /brightdata/{tool}              BrightData tools, called through benchmarks/fake_mcp.py
+
+Agent requests (those offering BrightData MCP tools) are answered like the
+real model would: a tool call per search / scrape in the prompt, then the
+articles from the tool results as a JSON array. Every upstream gets a
+lognormal latency (median and p99) and an error rate; errors are what the
+real service returns under load (529 overloaded, 503, failed tool call).
+Call counts are reported at GET /_stats and cleared by POST /_reset.
+
+Point the backend at it with:
+    ANTHROPIC_BASE_URL=http://127.0.0.1:8700
+    PUBMED_EUTILS_URL=http://127.0.0.1:8700/entrez/eutils
+    BRIGHTDATA_MCP_COMMAND="python benchmarks/fake_mcp.py"  FAKE_UPSTREAM_URL=http://127.0.0.1:8700
+
+Usage (from the backend directory):
+    python benchmarks/fake_upstream.py --port 8700 --latency anthropic=900:4000 --error-rate anthropic=0.02
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import os
+import random
+import re
+import uuid
+from collections import Counter
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+RECORDINGS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "recordings.json")
+UPSTREAMS = ("anthropic", "pubmed", "brightdata")
+
+# Defaults resembling the real services: (median ms, p99 ms) before the first byte
+DEFAULT_LATENCY = {"anthropic": (800.0, 3000.0), "pubmed": (250.0, 1200.0), "brightdata": (2500.0, 9000.0)}
+# Model output speed for streamed responses (~4 characters per token)
+DEFAULT_TOKENS_PER_SECOND = 80.0
+CHARS_PER_DELTA = 12
+
+# z-score of the 99th percentile of a standard normal
+Z_99 = 2.326
+
+
+class Latency:
+    """Lognormal delay given its median and 99th percentile in milliseconds"""
+
+    def __init__(self, median_ms: float, p99_ms: Optional[float] = None):
+        self.median_ms = median_ms
+        self.p99_ms = p99_ms if p99_ms is not None else median_ms
+        self.sigma = math.log(self.p99_ms / median_ms) / Z_99 if median_ms > 0 and self.p99_ms > median_ms else 0.0
+
+    def sample(self, rng: random.Random, scale: float) -> float:
+        """Seconds"""
+        return self.median_ms * math.exp(self.sigma * rng.gauss(0.0, 1.0)) / 1000.0 * scale
+
+    def __repr__(self):
+        return f"{self.median_ms:g}:{self.p99_ms:g}"
+
+
+class FakeUpstream:
+    """Recorded responses plus the latency / error model and call counters"""
+
+    def __init__(self, recordings: Dict, latency: Dict[str, Latency], error_rate: Dict[str, float],
+                 scale: float = 1.0, tokens_per_second: float = DEFAULT_TOKENS_PER_SECOND, seed: int = 0):
+        self.recordings = recordings
+        self.latency = latency
+        self.error_rate = error_rate
+        self.scale = scale
+        self.tokens_per_second = tokens_per_second
+        self.rng = random.Random(seed)
+        self.calls: Counter = Counter()
+        self.errors: Counter = Counter()
+        self.pubmed = {paper["uid"]: paper for paper in recordings.get("pubmed", [])}
+
+    async def delay(self, upstream: str):
+        await asyncio.sleep(self.latency[upstream].sample(self.rng, self.scale))
+
+    def fails(self, upstream: str, call: str) -> bool:
+        self.calls[call] += 1
+        if self.rng.random() < self.error_rate.get(upstream, 0.0):
+            self.errors[call] += 1
+            return True
+        return False
+
+    def delta_interval(self) -> float:
+        if self.tokens_per_second <= 0:
+            return 0.0
+        return CHARS_PER_DELTA / 4 / self.tokens_per_second * self.scale
+
+    # ---------- Anthropic ----------
+
+    def recorded_text(self, prompt: str) -> str:
+        for recording in self.recordings.get("anthropic", []):
+            if recording["match"] in prompt:
+                return recording["text"]
+        return "OK"
+
+    # ---------- PubMed ----------
+
+    def esearch(self, term: str, retmax: int) -> List[str]:
+        """A stable, term-dependent selection of recorded PMIDs"""
+        pmids = sorted(self.pubmed)
+        if not pmids:
+            return []
+        start = int(hashlib.sha256(term.encode()).hexdigest(), 16) % len(pmids)
+        return [pmids[(start + i) % len(pmids)] for i in range(min(retmax, len(pmids)))]
+
+    # ---------- BrightData ----------
+
+    def articles(self, text: str) -> List[Dict]:
+        """Recorded articles of the site a search query or scraped URL refers to"""
+        for site, articles in self.recordings.get("brightdata", {}).items():
+            if site in text:
+                return articles
+        return []
+
+
+def message_text(content) -> str:
+    if isinstance(content, str):
+        return content
+    return "\n".join(block.get("text", "") for block in content if block.get("type") == "text")
+
+
+def agent_turn(messages: List[Dict]) -> List[Dict]:
+    """
+    Next assistant content blocks of a BrightData agent run
+
+    The run's conversation starts with one of the service's prompts (pooled
+    clients clear their conversation between queries). Each search / URL in
+    it gets one tool call, in order; once all have results, the articles are
+    returned as a JSON array.
+    """
+    prompt = message_text(messages[0]["content"]) if messages else ""
+
+    calls = [("search_engine", {"query": query}) for query in re.findall(r'Search "([^"]+)"', prompt)]
+    calls += [("scrape_as_markdown", {"url": url}) for url in re.findall(r"^\d\. [^:\n]+: (https://\S+)", prompt, re.M)]
+
+    results = []
+    for message in messages[1:]:
+        if message.get("role") != "user" or isinstance(message["content"], str):
+            continue
+        for block in message["content"]:
+            if block.get("type") == "tool_result":
+                results.append(block)
+
+    if len(results) < len(calls):
+        tool, arguments = calls[len(results)]
+        return [{"type": "tool_use", "id": f"toolu_{uuid.uuid4().hex[:24]}",
+                 "name": f"mcp__bright_data__{tool}", "input": arguments}]
+
+    articles = []
+    for result in results:
+        if result.get("is_error"):
+            continue
+        content = result.get("content")
+        # The CLI may append its own text blocks (reminders) to a tool result
+        texts = [content] if isinstance(content, str) else [
+            block.get("text", "") for block in content or [] if block.get("type") == "text"
+        ]
+        for text in texts:
+            try:
+                articles.extend(json.loads(text))
+            except ValueError:
+                pass
+    return [{"type": "text", "text": "Here are the results I found:\n\n```json\n" + json.dumps(articles, indent=2) + "\n```"}]
+
+
+def sse(event: str, data: Dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def create_app(upstream: FakeUpstream) -> FastAPI:
+    app = FastAPI(title="PhysioLens fake upstream")
+
+    @app.post("/v1/messages")
+    async def messages(request: Request):
+        payload = await request.json()
+        agent = any(tool.get("name", "").startswith("mcp__bright_data__") for tool in payload.get("tools") or [])
+        stream = bool(payload.get("stream"))
+        call = "anthropic_agent" if agent else "anthropic_stream" if stream else "anthropic"
+
+        await upstream.delay("anthropic")
+        if upstream.fails("anthropic", call):
+            return JSONResponse(
+                {"type": "error", "error": {"type": "overloaded_error", "message": "Overloaded"}},
+                status_code=529,
+            )
+
+        history = payload.get("messages") or []
+        if agent:
+            blocks = agent_turn(history)
+        else:
+            prompt = message_text(history[-1]["content"]) if history else ""
+            blocks = [{"type": "text", "text": upstream.recorded_text(prompt)}]
+        stop_reason = "tool_use" if blocks[-1]["type"] == "tool_use" else "end_turn"
+        message_id = f"msg_{uuid.uuid4().hex[:24]}"
+        input_tokens = len(json.dumps(history)) // 4
+        output_tokens = sum(len(json.dumps(block)) for block in blocks) // 4
+
+        if not stream:
+            return {
+                "id": message_id, "type": "message", "role": "assistant", "model": payload.get("model"),
+                "content": blocks, "stop_reason": stop_reason, "stop_sequence": None,
+                "usage": {"input_tokens": input_tokens, "output_tokens": output_tokens},
+            }
+
+        async def events():
+            yield sse("message_start", {"type": "message_start", "message": {
+                "id": message_id, "type": "message", "role": "assistant", "model": payload.get("model"),
+                "content": [], "stop_reason": None, "stop_sequence": None,
+                "usage": {"input_tokens": input_tokens, "output_tokens": 1},
+            }})
+            for index, block in enumerate(blocks):
+                if block["type"] == "text":
+                    yield sse("content_block_start", {"type": "content_block_start", "index": index,
+                                                      "content_block": {"type": "text", "text": ""}})
+                    text = block["text"]
+                    for offset in range(0, len(text), CHARS_PER_DELTA):
+                        await asyncio.sleep(upstream.delta_interval())
+                        yield sse("content_block_delta", {"type": "content_block_delta", "index": index, "delta": {
+                            "type": "text_delta", "text": text[offset:offset + CHARS_PER_DELTA]}})
+                else:
+                    yield sse("content_block_start", {"type": "content_block_start", "index": index,
+                                                      "content_block": {**block, "input": {}}})
+                    yield sse("content_block_delta", {"type": "content_block_delta", "index": index, "delta": {
+                        "type": "input_json_delta", "partial_json": json.dumps(block["input"])}})
+                yield sse("content_block_stop", {"type": "content_block_stop", "index": index})
+            yield sse("message_delta", {"type": "message_delta",
+                                        "delta": {"stop_reason": stop_reason, "stop_sequence": None},
+                                        "usage": {"output_tokens": output_tokens}})
+            yield sse("message_stop", {"type": "message_stop"})
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    @app.get("/entrez/eutils/esearch.fcgi")
+    async def esearch(term: str = "", retmax: int = 20):
+        await upstream.delay("pubmed")
+        if upstream.fails("pubmed", "pubmed_esearch"):
+            return JSONResponse({"error": "Service unavailable"}, status_code=503)
+        idlist = upstream.esearch(term, retmax)
+        return {"esearchresult": {"count": str(len(idlist)), "retmax": str(retmax), "idlist": idlist}}
+
+    @app.get("/entrez/eutils/esummary.fcgi")
+    async def esummary(id: str = ""):
+        await upstream.delay("pubmed")
+        if upstream.fails("pubmed", "pubmed_esummary"):
+            return JSONResponse({"error": "Service unavailable"}, status_code=503)
+        uids = [pmid for pmid in id.split(",") if pmid in upstream.pubmed]
+        return {"result": {"uids": uids, **{pmid: upstream.pubmed[pmid] for pmid in uids}}}
+
+    @app.post("/brightdata/{tool}")
+    async def brightdata(tool: str, request: Request):
+        arguments = (await request.json()).get("arguments") or {}
+        await upstream.delay("brightdata")
+        if upstream.fails("brightdata", f"brightdata_{tool}"):
+            return JSONResponse({"error": "Request failed: upstream timeout"}, status_code=503)
+        target = arguments.get("query") or arguments.get("url") or ""
+        if tool == "scrape_as_markdown":
+            target = urlsplit(target).netloc.removeprefix("www.")
+        return {"results": upstream.articles(target)}
+
+    @app.get("/_stats")
+    def stats():
+        return {"calls": dict(upstream.calls), "errors": dict(upstream.errors)}
+
+    @app.post("/_reset")
+    def reset():
+        upstream.calls.clear()
+        upstream.errors.clear()
+        return {"message": "Counters cleared"}
+
+    return app
+
+
+def parse_latency(specs: List[str]) -> Dict[str, Latency]:
+    latency = {name: Latency(*values) for name, values in DEFAULT_LATENCY.items()}
+    for spec in specs:
+        name, _, values = spec.partition("=")
+        if name not in UPSTREAMS or not values:
+            raise argparse.ArgumentTypeError(f"--latency expects UPSTREAM=MEDIAN_MS[:P99_MS], got {spec!r}")
+        latency[name] = Latency(*(float(value) for value in values.split(":", 1)))
+    return latency
+
+
+def parse_error_rates(specs: List[str]) -> Dict[str, float]:
+    rates = {}
+    for spec in specs:
+        name, _, value = spec.partition("=")
+        if name not in UPSTREAMS or not value:
+            raise argparse.ArgumentTypeError(f"--error-rate expects UPSTREAM=RATE, got {spec!r}")
+        rates[name] = float(value)
+    return rates
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake Anthropic / PubMed / BrightData upstream for benchmarks")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8700)
+    parser.add_argument("--recordings", default=RECORDINGS_PATH, help="JSON file of recorded responses")
+    parser.add_argument("--latency", action="append", default=[], metavar="UPSTREAM=MEDIAN_MS[:P99_MS]",
+                        help=f"Latency of anthropic, pubmed or brightdata (defaults: "
+                             f"{', '.join(f'{k}={v[0]:g}:{v[1]:g}' for k, v in DEFAULT_LATENCY.items())})")
+    parser.add_argument("--error-rate", action="append", default=[], metavar="UPSTREAM=RATE",
+                        help="Fraction of calls to an upstream that fail")
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiply every delay (0 for no latency)")
+    parser.add_argument("--tokens-per-second", type=float, default=DEFAULT_TOKENS_PER_SECOND,
+                        help="Output speed of streamed Anthropic responses (0 for instant)")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the latency / error draws")
+    args = parser.parse_args()
+
+    with open(args.recordings) as f:
+        recordings = json.load(f)
+    upstream = FakeUpstream(
+        recordings, parse_latency(args.latency), parse_error_rates(args.error_rate),
+        args.scale, args.tokens_per_second, args.seed,
+    )
+    uvicorn.run(create_app(upstream), host=args.host, port=args.port, log_level="warning", access_log=False)
+
+
+if __name__ == "__main__":
+    main()
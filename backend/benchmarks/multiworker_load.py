@@ -0,0 +1,203 @@
+"""
+Multi-worker load test for the PhysioLens API
+
+Starts `uvicorn main:app --workers N` against a fresh SQLite database for each
+worker count, drives a mixed read/write workload from several client processes
+and reports throughput plus speedup over a single-worker run, which always
+runs first as the baseline. After every run it checks that state stayed
+consistent across workers (no duplicate or missing session/meeting ids,
+assignments not lost).
+
+Usage (from the backend directory):
+    python benchmarks/multiworker_load.py --workers 1 2 4 --duration 10
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import random
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# (weight, method, path) - mostly polling reads with some writes, like the UI
+WORKLOAD = [
+    (30, "GET", "/exercises"),
+    (30, "GET", "/assigned-exercises"),
+    (15, "GET", "/api/meetings/upcoming"),
+    (10, "POST", "/save-recording-session"),
+    (10, "POST", "/assign-exercises"),
+    (5, "POST", "/api/meetings/create"),
+]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(workers: int, port: int, db_path: str) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "STORAGE_BACKEND": "sqlite",
+        "PHYSIOLENS_DB": db_path,
+        "PUBMED_CACHE_DB": "",
+        "WEB_CONCURRENCY": str(workers),
+        "ANTHROPIC_API_KEY": os.getenv("ANTHROPIC_API_KEY", "load-test"),
+        "BRIGHTDATA_API_TOKEN": os.getenv("BRIGHTDATA_API_TOKEN", "load-test"),
+    }
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning", "--no-access-log"],
+        cwd=BACKEND_DIR,
+        env=env,
+        start_new_session=True,
+    )
+
+
+def wait_until_ready(base_url: str, timeout: float = 30.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if httpx.get(base_url + "/", timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError("Server did not start in time")
+
+
+def request_body(method: str, path: str, rng: random.Random):
+    if path == "/save-recording-session":
+        return {
+            "exercise_id": 3,
+            "exercise_name": "Bicep Curls",
+            "completed_at": datetime.now().isoformat(),
+            "duration": rng.randint(30, 600),
+            "rep_count": rng.randint(0, 15),
+            "target_reps": 12,
+            "warnings": [],
+        }
+    if path == "/assign-exercises":
+        return {"assignments": [{"exercise_id": rng.choice([3, 4, 5, 6, 8]), "target_reps": rng.randint(5, 20)}]}
+    if path == "/api/meetings/create":
+        return {"title": "Follow-up", "scheduled_date": datetime.now().isoformat()}
+    return None
+
+
+async def client_loop(base_url: str, duration: float, concurrency: int, seed: int):
+    rng = random.Random(seed)
+    choices = [entry for entry in WORKLOAD for _ in range(entry[0])]
+    counts = {"requests": 0, "errors": 0, "sessions": 0, "meetings": 0}
+    deadline = time.perf_counter() + duration
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=30.0) as client:
+        async def worker():
+            while time.perf_counter() < deadline:
+                _, method, path = rng.choice(choices)
+                try:
+                    response = await client.request(method, path, json=request_body(method, path, rng))
+                    counts["requests"] += 1
+                    if response.status_code != 200:
+                        counts["errors"] += 1
+                    elif path == "/save-recording-session":
+                        counts["sessions"] += 1
+                    elif path == "/api/meetings/create":
+                        counts["meetings"] += 1
+                except httpx.HTTPError:
+                    counts["errors"] += 1
+
+        await asyncio.gather(*[worker() for _ in range(concurrency)])
+    return counts
+
+
+def client_process(args):
+    base_url, duration, concurrency, seed = args
+    return asyncio.run(client_loop(base_url, duration, concurrency, seed))
+
+
+def check_consistency(base_url: str, totals: dict) -> list:
+    problems = []
+    sessions = httpx.get(base_url + "/recorded-sessions", timeout=30.0).json()["sessions"]
+    session_ids = [s["id"] for s in sessions]
+    if len(set(session_ids)) != len(session_ids):
+        problems.append("duplicate session ids")
+    if len(sessions) != totals["sessions"]:
+        problems.append(f"{totals['sessions']} sessions saved but {len(sessions)} stored")
+
+    meetings = httpx.get(base_url + "/api/meetings/upcoming", timeout=30.0).json()["meetings"]
+    meeting_ids = [m["id"] for m in meetings]
+    if len(set(meeting_ids)) != len(meeting_ids):
+        problems.append("duplicate meeting ids")
+    if len(meetings) != totals["meetings"]:
+        problems.append(f"{totals['meetings']} meetings created but {len(meetings)} stored")
+
+    assigned = httpx.get(base_url + "/assigned-exercises", timeout=30.0).json()["exercises"]
+    assigned_ids = [ex["id"] for ex in assigned]
+    if len(set(assigned_ids)) != len(assigned_ids):
+        problems.append("exercise assigned twice")
+    return problems
+
+
+def run_once(workers: int, duration: float, clients: int, concurrency: int) -> dict:
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    with tempfile.TemporaryDirectory() as tmp:
+        server = start_server(workers, port, os.path.join(tmp, "load.db"))
+        try:
+            wait_until_ready(base_url)
+            started = time.perf_counter()
+            with multiprocessing.Pool(clients) as pool:
+                results = pool.map(client_process, [
+                    (base_url, duration, concurrency, seed) for seed in range(clients)
+                ])
+            elapsed = time.perf_counter() - started
+
+            totals = {key: sum(r[key] for r in results) for key in results[0]}
+            return {
+                "workers": workers,
+                "requests": totals["requests"],
+                "errors": totals["errors"],
+                "throughput": totals["requests"] / elapsed,
+                "problems": check_consistency(base_url, totals),
+            }
+        finally:
+            os.killpg(server.pid, signal.SIGTERM)
+            server.wait(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Multi-worker throughput and consistency test")
+    parser.add_argument("--workers", type=int, nargs="+",
+                        default=sorted({1, 2, 4, os.cpu_count() or 1}),
+                        help="Worker counts to run (a 1-worker baseline is always run first)")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per run")
+    parser.add_argument("--clients", type=int, default=max(2, (os.cpu_count() or 2) // 2),
+                        help="Client processes generating load")
+    parser.add_argument("--concurrency", type=int, default=32, help="In-flight requests per client process")
+    args = parser.parse_args()
+
+    # Speedups are measured against a real single-worker run, which always goes first
+    worker_counts = [1] + sorted(set(args.workers) - {1})
+
+    print(f"{'workers':>8} {'requests':>10} {'errors':>7} {'req/s':>10} {'speedup':>8} {'efficiency':>10}  consistency")
+    baseline = None
+    for workers in worker_counts:
+        result = run_once(workers, args.duration, args.clients, args.concurrency)
+        if baseline is None:
+            baseline = result["throughput"]
+        speedup = result["throughput"] / baseline
+        print(f"{workers:>8} {result['requests']:>10} {result['errors']:>7} {result['throughput']:>10.1f} "
+              f"{speedup:>8.2f} {speedup / workers:>10.0%}  {'; '.join(result['problems']) or 'ok'}")
+
+
+if __name__ == "__main__":
+    main()
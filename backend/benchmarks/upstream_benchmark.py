@@ -0,0 +1,544 @@
+"""
+Endpoint latency benchmark for the PhysioLens API against fake upstreams
+
+Starts benchmarks/fake_upstream.py (Anthropic, PubMed and BrightData stand-ins
+with configurable latency and error rates) and `uvicorn main:app` pointed at
+it, with a fresh SQLite database, caches and pose archive. After the agent
+pool and the startup journal scrape have settled, every endpoint of main.py is
+driven in turn with --requests requests at --concurrency, and for each one the
+p50/p95/p99 latency, throughput, errors and the upstream calls it caused are
+reported. For server-sent-event endpoints the latency to the first event is
+reported too.
+
+Request bodies cycle through --variants distinct inputs per endpoint, so
+response caches see both misses and hits, and all randomness is seeded: two
+runs with the same arguments issue the same requests against the same
+upstream behaviour. Save a run with --output and compare a later one against
+it with --compare.
+
+Usage (from the backend directory):
+    python benchmarks/upstream_benchmark.py --concurrency 8 --requests 40 --output before.json
+    python benchmarks/upstream_benchmark.py --endpoints claude-analysis claude-analysis-stream --compare before.json
+    python benchmarks/upstream_benchmark.py --latency anthropic=300:1200 --error-rate anthropic=0.05 --scale 0.5
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+import httpx
+import numpy as np
+import websockets
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BENCHMARKS_DIR)
+sys.path.insert(0, BACKEND_DIR)
+
+from services.pose_frames import encode_pose_frames  # noqa: E402
+
+# Exercise with an angle-based rep counter, used for pose uploads and streams
+POSE_EXERCISE = (3, "Bicep Curls")
+# Built-in exercises (main.py EXERCISES)
+EXERCISE_IDS = [3, 4, 5, 6, 8]
+POSE_FPS = 30.0
+POSE_SECONDS = 20
+EXERCISE_NAMES = ["Bicep Curls", "Squats", "Shoulder Press", "Lunges", "Wall Push-ups", "Leg Raises",
+                  "Hamstring Curls", "Calf Raises", "Lateral Raises", "Glute Bridges"]
+RESEARCH_QUERIES = ["muscle physiology", "exercise biomechanics", "tendon loading", "motor control",
+                    "eccentric training", "rotator cuff rehabilitation", "knee osteoarthritis exercise",
+                    "balance training", "grip strength", "low back pain exercise"]
+
+# (ok, seconds to the first server-sent event or None)
+Outcome = Tuple[bool, Optional[float]]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_ready(url: str, timeout: float = 60.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if httpx.get(url, timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up in time")
+
+
+def start_fake_upstream(port: int, args) -> subprocess.Popen:
+    command = [sys.executable, os.path.join(BENCHMARKS_DIR, "fake_upstream.py"), "--port", str(port),
+               "--scale", str(args.scale), "--tokens-per-second", str(args.tokens_per_second),
+               "--seed", str(args.seed), "--recordings", args.recordings]
+    for spec in args.latency:
+        command += ["--latency", spec]
+    for spec in args.error_rate:
+        command += ["--error-rate", spec]
+    return subprocess.Popen(command, cwd=BACKEND_DIR, start_new_session=True)
+
+
+def start_server(port: int, upstream_url: str, tmp: str, args) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "STORAGE_BACKEND": "sqlite",
+        "PHYSIOLENS_DB": os.path.join(tmp, "benchmark.db"),
+        "PUBMED_CACHE_DB": os.path.join(tmp, "pubmed.db"),
+        "RESOURCE_CACHE_DB": os.path.join(tmp, "resources.db"),
+        "POSE_ARCHIVE_DIR": os.path.join(tmp, "pose_archive"),
+        "WEB_CONCURRENCY": str(args.workers),
+        "ANTHROPIC_API_KEY": "benchmark",
+        "BRIGHTDATA_API_TOKEN": "benchmark",
+        "ANTHROPIC_BASE_URL": upstream_url,
+        "PUBMED_EUTILS_URL": f"{upstream_url}/entrez/eutils",
+        "BRIGHTDATA_MCP_COMMAND": f"{sys.executable} {os.path.join(BENCHMARKS_DIR, 'fake_mcp.py')}",
+        "FAKE_UPSTREAM_URL": upstream_url,
+        "CLAUDE_CODE_DISABLE_NONESSENTIAL_TRAFFIC": "1",
+    }
+    for spec in args.env:
+        name, _, value = spec.partition("=")
+        env[name] = value
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(args.workers), "--log-level", "warning", "--no-access-log"],
+        cwd=BACKEND_DIR,
+        env=env,
+        start_new_session=True,
+    )
+
+
+def stop(process: subprocess.Popen):
+    try:
+        os.killpg(process.pid, signal.SIGTERM)
+        process.wait(timeout=30)
+    except (ProcessLookupError, subprocess.TimeoutExpired):
+        os.killpg(process.pid, signal.SIGKILL)
+
+
+async def wait_for_warmup(client: httpx.AsyncClient, timeout: float):
+    """Wait until the agent pool is connected and the startup journal scrape is done"""
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        pool = (await client.get("/api/metrics/brightdata-pool")).json()
+        cache = (await client.get("/api/metrics/resource-cache")).json()
+        if pool["idle"] + pool["in_use"] >= pool["size"] and not cache["inflight"]:
+            return
+        await asyncio.sleep(0.5)
+    print(f"warning: backend still warming up after {timeout:g}s; upstream counts may include startup work")
+
+
+def curl_landmarks(seconds: float, fps: float, rng: random.Random) -> np.ndarray:
+    """Both arms curling at ~0.4 Hz (elbow angle 160 to 40 degrees), all 33 landmarks visible"""
+    frames = int(seconds * fps)
+    landmarks = np.zeros((frames, 33, 4), dtype=np.float32)
+    landmarks[:, :, 0] = 0.5
+    landmarks[:, :, 1] = np.linspace(0.1, 0.95, 33)
+    landmarks[:, :, 3] = 1.0
+    t = np.arange(frames) / fps
+    angle = np.radians(100 + 60 * np.cos(2 * np.pi * 0.4 * t + rng.random()))
+    for side, (shoulder, elbow, wrist) in ((-1, (11, 13, 15)), (1, (12, 14, 16))):
+        landmarks[:, shoulder, :2] = (0.5 + 0.1 * side, 0.3)
+        landmarks[:, elbow, :2] = (0.5 + 0.1 * side, 0.5)
+        landmarks[:, wrist, 0] = 0.5 + 0.1 * side + 0.2 * side * np.sin(angle)
+        landmarks[:, wrist, 1] = 0.5 - 0.2 * np.cos(angle)
+    landmarks[:, :, :2] += np.random.default_rng(rng.randrange(2 ** 32)).normal(0, 0.002, (frames, 33, 2))
+    return landmarks
+
+
+def analysis_results(rng: random.Random) -> dict:
+    issues = [{"timestamp": rng.uniform(0, 60), "message": rng.choice(["Keep elbows close to your body",
+                                                                     "Avoid swinging", "Slow down the lowering phase"]),
+               "severity": rng.choice(["low", "medium", "high"]), "type": "form"} for _ in range(rng.randint(0, 8))]
+    by_severity = Counter(issue["severity"] for issue in issues)
+    return {
+        "totalIssues": len(issues),
+        "summary": {"bySeverity": {level: by_severity[level] for level in ("low", "medium", "high")},
+                    "byType": {"form": len(issues)}},
+        "issues": issues,
+    }
+
+
+class Context:
+    """Ids created during setup plus per-endpoint request variants"""
+
+    def __init__(self, variants: int, seed: int):
+        self.variants = variants
+        self.rng = random.Random(seed)
+        self.session_id: Optional[int] = None
+        self.job_id: Optional[str] = None
+        self.custom_exercise_id: Optional[int] = None
+        self.meeting_ids: List[int] = []
+        self.complete_ids: List[int] = []
+        self.pose_upload = b""
+        self.pose_batches: List[bytes] = []
+        self._counters: Counter = Counter()
+        self._offsets: Dict[str, int] = {}
+
+    def variant(self, endpoint: str) -> int:
+        """
+        Cycles through `variants` indexes of an endpoint
+
+        Each endpoint gets its own range, so e.g. a /stream variant does not
+        replay the bodies (and hit the response cache) of its plain sibling.
+        """
+        offset = self._offsets.setdefault(endpoint, len(self._offsets) * self.variants)
+        index = self._counters[endpoint] % self.variants
+        self._counters[endpoint] += 1
+        return offset + index
+
+    def session(self, index: int) -> dict:
+        exercise_id, name = POSE_EXERCISE if index == 0 else (
+            EXERCISE_IDS[index % len(EXERCISE_IDS)], EXERCISE_NAMES[index % len(EXERCISE_NAMES)])
+        return {
+            "exercise_id": exercise_id,
+            "exercise_name": name,
+            "completed_at": (datetime.now() - timedelta(days=index)).isoformat(),
+            "duration": 60 + 15 * index,
+            "rep_count": 8 + index % 5,
+            "target_reps": 12,
+            "warnings": [{"timestamp": 4.0 + i, "message": "Keep elbows close to your body",
+                          "severity": ["low", "medium", "high"][i % 3]} for i in range(index % 4)],
+        }
+
+    def transcript(self, index: int) -> str:
+        return (f"Session {index}: patient says the {EXERCISE_NAMES[index % len(EXERCISE_NAMES)].lower()} felt easier this week, "
+                f"with some tightness on rep {8 + index}. Therapist suggests progressing the band and asks to "
+                f"see them again next Tuesday at {9 + index % 5} o'clock.")
+
+
+# ---------- request helpers ----------
+
+async def json_request(client: httpx.AsyncClient, method: str, path: str, body=None,
+                       expect_key: Optional[str] = None, **kwargs) -> Outcome:
+    response = await client.request(method, path, json=body, **kwargs)
+    if response.status_code >= 400:
+        return False, None
+    if expect_key:
+        # These endpoints answer 200 with an "error" field (or a fallback) when an upstream failed
+        data = response.json()
+        return expect_key in data and "error" not in data, None
+    return True, None
+
+
+async def sse_request(client: httpx.AsyncClient, path: str, body) -> Outcome:
+    started = time.perf_counter()
+    first_event = None
+    event = None
+    async with client.stream("POST", path, json=body) as response:
+        if response.status_code >= 400:
+            return False, None
+        async for line in response.aiter_lines():
+            if line.startswith("event:"):
+                event = line[6:].strip()
+                if first_event is None:
+                    first_event = time.perf_counter() - started
+    return event == "done", first_event
+
+
+async def pose_stream(base_url: str, ctx: Context) -> Outcome:
+    url = base_url.replace("http://", "ws://") + f"/ws/pose-stream?exercise_id={POSE_EXERCISE[0]}&fps={POSE_FPS:g}"
+    async with websockets.connect(url, max_size=None) as ws:
+        if json.loads(await ws.recv()).get("type") != "ready":
+            return False, None
+        for batch in ctx.pose_batches:
+            await ws.send(batch)
+            if json.loads(await ws.recv()).get("type") != "ack":
+                return False, None
+        await ws.send(json.dumps({"type": "end"}))
+        return json.loads(await ws.recv()).get("type") == "finalized", None
+
+
+# ---------- endpoints ----------
+
+Call = Callable[[httpx.AsyncClient, Context], Awaitable[Outcome]]
+
+
+def endpoints(base_url: str) -> Dict[str, Call]:
+    """Benchmark name -> one request of that endpoint (in main.py order)"""
+    metrics = ["http-pool", "llm-gateway", "llm-cache", "pubmed-cache", "response-cache", "pose-streams",
+               "analysis-jobs", "brightdata-pool", "resource-cache"]
+
+    def exercise_request(ctx: Context, name: str) -> dict:
+        index = ctx.variant(name)
+        return {"name": f"{EXERCISE_NAMES[index % len(EXERCISE_NAMES)]} variation {index}",
+                "description": f"Resistance band exercise, variation {index}, performed standing"}
+
+    def analysis_request(ctx: Context, name: str) -> dict:
+        index = ctx.variant(name)
+        rng = random.Random(index)
+        return {"session_data": ctx.session(index), "analysis_results": analysis_results(rng)}
+
+    def summary_request(ctx: Context, name: str) -> dict:
+        index = ctx.variant(name)
+        return {"transcript": ctx.transcript(index), "duration": 300 + index, "detectedMeetings": [],
+                "detectedEmergencies": [], "sessionContext": ctx.session(index)}
+
+    def research_request(ctx: Context, name: str) -> dict:
+        index = ctx.variant(name)
+        query = RESEARCH_QUERIES[index % len(RESEARCH_QUERIES)]
+        return {"query": f"{query} {index // len(RESEARCH_QUERIES)}" if index >= len(RESEARCH_QUERIES) else query}
+
+    return {
+        "root": lambda c, ctx: json_request(c, "GET", "/"),
+        "metrics": lambda c, ctx: json_request(c, "GET", f"/api/metrics/{metrics[ctx.variant('metrics') % len(metrics)]}"),
+        "exercises": lambda c, ctx: json_request(c, "GET", "/exercises"),
+        "assign-exercises": lambda c, ctx: json_request(c, "POST", "/assign-exercises", {"assignments": [
+            {"exercise_id": EXERCISE_IDS[ctx.variant("assign-exercises") % len(EXERCISE_IDS)], "target_reps": 10}]}),
+        "assigned-exercises": lambda c, ctx: json_request(c, "GET", "/assigned-exercises"),
+        "complete-exercise": lambda c, ctx: json_request(
+            c, "POST", f"/complete-exercise/{ctx.complete_ids[ctx.variant('complete-exercise') % len(ctx.complete_ids)]}"),
+        "save-recording-session": lambda c, ctx: json_request(
+            c, "POST", "/save-recording-session", ctx.session(ctx.variant("save-recording-session"))),
+        "upload-pose-frames": lambda c, ctx: json_request(
+            c, "POST", f"/recorded-sessions/{ctx.session_id}/pose-frames", content=ctx.pose_upload,
+            headers={"Content-Type": "application/octet-stream"}),
+        "pose-stream": lambda c, ctx: pose_stream(base_url, ctx),
+        "analysis-job": lambda c, ctx: json_request(c, "GET", f"/analysis-jobs/{ctx.job_id}"),
+        "session-analysis": lambda c, ctx: json_request(c, "GET", f"/recorded-sessions/{ctx.session_id}/analysis"),
+        "session-pose-frames": lambda c, ctx: json_request(c, "GET", f"/recorded-sessions/{ctx.session_id}/pose-frames"),
+        "progress": lambda c, ctx: json_request(c, "GET", "/analytics/progress", params={
+            "granularity": ("week", "day")[ctx.variant("progress") % 2]}),
+        "exercise-progress": lambda c, ctx: json_request(c, "GET", f"/analytics/progress/{POSE_EXERCISE[0]}"),
+        "archive-sessions": lambda c, ctx: json_request(c, "GET", f"/archive/exercises/{POSE_EXERCISE[0]}/sessions"),
+        "archive-pose-frames": lambda c, ctx: json_request(
+            c, "GET", f"/archive/exercises/{POSE_EXERCISE[0]}/sessions/{ctx.session_id}/pose-frames",
+            params={"start": 2.0, "end": 8.0}),
+        "recorded-sessions": lambda c, ctx: json_request(c, "GET", "/recorded-sessions"),
+        "recorded-session": lambda c, ctx: json_request(c, "GET", f"/recorded-sessions/{ctx.session_id}"),
+        "claude-analysis": lambda c, ctx: json_request(
+            c, "POST", "/api/claude-analysis", analysis_request(ctx, "claude-analysis")),
+        "claude-analysis-stream": lambda c, ctx: sse_request(
+            c, "/api/claude-analysis/stream", analysis_request(ctx, "claude-analysis-stream")),
+        "create-exercise": lambda c, ctx: json_request(
+            c, "POST", "/api/create-exercise", exercise_request(ctx, "create-exercise")),
+        "create-exercise-stream": lambda c, ctx: sse_request(
+            c, "/api/create-exercise/stream", exercise_request(ctx, "create-exercise-stream")),
+        "custom-exercises": lambda c, ctx: json_request(c, "GET", "/custom-exercises"),
+        "exercise-config": lambda c, ctx: json_request(c, "GET", f"/exercise-config/{ctx.custom_exercise_id}"),
+        "research-resources": lambda c, ctx: json_request(
+            c, "POST", "/api/research/resources", research_request(ctx, "research-resources"), expect_key="resources"),
+        "research-resources-stream": lambda c, ctx: sse_request(
+            c, "/api/research/resources/stream", research_request(ctx, "research-resources-stream")),
+        "research-journals": lambda c, ctx: json_request(c, "GET", "/api/research/journals", expect_key="articles"),
+        "analyze-transcript": lambda c, ctx: json_request(c, "POST", "/api/meeting-mode/analyze-transcript", {
+            "transcript": ctx.transcript(ctx.variant("analyze-transcript")), "phase": "active"}),
+        "create-meeting": lambda c, ctx: json_request(c, "POST", "/api/meetings/create", {
+            "title": "Follow-up", "scheduled_date": datetime.now().isoformat(), "patient_name": "Benchmark"}),
+        "upcoming-meetings": lambda c, ctx: json_request(c, "GET", "/api/meetings/upcoming"),
+        "delete-meeting": lambda c, ctx: json_request(c, "DELETE", f"/api/meetings/{ctx.meeting_ids.pop()}"),
+        "analyze-chunk": lambda c, ctx: json_request(c, "POST", "/api/meeting-mode/analyze-chunk", {
+            "text": ctx.transcript(ctx.variant("analyze-chunk"))[:120]}),
+        "generate-summary": lambda c, ctx: json_request(
+            c, "POST", "/api/meeting-mode/generate-summary", summary_request(ctx, "generate-summary"),
+            expect_key="chief_complaint"),
+        "generate-summary-stream": lambda c, ctx: sse_request(
+            c, "/api/meeting-mode/generate-summary/stream", summary_request(ctx, "generate-summary-stream")),
+    }
+
+
+# Endpoints that run BrightData agent queries (skipped by --skip-agent)
+AGENT_ENDPOINTS = {"research-resources", "research-resources-stream", "research-journals"}
+
+
+async def setup(client: httpx.AsyncClient, ctx: Context, requests: int):
+    """Seed a session with analyzed pose frames, a custom exercise, assignments and meetings"""
+    rng = ctx.rng
+    landmarks = curl_landmarks(POSE_SECONDS, POSE_FPS, rng)
+    timestamps = np.arange(len(landmarks)) / POSE_FPS
+    ctx.pose_upload = encode_pose_frames(landmarks, POSE_FPS, POSE_EXERCISE[0], timestamps)
+    batch = int(POSE_FPS)
+    ctx.pose_batches = [
+        encode_pose_frames(landmarks[i:i + batch], POSE_FPS, POSE_EXERCISE[0], timestamps[i:i + batch])
+        for i in range(0, len(landmarks), batch)
+    ]
+
+    for index in range(max(ctx.variants, 2)):
+        response = await client.post("/save-recording-session", json=ctx.session(index))
+        response.raise_for_status()
+        if index == 0:
+            ctx.session_id = response.json()["session_id"]
+    response = await client.post(f"/recorded-sessions/{ctx.session_id}/pose-frames", content=ctx.pose_upload,
+                                 headers={"Content-Type": "application/octet-stream"})
+    response.raise_for_status()
+    ctx.job_id = response.json()["analysis_job_id"]
+
+    response = await client.post("/api/create-exercise", json={
+        "name": "Benchmark Band Curl", "description": "Standing resistance band curl"})
+    response.raise_for_status()
+    ctx.custom_exercise_id = response.json()["exercise"]["id"]
+
+    response = await client.post("/assign-exercises", json={"assignments": [
+        {"exercise_id": exercise_id, "target_reps": 10} for exercise_id in EXERCISE_IDS[:3]]})
+    response.raise_for_status()
+    ctx.complete_ids = [exercise["id"] for exercise in response.json()["exercises"]]
+
+    for _ in range(requests):
+        response = await client.post("/api/meetings/create", json={"title": "To delete"})
+        response.raise_for_status()
+        ctx.meeting_ids.append(response.json()["meeting"]["id"])
+
+    # Let the background archive / analysis writes of the seed data land
+    await asyncio.sleep(1.0)
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Nearest-rank percentile"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q / 100 * len(ordered)) - 1)]
+
+
+async def run_endpoint(client: httpx.AsyncClient, upstream: httpx.AsyncClient, call: Call, ctx: Context,
+                       requests: int, concurrency: int) -> dict:
+    latencies: List[float] = []
+    first_events: List[float] = []
+    errors = 0
+    remaining = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for _ in remaining:
+            started = time.perf_counter()
+            try:
+                ok, first_event = await call(client, ctx)
+            except (httpx.HTTPError, OSError, websockets.WebSocketException, ValueError, IndexError):
+                ok, first_event = False, None
+            latencies.append(time.perf_counter() - started)
+            if first_event is not None:
+                first_events.append(first_event)
+            if not ok:
+                errors += 1
+
+    before = (await upstream.get("/_stats")).json()["calls"]
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    after = (await upstream.get("/_stats")).json()["calls"]
+
+    return {
+        "requests": requests,
+        "errors": errors,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "first_event_p50_ms": percentile(first_events, 50) * 1000 if first_events else None,
+        "throughput": requests / elapsed if elapsed else 0.0,
+        "upstream_calls": {name: after[name] - before.get(name, 0) for name in sorted(after)
+                           if after[name] - before.get(name, 0)},
+    }
+
+
+async def run_benchmark(base_url: str, upstream_url: str, names: List[str], args) -> Dict[str, dict]:
+    ctx = Context(args.variants, args.seed)
+    calls = endpoints(base_url)
+    limits = httpx.Limits(max_connections=args.concurrency * 2, max_keepalive_connections=args.concurrency * 2)
+    async with httpx.AsyncClient(base_url=base_url, timeout=args.timeout, limits=limits) as client, \
+            httpx.AsyncClient(base_url=upstream_url, timeout=10.0) as upstream:
+        await wait_for_warmup(client, args.warmup_timeout)
+        await setup(client, ctx, args.requests)
+
+        results = {}
+        for name in names:
+            results[name] = await run_endpoint(client, upstream, calls[name], ctx, args.requests, args.concurrency)
+            print_row(name, results[name], args.baseline.get(name))
+        return results
+
+
+def print_header():
+    print(f"{'endpoint':<26} {'n':>5} {'err':>4} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} "
+          f"{'first ms':>9} {'req/s':>8}  upstream calls")
+
+
+def print_row(name: str, result: dict, baseline: Optional[dict]):
+    first = f"{result['first_event_p50_ms']:.1f}" if result["first_event_p50_ms"] is not None else "-"
+    change = ""
+    if baseline:
+        def delta(key):
+            return f"{(result[key] / baseline[key] - 1) * 100:+.0f}%" if baseline.get(key) else "n/a"
+        change = f"  [p50 {delta('p50_ms')}, p95 {delta('p95_ms')}, req/s {delta('throughput')}]"
+    calls = " ".join(f"{key}={value}" for key, value in result["upstream_calls"].items()) or "-"
+    print(f"{name:<26} {result['requests']:>5} {result['errors']:>4} {result['p50_ms']:>9.1f} "
+          f"{result['p95_ms']:>9.1f} {result['p99_ms']:>9.1f} {first:>9} "
+          f"{result['throughput']:>8.1f}  {calls}{change}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-endpoint latency benchmark against fake upstreams")
+    parser.add_argument("--endpoints", nargs="+", help="Endpoints to run (default: all, in main.py order)")
+    parser.add_argument("--list", action="store_true", help="List endpoint names and exit")
+    parser.add_argument("--skip-agent", action="store_true", help="Skip the BrightData agent endpoints")
+    parser.add_argument("--requests", type=int, default=40, help="Requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=8, help="In-flight requests")
+    parser.add_argument("--variants", type=int, default=5, help="Distinct request bodies per endpoint")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers")
+    parser.add_argument("--timeout", type=float, default=300.0, help="Seconds before a request counts as failed")
+    parser.add_argument("--warmup-timeout", type=float, default=120.0,
+                        help="Seconds to wait for the agent pool and startup scrape")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--env", action="append", default=[], metavar="NAME=VALUE",
+                        help="Extra backend environment (e.g. LLM_REQUESTS_PER_MINUTE=600)")
+    parser.add_argument("--output", help="Write the results as JSON")
+    parser.add_argument("--compare", help="JSON results of an earlier run to show changes against")
+    upstream = parser.add_argument_group("fake upstream (see fake_upstream.py)")
+    upstream.add_argument("--latency", action="append", default=[], metavar="UPSTREAM=MEDIAN_MS[:P99_MS]")
+    upstream.add_argument("--error-rate", action="append", default=[], metavar="UPSTREAM=RATE")
+    upstream.add_argument("--scale", type=float, default=1.0, help="Multiply every upstream delay")
+    upstream.add_argument("--tokens-per-second", type=float, default=80.0)
+    upstream.add_argument("--recordings", default=os.path.join(BENCHMARKS_DIR, "recordings.json"))
+    args = parser.parse_args()
+
+    available = list(endpoints("").keys())
+    if args.list:
+        print("\n".join(available))
+        return
+    names = args.endpoints or available
+    unknown = [name for name in names if name not in available]
+    if unknown:
+        parser.error(f"unknown endpoints: {', '.join(unknown)} (see --list)")
+    if args.skip_agent:
+        names = [name for name in names if name not in AGENT_ENDPOINTS]
+
+    args.baseline = {}
+    if args.compare:
+        with open(args.compare) as f:
+            args.baseline = json.load(f)["results"]
+
+    upstream_port, port = free_port(), free_port()
+    upstream_url, base_url = f"http://127.0.0.1:{upstream_port}", f"http://127.0.0.1:{port}"
+    with tempfile.TemporaryDirectory() as tmp:
+        fake = start_fake_upstream(upstream_port, args)
+        server = None
+        try:
+            wait_until_ready(upstream_url + "/_stats")
+            server = start_server(port, upstream_url, tmp, args)
+            wait_until_ready(base_url + "/")
+            print_header()
+            results = asyncio.run(run_benchmark(base_url, upstream_url, names, args))
+        finally:
+            if server is not None:
+                stop(server)
+            stop(fake)
+
+    if args.output:
+        config = {key: value for key, value in vars(args).items() if key not in ("baseline", "output", "compare", "list")}
+        with open(args.output, "w") as f:
+            json.dump({"config": config, "results": results}, f, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,8 @@
-from fastapi import FastAPI, HTTPException, File, UploadFile, Form
+from fastapi import FastAPI, HTTPException, File, UploadFile, Form, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import List, Optional, Set, Union
 import httpx
 import os
 import base64
@@ -9,11 +10,85 @@ from dotenv import load_dotenv
 import xml.etree.ElementTree as ET
 from datetime import datetime
 import json
-from services.brightdata_service import BrightDataService
+import asyncio
+from contextlib import AsyncExitStack, asynccontextmanager
+from functools import partial
+from services.analysis_jobs import AnalysisJobError, AnalysisQueueFull, analysis_jobs
+from services.brightdata_service import BrightDataService, SearchResults, brightdata_pool
+from services.exercise_catalog import ExerciseCatalog
+from services.http_pool import http_pool
+from services.llm_cache import llm_cache
+from services.json_stream import IncrementalJSONObjectParser
+from services.llm_gateway import LLMGatewayError, RETRYABLE_STATUS, llm_gateway, strip_code_fences
+from services.pose_archive import PoseArchiveError, pose_archive
+from services.pose_frames import PoseFrameFormatError, decode_pose_frames, encode_pose_frames
+from services.pose_stream import PoseStreamError, pose_streams
+from services.pubmed_service import pubmed_store
+from services.resource_cache import ClinicalResourceCache
+from services.response_cache import response_cache
+from services.storage import GRANULARITIES, storage
 
 load_dotenv()
 
-app = FastAPI(title="PhysioLens API")
+# Set by uvicorn --workers / gunicorn via WEB_CONCURRENCY
+WORKER_COUNT = int(os.getenv("WEB_CONCURRENCY", "1"))
+
+# Seconds background work started by requests gets to finish on shutdown before it is cancelled
+BACKGROUND_SHUTDOWN_GRACE = float(os.getenv("BACKGROUND_SHUTDOWN_GRACE", "5"))
+
+# Work started by handlers that outlives the request (the event loop only keeps weak references)
+background_tasks: Set[asyncio.Task] = set()
+
+def run_in_background(coro, description: str) -> asyncio.Task:
+    """Start a task that outlives its request; failures are logged, and shutdown waits for it"""
+    task = asyncio.create_task(coro)
+    background_tasks.add(task)
+    task.add_done_callback(partial(background_task_done, description))
+    return task
+
+def background_task_done(description: str, task: asyncio.Task):
+    background_tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        print(f"❌ {description}: {task.exception()!r}")
+
+async def drain_background_tasks():
+    """Let background tasks finish within BACKGROUND_SHUTDOWN_GRACE seconds, then cancel the rest"""
+    if background_tasks:
+        await asyncio.wait(set(background_tasks), timeout=BACKGROUND_SHUTDOWN_GRACE)
+    for task in list(background_tasks):
+        task.cancel()
+    await asyncio.gather(*background_tasks, return_exceptions=True)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Open shared resources on startup and release them on shutdown (or when a later startup step fails)"""
+    if WORKER_COUNT > 1 and not storage.multi_worker_safe:
+        raise RuntimeError("STORAGE_BACKEND=memory cannot be shared by multiple workers; use sqlite")
+    # Closed in reverse order
+    async with AsyncExitStack() as stack:
+        pubmed_store.open()
+        stack.push_async_callback(pubmed_store.close)
+        llm_cache.open()
+        stack.callback(llm_cache.close)
+        await http_pool.start()
+        stack.push_async_callback(http_pool.close)
+        await storage.open()
+        stack.push_async_callback(storage.close)
+        response_cache.namespace = storage.epoch
+        brightdata_pool.start()
+        stack.push_async_callback(brightdata_pool.close)
+        resource_cache.start()
+        stack.push_async_callback(resource_cache.close)
+        analysis_jobs.start()
+        stack.push_async_callback(analysis_jobs.close)
+        stack.push_async_callback(drain_background_tasks)
+        await exercise_catalog.sync()
+        # Warm PubMed references so lookups stay off the analysis path
+        prefetch = asyncio.create_task(pubmed_store.prefetch(ex["name"] for ex in exercise_catalog.all()))
+        stack.callback(prefetch.cancel)
+        yield
+
+app = FastAPI(title="PhysioLens API", lifespan=lifespan)
 
 # Enable CORS
 app.add_middleware(
@@ -54,6 +129,7 @@ class WarningEvent(BaseModel):
     timestamp: float
     message: str
     severity: str
+    type: Optional[str] = None
 
 class RecordingSession(BaseModel):
     exercise_id: int
@@ -63,6 +139,7 @@ class RecordingSession(BaseModel):
     rep_count: int
     target_reps: int
     warnings: List[WarningEvent]
+    pose_stream_id: Optional[str] = None
 
 class AnalysisRequest(BaseModel):
     session_data: dict
@@ -98,13 +175,8 @@ class SummaryRequest(BaseModel):
     detectedEmergencies: list
     sessionContext: dict
 
-# In-memory storage
-assigned_exercises = []
-recorded_sessions = [] 
-custom_exercises = []
-meetings_db = []
-next_exercise_id = 9
-next_meeting_id = 1
+# Persistent storage (custom exercises, assignments, sessions, meetings)
+# lives in services/storage.py; see STORAGE_BACKEND
 
 # Built-in exercises
 EXERCISES = [
@@ -185,90 +257,144 @@ EXERCISES = [
     }
 ]
 
+# Indexed built-in + custom exercises
+exercise_catalog = ExerciseCatalog(EXERCISES, storage)
+
+# Searches share the warm agent pool (see services/agent_pool.py)
+brightdata_service = BrightDataService()
+resource_cache = ClinicalResourceCache(
+    brightdata_service.search_clinical_resources, brightdata_service.scrape_physiology_journals
+)
+
 # PubMed API Helper Functions
-async def search_pubmed(query: str, max_results: int = 5):
-    """Search PubMed for research papers"""
-    base_url = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/esearch.fcgi"
-    
-    params = {
-        "db": "pubmed",
-        "term": query,
-        "retmax": max_results,
-        "retmode": "json",
-        "sort": "relevance"
-    }
-    
-    try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(base_url, params=params, timeout=10.0)
-            if response.status_code == 200:
-                data = response.json()
-                ids = data.get("esearchresult", {}).get("idlist", [])
-                return ids
-            return []
-    except Exception as e:
-        print(f"PubMed search error: {e}")
-        return []
+# How long /api/claude-analysis waits for references before calling Claude without them
+REFERENCES_DEADLINE = float(os.getenv("REFERENCES_DEADLINE", "1.0"))
+
+async def get_exercise_references(exercise_name: str, description: str):
+    """Get relevant research references for an exercise (served from the reference store)"""
+    return await pubmed_store.get_references(exercise_name)
+
+# Streaming (SSE) Helper Functions
+# Fields each streamed response must contain before the final "done" event
+ANALYSIS_FIELDS = ("overallScore", "formQuality", "strengths", "weaknesses", "recommendations", "summary")
+EXERCISE_CONFIG_FIELDS = ("instructions", "duration", "difficulty")
+SUMMARY_FIELDS = ("chief_complaint", "session_notes", "recommendations")
 
-async def fetch_pubmed_details(pmids: List[str]):
-    """Fetch paper details from PubMed"""
-    if not pmids:
-        return []
+def upstream_http_error(e: Union[LLMGatewayError, httpx.HTTPError], action: str) -> HTTPException:
+    """
+    HTTP error for a failed Claude call
     
-    base_url = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/esummary.fcgi"
+    Rate limiting / overload become 503 (with the upstream Retry-After),
+    timeouts 504, and other upstream or connection failures 502. Client errors
+    about the request itself pass through; auth errors are the server's
+    configuration, so they are 502 as well.
+    """
+    if isinstance(e, httpx.TimeoutException):
+        return HTTPException(status_code=504, detail="Claude API timeout")
+    if isinstance(e, httpx.HTTPError):
+        return HTTPException(status_code=502, detail=f"{action}: {e}")
+    if e.status_code in RETRYABLE_STATUS:
+        headers = {"Retry-After": e.retry_after} if e.retry_after else None
+        return HTTPException(status_code=503, detail=f"{action}: {e.detail}", headers=headers)
+    if e.status_code == 504:
+        return HTTPException(status_code=504, detail="Claude API timeout")
+    if 400 <= e.status_code < 500 and e.status_code not in (401, 403):
+        return HTTPException(status_code=e.status_code, detail=f"{action}: {e.detail}")
+    return HTTPException(status_code=502, detail=f"{action}: {e.detail}")
+
+def sse_event(event: str, data) -> str:
+    """Format one server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def sse_response(events) -> StreamingResponse:
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+async def stream_claude_json(content, max_tokens: int, timeout: float, required_fields: tuple,
+                             result: dict, cache: bool = False):
+    """
+    Stream a Claude JSON response as SSE "field" events
     
-    params = {
-        "db": "pubmed",
-        "id": ",".join(pmids),
-        "retmode": "json"
-    }
+    Each top-level field is emitted as soon as its value closes. When the stream
+    ends the full text is parsed, checked for required_fields and stored in
+    result["value"].
+    """
+    parser = IncrementalJSONObjectParser()
+    async for chunk in llm_gateway.stream_text(content, max_tokens=max_tokens, timeout=timeout, cache=cache):
+        for key, value in parser.feed(chunk):
+            yield sse_event("field", {"key": key, "value": value})
     
-    try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(base_url, params=params, timeout=10.0)
-            if response.status_code == 200:
-                data = response.json()
-                results = []
-                
-                for pmid in pmids:
-                    if pmid in data.get("result", {}):
-                        paper = data["result"][pmid]
-                        results.append({
-                            "pmid": pmid,
-                            "title": paper.get("title", ""),
-                            "authors": paper.get("authors", [{}])[0].get("name", "Unknown") if paper.get("authors") else "Unknown",
-                            "source": paper.get("source", ""),
-                            "pubdate": paper.get("pubdate", ""),
-                            "url": f"https://pubmed.ncbi.nlm.nih.gov/{pmid}/"
-                        })
-                
-                return results
-            return []
-    except Exception as e:
-        print(f"PubMed fetch error: {e}")
-        return []
-
-async def get_exercise_references(exercise_name: str, description: str):
-    """Get relevant research references for an exercise"""
-    query = f"({exercise_name}) AND (physical therapy OR rehabilitation OR exercise therapy)"
-    pmids = await search_pubmed(query, max_results=3)
-    references = await fetch_pubmed_details(pmids)
-    return references
+    value = json.loads(strip_code_fences(parser.text()))
+    missing = [field for field in required_fields if field not in value]
+    if missing:
+        raise ValueError(f"Claude response missing fields: {', '.join(missing)}")
+    result["value"] = value
 
 @app.get("/")
 def read_root():
     return {"message": "PhysioLens API is running!"}
 
+@app.get("/api/metrics/http-pool")
+def get_http_pool_metrics():
+    """Outbound connection pool usage (in-use, idle, waits)"""
+    return http_pool.metrics()
+
+@app.get("/api/metrics/llm-gateway")
+def get_llm_gateway_metrics():
+    """Claude gateway counters (upstream calls, coalesced, retries)"""
+    return llm_gateway.metrics()
+
+@app.get("/api/metrics/llm-cache")
+def get_llm_cache_metrics():
+    """Claude response cache hit/miss counters"""
+    return llm_cache.metrics()
+
+@app.get("/api/metrics/pubmed-cache")
+def get_pubmed_cache_metrics():
+    """PubMed reference store hit/miss and E-utilities call counters"""
+    return pubmed_store.metrics()
+
+@app.get("/api/metrics/response-cache")
+def get_response_cache_metrics():
+    """Serialized GET response cache counters"""
+    return response_cache.metrics()
+
+@app.get("/api/metrics/pose-streams")
+def get_pose_stream_metrics():
+    """Live pose stream buffers of this worker"""
+    return pose_streams.metrics()
+
+@app.get("/api/metrics/analysis-jobs")
+def get_analysis_job_metrics():
+    """Session analysis process pool: queue depth, outcomes, latency"""
+    return analysis_jobs.metrics()
+
+@app.get("/api/metrics/brightdata-pool")
+def get_brightdata_pool_metrics():
+    """Warm BrightData agent sessions: idle / in use, recycling, connect and wait times"""
+    return brightdata_pool.metrics()
+
+@app.get("/api/metrics/resource-cache")
+def get_resource_cache_metrics():
+    """Clinical resource search cache: hit rate, agent runs, background refreshes"""
+    return resource_cache.metrics()
+
 @app.get("/exercises")
-def get_all_exercises():
-    """Get list of all available exercises"""
-    all_exercises = EXERCISES + custom_exercises
-    return {"exercises": all_exercises}
+async def get_all_exercises(request: Request):
+    """Get list of all available exercises (supports If-None-Match)"""
+    async def build():
+        await exercise_catalog.sync()
+        return {"exercises": exercise_catalog.all()}
+    
+    generation = await storage.generation("custom_exercises")
+    return await response_cache.respond(request, "exercises", generation, build)
 
 @app.post("/assign-exercises")
-def assign_exercises(request: AssignExercisesRequest):
+async def assign_exercises(request: AssignExercisesRequest):
     """Doctor assigns exercises with target reps to patient"""
-    global assigned_exercises
     
     if len(request.assignments) > 5:
         raise HTTPException(status_code=400, detail="Maximum 5 exercises can be assigned")
@@ -276,33 +402,18 @@ def assign_exercises(request: AssignExercisesRequest):
     if len(request.assignments) == 0:
         raise HTTPException(status_code=400, detail="At least 1 exercise must be assigned")
     
-    all_exercises = EXERCISES + custom_exercises
-    
-    valid_ids = [ex["id"] for ex in all_exercises]
+    await exercise_catalog.sync()
     for assignment in request.assignments:
-        if assignment.exercise_id not in valid_ids:
+        if assignment.exercise_id not in exercise_catalog:
             raise HTTPException(status_code=400, detail=f"Exercise ID {assignment.exercise_id} not found")
         if assignment.target_reps <= 0:
             raise HTTPException(status_code=400, detail=f"Target reps must be greater than 0")
     
-    # Do not clear existing exercises - append or update instead
-    for assignment in request.assignments:
-        # Check if exercise is already assigned
-        existing_exercise = next((ex for ex in assigned_exercises if ex["id"] == assignment.exercise_id), None)
-        
-        if existing_exercise:
-            # Update existing assignment
-            existing_exercise["target_reps"] = assignment.target_reps
-            existing_exercise["completed"] = False
-        else:
-            # Add new assignment
-            exercise = next(ex for ex in all_exercises if ex["id"] == assignment.exercise_id)
-            assigned_exercises.append({
-                **exercise,
-                "target_reps": assignment.target_reps,
-                "completed": False
-            })
-    
+    # Do not clear existing exercises - add new assignments or update existing ones
+    assigned_exercises = await storage.assign_exercises([
+        (exercise_catalog.get(assignment.exercise_id), assignment.target_reps)
+        for assignment in request.assignments
+    ])
     return {
         "message": "Exercises assigned successfully",
         "assigned_count": len(assigned_exercises),
@@ -310,62 +421,376 @@ def assign_exercises(request: AssignExercisesRequest):
     }
 
 @app.get("/assigned-exercises")
-def get_assigned_exercises():
-    """Patient views their assigned exercises"""
-    return {"exercises": assigned_exercises}
+async def get_assigned_exercises(request: Request):
+    """Patient views their assigned exercises (supports If-None-Match)"""
+    async def build():
+        return {"exercises": await storage.list_assigned_exercises()}
+    
+    generation = await storage.generation("assigned_exercises")
+    return await response_cache.respond(request, "assigned_exercises", generation, build)
 
 @app.post("/complete-exercise/{exercise_id}")
-def complete_exercise(exercise_id: int):
+async def complete_exercise(exercise_id: int):
     """Mark an exercise as completed"""
-    global assigned_exercises
-    
-    for exercise in assigned_exercises:
-        if exercise["id"] == exercise_id:
-            exercise["completed"] = True
-            return {"message": "Exercise marked as completed", "exercise": exercise}
+    exercise = await storage.complete_exercise(exercise_id)
+    if exercise:
+        return {"message": "Exercise marked as completed", "exercise": exercise}
     
     raise HTTPException(status_code=404, detail="Exercise not found")
 
 @app.post("/save-recording-session")
-def save_recording_session(session: RecordingSession):
+async def save_recording_session(session: RecordingSession):
     """Save a recorded exercise session with warnings"""
-    session_data = session.dict()
-    session_data['id'] = len(recorded_sessions) + 1
-    recorded_sessions.append(session_data)
+    session_data = await storage.add_session(session.dict(exclude={"pose_stream_id"}))
     
-    return {
+    # Analysis usually follows a save; fetch references ahead of it
+    run_in_background(pubmed_store.prefetch([session.exercise_name]), f"Prefetching references for {session.exercise_name}")
+    
+    response = {
         "message": "Recording session saved successfully",
         "session_id": session_data['id']
     }
+    
+    # Pose frames streamed during the session were already analyzed when the stream ended
+    if session.pose_stream_id:
+        recording = await storage.attach_pose_stream(session.pose_stream_id, session_data['id'])
+        if recording:
+            response["pose_frames"] = recording["info"]
+            response["analysis"] = recording["analysis"]
+            # Rep count recomputed from the landmarks, to check the one reported by the client
+            reps = (recording["analysis"] or {}).get("reps")
+            if reps is not None:
+                response["verified_rep_count"] = reps["repCount"]
+            data = await storage.get_pose_recording(session_data['id'])
+            run_in_background(
+                archive_pose_recording(session_data, decode_pose_frames(data), recording["analysis"]),
+                f"Archiving pose frames of session {session_data['id']}"
+            )
+    
+    return response
+
+async def exercise_analysis_config(exercise_id: int):
+    """Compiled analysis config of an exercise (syncing the catalog for custom exercises it has not seen yet)"""
+    if exercise_id not in exercise_catalog:
+        await exercise_catalog.sync()
+    return exercise_catalog.evaluator(exercise_id)
+
+async def submit_pose_analysis(exercise_id: int, landmarks, timestamps, session_id: Optional[int] = None):
+    """Queue a session analysis on the analysis process pool (503 when the queue is full)"""
+    config = await exercise_analysis_config(exercise_id)
+    try:
+        return await analysis_jobs.submit(config, exercise_id, landmarks, timestamps, session_id)
+    except AnalysisQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+
+async def store_pose_analysis(session: dict, recording, job):
+    """Save a background analysis onto its session's recording once it finishes"""
+    try:
+        analysis = await analysis_jobs.wait(job)
+    except AnalysisJobError as e:
+        print(f"❌ Pose analysis {job.job_id} for session {session['id']}: {e}")
+        return
+    await storage.save_pose_analysis(session["id"], analysis)
+    await archive_pose_recording(session, recording, analysis)
+
+# Sessions carry no patient yet; archive them all under one key
+ARCHIVE_PATIENT = os.getenv("POSE_ARCHIVE_PATIENT", "default")
+
+def parse_timestamp(value: str) -> float:
+    """Unix time of an ISO 8601 date / datetime (as sent by the frontend, "Z" suffix allowed)"""
+    return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+
+async def archive_pose_recording(session: dict, recording, analysis: Optional[dict]):
+    """Append a session's analyzed recording to the long-term pose archive"""
+    if not pose_archive.enabled:
+        return
+    try:
+        recorded_at = parse_timestamp(session["completed_at"])
+    except (KeyError, AttributeError, ValueError):
+        recorded_at = datetime.now().timestamp()
+    try:
+        evaluator = await exercise_analysis_config(recording.exercise_id)
+        await asyncio.to_thread(
+            pose_archive.append, ARCHIVE_PATIENT, recording.exercise_id, session["id"], recorded_at,
+            recording.fps, recording.landmarks, recording.timestamps, analysis, evaluator
+        )
+    except (OSError, PoseArchiveError) as e:
+        print(f"❌ Archiving pose frames of session {session['id']}: {e}")
+
+# Upper bound on a pose upload, before and after decompression
+POSE_UPLOAD_MAX_BYTES = int(os.getenv("POSE_UPLOAD_MAX_BYTES", str(64 * 1024 * 1024)))
+
+@app.post("/recorded-sessions/{session_id}/pose-frames")
+async def upload_pose_frames(session_id: int, request: Request, wait: bool = True):
+    """
+    Attach packed binary pose frames (see services/pose_frames.py) to a recorded session
+    
+    The frames are analyzed on the analysis process pool; by default the
+    response waits for the job and includes the analysis. With wait=false the
+    response returns immediately with the job ID; poll /analysis-jobs/{job_id}
+    or /recorded-sessions/{session_id}/analysis for the result.
+    """
+    session = await storage.get_session(session_id)
+    if not session:
+        raise HTTPException(status_code=404, detail="Session not found")
+    
+    body = await request.body()
+    if len(body) > POSE_UPLOAD_MAX_BYTES:
+        raise HTTPException(status_code=413, detail="Pose upload too large")
+    
+    try:
+        recording = await asyncio.to_thread(decode_pose_frames, body, POSE_UPLOAD_MAX_BYTES)
+    except PoseFrameFormatError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if recording.exercise_id != session["exercise_id"]:
+        raise HTTPException(status_code=400, detail="Pose frames belong to a different exercise")
+    
+    info = recording.info()
+    job = await submit_pose_analysis(recording.exercise_id, recording.landmarks, recording.timestamps, session_id)
+    response = {
+        "message": "Pose frames saved successfully",
+        "session_id": session_id,
+        "uploaded_bytes": len(body),
+        "analysis_job_id": job.job_id,
+        **info
+    }
+    
+    if not wait:
+        await storage.save_pose_recording(session_id, info, recording.raw)
+        run_in_background(store_pose_analysis(session, recording, job), f"Storing pose analysis {job.job_id}")
+        return JSONResponse(response, status_code=202)
+    
+    try:
+        analysis = await analysis_jobs.wait(job)
+    except AnalysisJobError as e:
+        # Keep the frames; the analysis can be redone later
+        await storage.save_pose_recording(session_id, info, recording.raw)
+        raise HTTPException(status_code=504 if e.job.status == "timed_out" else 500, detail=f"Pose analysis {e.job.status}: {e}")
+    await storage.save_pose_recording(session_id, info, recording.raw, analysis)
+    run_in_background(archive_pose_recording(session, recording, analysis), f"Archiving pose frames of session {session_id}")
+    return {**response, "analysis": analysis}
+
+@app.websocket("/ws/pose-stream")
+async def pose_stream(websocket: WebSocket, exercise_id: int, fps: float = 30.0):
+    """
+    Stream pose frames while the patient exercises
+    
+    Protocol:
+        server -> {"type": "ready", "stream_id", "max_frames"}
+        client -> binary batches in the packed pose format (optionally gzip/zstd),
+                  each analyzed on arrival and answered with
+                  {"type": "ack", "frames": total, "issues": issues so far, "reps": reps so far}
+        client -> {"type": "end"}; the recording is kept until
+                  /save-recording-session is called with pose_stream_id, then
+                  server -> {"type": "finalized", "stream_id", "frames", "analysis"}
+    """
+    await websocket.accept()
+    try:
+        stream = pose_streams.open(exercise_id, fps, await exercise_analysis_config(exercise_id))
+    except PoseStreamError as e:
+        await websocket.send_json({"type": "error", "detail": str(e)})
+        await websocket.close(code=1013)
+        return
+    
+    finalized = False
+    try:
+        await websocket.send_json({"type": "ready", "stream_id": stream.stream_id, "max_frames": stream.max_frames})
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            
+            if message.get("bytes") is not None:
+                batch = decode_pose_frames(message["bytes"], POSE_UPLOAD_MAX_BYTES)
+                total = pose_streams.append(stream, batch)
+                progress = stream.analyzer.progress()
+                await websocket.send_json({"type": "ack", "frames": total, "issues": progress["issues"], "reps": progress["reps"]})
+                continue
+            
+            if json.loads(message.get("text") or "{}").get("type") == "end":
+                analysis = stream.analyzer.result()
+                data = stream.to_bytes()
+                await storage.save_pose_stream(stream.stream_id, stream.info(len(data)), data, analysis)
+                finalized = True
+                await websocket.send_json({
+                    "type": "finalized",
+                    "stream_id": stream.stream_id,
+                    "frames": stream.count,
+                    "analysis": analysis
+                })
+                await websocket.close()
+                break
+    except (PoseFrameFormatError, PoseStreamError, json.JSONDecodeError) as e:
+        await websocket.send_json({"type": "error", "detail": str(e)})
+        await websocket.close(code=1003)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        pose_streams.close(stream, finalized)
+
+@app.get("/analysis-jobs/{job_id}")
+async def get_analysis_job(job_id: str):
+    """Status (and, once completed, result) of a session analysis job"""
+    job = await storage.get_analysis_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Analysis job not found")
+    return job
+
+@app.delete("/analysis-jobs/{job_id}")
+async def cancel_analysis_job(job_id: str):
+    """Cancel a queued or running analysis job (whichever worker is running it)"""
+    job = await storage.cancel_analysis_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Analysis job not found")
+    # Immediate if the job runs in this worker; otherwise its worker polls for the request
+    analysis_jobs.cancel(job_id)
+    return {"message": "Cancellation requested", "job_id": job_id}
+
+@app.get("/recorded-sessions/{session_id}/analysis")
+async def get_recorded_session_analysis(session_id: int):
+    """Get the server-side analysis of a session's pose frames"""
+    analysis = await storage.get_pose_analysis(session_id)
+    if analysis is None:
+        raise HTTPException(status_code=404, detail="No analysis for this session")
+    return analysis
+
+@app.get("/recorded-sessions/{session_id}/pose-frames")
+async def get_pose_frames(session_id: int):
+    """Get the packed pose frames stored for a session"""
+    data = await storage.get_pose_recording(session_id)
+    if data is None:
+        raise HTTPException(status_code=404, detail="No pose frames for this session")
+    return Response(content=data, media_type="application/octet-stream")
+
+async def progress_response(request: Request, granularity: str, since: Optional[str], until: Optional[str],
+                            exercise_id: Optional[int] = None):
+    """Progress time series from the storage rollups (cached per session generation when unfiltered)"""
+    if granularity not in GRANULARITIES:
+        raise HTTPException(status_code=400, detail=f"granularity must be one of {', '.join(GRANULARITIES)}")
+    try:
+        since = datetime.fromisoformat(since).date().isoformat() if since else None
+        until = datetime.fromisoformat(until).date().isoformat() if until else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="since / until must be ISO 8601 dates")
+    
+    async def build():
+        await exercise_catalog.sync()
+        series = await storage.progress(granularity, exercise_id, since, until)
+        return {
+            "granularity": granularity,
+            "exercises": [
+                {
+                    "exercise_id": series_exercise,
+                    "exercise_name": (exercise_catalog.get(series_exercise) or {}).get("name"),
+                    "series": points
+                }
+                for series_exercise, points in sorted(series.items())
+            ]
+        }
+    
+    if since or until:
+        return await build()
+    generation = await storage.generation("sessions")
+    return await response_cache.respond(request, f"progress-{granularity}-{exercise_id or 'all'}", generation, build)
+
+@app.get("/analytics/progress")
+async def get_progress(request: Request, granularity: str = "week", since: Optional[str] = None, until: Optional[str] = None):
+    """
+    Per-exercise progress time series (reps vs target, issues by severity and
+    type, session duration) in day or week buckets, since / until as ISO dates
+    (supports If-None-Match when unfiltered)
+    """
+    return await progress_response(request, granularity, since, until)
+
+@app.get("/analytics/progress/{exercise_id}")
+async def get_exercise_progress(exercise_id: int, request: Request, granularity: str = "week",
+                                since: Optional[str] = None, until: Optional[str] = None):
+    """Progress time series of one exercise (see /analytics/progress)"""
+    return await progress_response(request, granularity, since, until, exercise_id)
+
+@app.get("/archive/exercises/{exercise_id}/sessions")
+async def get_archived_sessions(exercise_id: int, since: Optional[str] = None, until: Optional[str] = None):
+    """
+    Per-session aggregates (tracked angle range, reps and rep times, issues) of
+    archived recordings of an exercise, optionally limited to sessions completed
+    in [since, until) (ISO 8601 dates)
+    """
+    try:
+        since_ts = parse_timestamp(since) if since else None
+        until_ts = parse_timestamp(until) if until else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="since / until must be ISO 8601 dates")
+    try:
+        sessions = await asyncio.to_thread(pose_archive.sessions, ARCHIVE_PATIENT, exercise_id, since_ts, until_ts)
+    except PoseArchiveError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return {"exercise_id": exercise_id, "sessions": sessions}
+
+@app.get("/archive/exercises/{exercise_id}/sessions/{session_id}/pose-frames")
+async def get_archived_pose_frames(exercise_id: int, session_id: int, start: Optional[float] = None, end: Optional[float] = None):
+    """Packed pose frames (float16, with timestamps) of an archived session between start and end seconds"""
+    def read():
+        frames = pose_archive.frames(ARCHIVE_PATIENT, exercise_id, session_id, start, end)
+        if frames is None:
+            return None
+        landmarks, timestamps, fps = frames
+        return encode_pose_frames(landmarks, fps, exercise_id, timestamps)
+    
+    try:
+        data = await asyncio.to_thread(read)
+    except PoseArchiveError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if data is None:
+        raise HTTPException(status_code=404, detail="Session not in the pose archive")
+    return Response(content=data, media_type="application/octet-stream")
 
 @app.get("/recorded-sessions")
-def get_recorded_sessions():
+async def get_recorded_sessions():
     """Get all recorded sessions"""
-    return {"sessions": recorded_sessions}
+    return {"sessions": await storage.list_sessions()}
 
 @app.get("/recorded-sessions/{session_id}")
-def get_recorded_session(session_id: int):
+async def get_recorded_session(session_id: int):
     """Get a specific recorded session"""
-    for session in recorded_sessions:
-        if session['id'] == session_id:
-            return {"session": session}
+    session = await storage.get_session(session_id)
+    if session:
+        return {"session": session}
     
     raise HTTPException(status_code=404, detail="Session not found")
 
-@app.post("/api/claude-analysis")
-async def get_claude_analysis(request: AnalysisRequest):
-    """Proxy endpoint for Claude API with PubMed references"""
-    
-    api_key = os.getenv("ANTHROPIC_API_KEY")
-    if not api_key:
-        raise HTTPException(status_code=500, detail="Claude API key not configured on server")
-    
-    session = request.session_data
-    analysis = request.analysis_results
+async def gather_references(exercise_name: str):
+    """
+    Start the PubMed lookup and wait at most REFERENCES_DEADLINE for it
     
-    # Get PubMed references for this exercise
-    references = await get_exercise_references(session['exercise_name'], "exercise performance analysis")
+    Returns:
+        (references ready in time, the lookup task so late arrivals can be collected)
+    """
+    # May outlive the response when the lookup misses the deadline
+    references_task = run_in_background(
+        get_exercise_references(exercise_name, "exercise performance analysis"),
+        f"Looking up references for {exercise_name}"
+    )
+    await asyncio.wait({references_task}, timeout=REFERENCES_DEADLINE)
+    references = references_task.result() if references_task.done() else []
+    return references, references_task
+
+def references_payload(references: list, references_task: asyncio.Task):
+    """References plus which of them made it into the prompt"""
+    late_references = []
+    if not references and references_task.done():
+        late_references = references_task.result()
     
+    return {
+        "references": references + late_references,
+        "references_status": {
+            "in_prompt": [ref['pmid'] for ref in references],
+            "arrived_late": [ref['pmid'] for ref in late_references],
+            "pending": not references_task.done()
+        }
+    }
+
+def build_analysis_prompt(session: dict, analysis: dict, references: list) -> str:
+    """Build the session analysis prompt for Claude"""
     # Build references text for Claude
     references_text = ""
     if references:
@@ -373,7 +798,7 @@ async def get_claude_analysis(request: AnalysisRequest):
         for i, ref in enumerate(references, 1):
             references_text += f"{i}. {ref['title']} - {ref['authors']} ({ref['pubdate']})\n"
     
-    prompt = f"""You are an expert physical therapist analyzing a patient's exercise session. Be encouraging and realistic - minor form issues are normal and expected during physical therapy.
+    return f"""You are an expert physical therapist analyzing a patient's exercise session. Be encouraging and realistic - minor form issues are normal and expected during physical therapy.
 
 **Session Details:**
 - Exercise: {session['exercise_name']}
@@ -411,64 +836,67 @@ Provide your analysis in this JSON format (respond with ONLY valid JSON, no mark
   "recommendations": ["recommendation 1", "recommendation 2", "recommendation 3"],
   "summary": "2-3 sentence overall summary"
 }}"""
+
+@app.post("/api/claude-analysis")
+async def get_claude_analysis(request: AnalysisRequest):
+    """Proxy endpoint for Claude API with PubMed references"""
+    
+    api_key = os.getenv("ANTHROPIC_API_KEY")
+    if not api_key:
+        raise HTTPException(status_code=500, detail="Claude API key not configured on server")
+    
+    session = request.session_data
+    analysis = request.analysis_results
+    
+    # Fetch PubMed references alongside the analysis; only those ready by the
+    # deadline go into the prompt, late arrivals are still returned
+    references, references_task = await gather_references(session['exercise_name'])
+    prompt = build_analysis_prompt(session, analysis, references)
     
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                "https://api.anthropic.com/v1/messages",
-                headers={
-                    "Content-Type": "application/json",
-                    "x-api-key": api_key,
-                    "anthropic-version": "2023-06-01"
-                },
-                json={
-                    "model": "claude-sonnet-4-20250514",
-                    "max_tokens": 1500,
-                    "messages": [{
-                        "role": "user",
-                        "content": prompt
-                    }]
-                },
-                timeout=30.0
-            )
-            
-            if response.status_code != 200:
-                raise HTTPException(
-                    status_code=response.status_code,
-                    detail=f"Claude API error: {response.text}"
-                )
-            
-            data = response.json()
-            text_content = data['content'][0]['text']
-            
-            cleaned = text_content.strip()
-            if cleaned.startswith('```json'):
-                cleaned = cleaned.replace('```json\n', '').replace('\n```', '')
-            elif cleaned.startswith('```'):
-                cleaned = cleaned.replace('```\n', '').replace('\n```', '')
-            
-            return {
-                "analysis": cleaned,
-                "references": references
-            }
-            
-    except httpx.TimeoutException:
-        raise HTTPException(status_code=504, detail="Claude API timeout")
+        cleaned = await llm_gateway.complete(prompt, max_tokens=1500, timeout=30.0, cache=True)
+        
+        return {
+            "analysis": cleaned,
+            **references_payload(references, references_task)
+        }
+        
+    except (LLMGatewayError, httpx.HTTPError) as e:
+        raise upstream_http_error(e, "Error calling Claude API")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error calling Claude API: {str(e)}")
 
-@app.post("/api/create-exercise")
-async def create_exercise(request: CreateExerciseRequest):
-    """Use Claude to analyze exercise and generate configuration with PubMed references"""
-    global next_exercise_id, custom_exercises
+@app.post("/api/claude-analysis/stream")
+async def stream_claude_analysis(request: AnalysisRequest):
+    """Server-sent-event variant of /api/claude-analysis"""
     
     api_key = os.getenv("ANTHROPIC_API_KEY")
     if not api_key:
         raise HTTPException(status_code=500, detail="Claude API key not configured on server")
     
-    # Get PubMed references for this exercise
-    references = await get_exercise_references(request.name, request.description)
+    session = request.session_data
+    analysis = request.analysis_results
     
+    async def events():
+        references, references_task = await gather_references(session['exercise_name'])
+        yield sse_event("references", references)
+        prompt = build_analysis_prompt(session, analysis, references)
+        
+        result = {}
+        try:
+            async for event in stream_claude_json(prompt, 1500, 30.0, ANALYSIS_FIELDS, result, cache=True):
+                yield event
+            yield sse_event("done", {
+                "analysis": result["value"],
+                **references_payload(references, references_task)
+            })
+        except Exception as e:
+            yield sse_event("error", {"detail": f"Error calling Claude API: {str(e)}"})
+    
+    return sse_response(events())
+
+def build_exercise_content(request: CreateExerciseRequest, references: list):
+    """Build the create-exercise prompt (with the optional reference image) for Claude"""
     # Build references text for Claude
     references_text = ""
     if references:
@@ -533,95 +961,107 @@ Respond with ONLY valid JSON (no markdown, no code blocks):
   }}
 }}"""
     
+    return prompt if not request.image_base64 else [
+        {
+            "type": "image",
+            "source": {
+                "type": "base64",
+                "media_type": "image/jpeg",
+                "data": request.image_base64
+            }
+        },
+        {
+            "type": "text",
+            "text": prompt
+        }
+    ]
+
+async def register_custom_exercise(request: CreateExerciseRequest, config: dict, references: list):
+    """Store a Claude-generated exercise and return it"""
+    new_exercise = await storage.add_custom_exercise({
+        "name": request.name,
+        "description": request.description,
+        "instructions": config["instructions"],
+        "duration": config["duration"],
+        "difficulty": config["difficulty"],
+        "config": config,
+        "references": references
+    })
+    exercise_catalog.add(new_exercise)
+    # Compile the analysis config now so problems show up when the exercise is created
+    evaluator = exercise_catalog.evaluator(new_exercise["id"])
+    if evaluator is not None and evaluator.problems:
+        print(f"⚠️ Exercise {new_exercise['id']} config: {'; '.join(evaluator.problems)}")
+    return new_exercise
+
+@app.post("/api/create-exercise")
+async def create_exercise(request: CreateExerciseRequest):
+    """Use Claude to analyze exercise and generate configuration with PubMed references"""
+    
+    api_key = os.getenv("ANTHROPIC_API_KEY")
+    if not api_key:
+        raise HTTPException(status_code=500, detail="Claude API key not configured on server")
+    
+    # Get PubMed references for this exercise
+    references = await get_exercise_references(request.name, request.description)
+    content = build_exercise_content(request, references)
+    
     try:
-        messages = [{
-            "role": "user",
-            "content": prompt if not request.image_base64 else [
-                {
-                    "type": "image",
-                    "source": {
-                        "type": "base64",
-                        "media_type": "image/jpeg",
-                        "data": request.image_base64
-                    }
-                },
-                {
-                    "type": "text",
-                    "text": prompt
-                }
-            ]
-        }]
+        config = await llm_gateway.complete_json(content, max_tokens=2000, timeout=120.0, cache=True)
+        new_exercise = await register_custom_exercise(request, config, references)
         
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                "https://api.anthropic.com/v1/messages",
-                headers={
-                    "Content-Type": "application/json",
-                    "x-api-key": api_key,
-                    "anthropic-version": "2023-06-01"
-                },
-                json={
-                    "model": "claude-sonnet-4-20250514",
-                    "max_tokens": 2000,
-                    "messages": messages
-                },
-                timeout=120.0
-            )
-            
-            if response.status_code != 200:
-                raise HTTPException(
-                    status_code=response.status_code,
-                    detail=f"Claude API error: {response.text}"
-                )
-            
-            data = response.json()
-            text_content = data['content'][0]['text']
-            
-            cleaned = text_content.strip()
-            if cleaned.startswith('```json'):
-                cleaned = cleaned.replace('```json\n', '').replace('\n```', '')
-            elif cleaned.startswith('```'):
-                cleaned = cleaned.replace('```\n', '').replace('\n```', '')
-            
-            config = json.loads(cleaned)
-            
-            new_exercise = {
-                "id": next_exercise_id,
-                "name": request.name,
-                "description": request.description,
-                "instructions": config["instructions"],
-                "duration": config["duration"],
-                "difficulty": config["difficulty"],
-                "config": config,
-                "references": references
-            }
-            
-            custom_exercises.append(new_exercise)
-            next_exercise_id += 1
-            
-            return {
-                "message": "Exercise created successfully",
-                "exercise": new_exercise
-            }
-            
-    except httpx.TimeoutException:
-        raise HTTPException(status_code=504, detail="Claude API timeout")
+        return {
+            "message": "Exercise created successfully",
+            "exercise": new_exercise
+        }
+        
+    except (LLMGatewayError, httpx.HTTPError) as e:
+        raise upstream_http_error(e, "Error creating exercise")
     except json.JSONDecodeError as e:
         raise HTTPException(status_code=500, detail=f"Invalid JSON from Claude: {str(e)}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error creating exercise: {str(e)}")
 
+@app.post("/api/create-exercise/stream")
+async def stream_create_exercise(request: CreateExerciseRequest):
+    """Server-sent-event variant of /api/create-exercise"""
+    
+    api_key = os.getenv("ANTHROPIC_API_KEY")
+    if not api_key:
+        raise HTTPException(status_code=500, detail="Claude API key not configured on server")
+    
+    async def events():
+        references = await get_exercise_references(request.name, request.description)
+        yield sse_event("references", references)
+        content = build_exercise_content(request, references)
+        
+        result = {}
+        try:
+            async for event in stream_claude_json(content, 2000, 120.0, EXERCISE_CONFIG_FIELDS, result, cache=True):
+                yield event
+            new_exercise = await register_custom_exercise(request, result["value"], references)
+            yield sse_event("done", {
+                "message": "Exercise created successfully",
+                "exercise": new_exercise
+            })
+        except Exception as e:
+            yield sse_event("error", {"detail": f"Error creating exercise: {str(e)}"})
+    
+    return sse_response(events())
+
 @app.get("/custom-exercises")
-def get_custom_exercises():
+async def get_custom_exercises():
     """Get all custom exercises created by doctors"""
-    return {"exercises": custom_exercises}
+    await exercise_catalog.sync()
+    return {"exercises": exercise_catalog.custom()}
 
 @app.get("/exercise-config/{exercise_id}")
-def get_exercise_config(exercise_id: int):
+async def get_exercise_config(exercise_id: int):
     """Get configuration for a specific exercise"""
-    for exercise in custom_exercises:
-        if exercise["id"] == exercise_id:
-            return {"config": exercise.get("config")}
+    await exercise_catalog.sync()
+    exercise = exercise_catalog.get_custom(exercise_id)
+    if exercise:
+        return {"config": exercise.get("config")}
     
     raise HTTPException(status_code=404, detail="Exercise configuration not found")
 
@@ -633,14 +1073,58 @@ async def get_clinical_resources(request: dict):
         raise HTTPException(status_code=400, detail="Query parameter required")
     
     try:
-        service = BrightDataService()
-        results = await service.search_clinical_resources(query)
+        results = await resource_cache.search(query)
         return {"resources": results}
     except Exception as e:
         print(f"Error fetching resources: {e}")
         # Return empty list on error to avoid breaking frontend
         return {"resources": [], "error": str(e)}
 
+@app.post("/api/research/resources/stream")
+async def stream_clinical_resources(request: dict):
+    """
+    Server-sent-event variant of /api/research/resources
+    
+    Emits a "resource" event per article as soon as an agent has produced it,
+    then "done" with the outcome of each journal source. Cached results are
+    replayed immediately; a completed search is added to the cache.
+    """
+    query = request.get("query")
+    if not query:
+        raise HTTPException(status_code=400, detail="Query parameter required")
+    
+    async def events():
+        cached = resource_cache.cached(query)
+        if cached is not None:
+            for resource in cached:
+                yield sse_event("resource", resource)
+            yield sse_event("done", {"count": len(cached), "cached": True})
+            return
+        
+        results = []
+        sources = {}
+        try:
+            async for resource in brightdata_service.stream_clinical_resources(query, sources):
+                results.append(resource)
+                yield sse_event("resource", resource)
+        except Exception as e:
+            print(f"Error streaming resources: {e}")
+            yield sse_event("error", {"detail": str(e)})
+            return
+        await resource_cache.store(query, SearchResults(results, sources))
+        yield sse_event("done", {"count": len(results), "cached": False, "sources": sources})
+    
+    return sse_response(events())
+
+@app.get("/api/research/journals")
+async def get_journal_articles():
+    """Latest physiology journal articles (scraped periodically in the background)"""
+    try:
+        return {"articles": await resource_cache.journals()}
+    except Exception as e:
+        print(f"Error fetching journal articles: {e}")
+        return {"articles": [], "error": str(e)}
+
 # ==========================================
 # MEETING MODE ENDPOINTS
 # ==========================================
@@ -673,40 +1157,9 @@ Respond ONLY with valid JSON (no markdown):
 }}"""
 
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                "https://api.anthropic.com/v1/messages",
-                headers={
-                    "Content-Type": "application/json",
-                    "x-api-key": api_key,
-                    "anthropic-version": "2023-06-01"
-                },
-                json={
-                    "model": "claude-sonnet-4-20250514",
-                    "max_tokens": 500,
-                    "messages": [{
-                        "role": "user",
-                        "content": prompt
-                    }]
-                },
-                timeout=15.0
-            )
-            
-            if response.status_code != 200:
-                raise HTTPException(status_code=response.status_code, detail="Claude API error")
-            
-            data = response.json()
-            text = data['content'][0]['text'].strip()
-            
-            # Clean JSON
-            if text.startswith('```json'):
-                text = text.replace('```json\n', '').replace('\n```', '')
-            elif text.startswith('```'):
-                text = text.replace('```\n', '').replace('\n```', '')
-            
-            result = json.loads(text)
-            return result
-            
+        result = await llm_gateway.complete_json(prompt, max_tokens=500, timeout=15.0)
+        return result
+        
     except Exception as e:
         print(f"Error analyzing transcript: {e}")
         return {
@@ -720,27 +1173,25 @@ Respond ONLY with valid JSON (no markdown):
 @app.post("/api/meetings/create")
 async def create_meeting(meeting: Meeting):
     """Create a new meeting"""
-    global next_meeting_id
-    
     meeting_data = meeting.dict()
-    meeting_data['id'] = next_meeting_id
     meeting_data['created_at'] = datetime.now().isoformat()
-    
-    meetings_db.append(meeting_data)
-    next_meeting_id += 1
+    meeting_data = await storage.add_meeting(meeting_data)
     
     return {"message": "Meeting created", "meeting": meeting_data}
 
 @app.get("/api/meetings/upcoming")
-async def get_upcoming_meetings():
-    """Get all upcoming meetings"""
-    return {"meetings": meetings_db}
+async def get_upcoming_meetings(request: Request):
+    """Get all upcoming meetings (supports If-None-Match)"""
+    async def build():
+        return {"meetings": await storage.list_meetings()}
+    
+    generation = await storage.generation("meetings")
+    return await response_cache.respond(request, "meetings", generation, build)
 
 @app.delete("/api/meetings/{meeting_id}")
 async def delete_meeting(meeting_id: int):
     """Delete a meeting"""
-    global meetings_db
-    meetings_db = [m for m in meetings_db if m['id'] != meeting_id]
+    await storage.delete_meeting(meeting_id)
     return {"message": "Meeting deleted"}
 
 # Real-time chunk analysis (for emergency/meeting detection)
@@ -770,36 +1221,9 @@ Respond ONLY with valid JSON (no markdown):
 }}"""
 
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                "https://api.anthropic.com/v1/messages",
-                headers={
-                    "Content-Type": "application/json",
-                    "x-api-key": api_key,
-                    "anthropic-version": "2023-06-01"
-                },
-                json={
-                    "model": "claude-sonnet-4-20250514",
-                    "max_tokens": 300,
-                    "messages": [{"role": "user", "content": prompt}]
-                },
-                timeout=10.0
-            )
-            
-            if response.status_code != 200:
-                raise HTTPException(status_code=response.status_code, detail="Claude API error")
-            
-            data = response.json()
-            text = data['content'][0]['text'].strip()
-            
-            if text.startswith('```json'):
-                text = text.replace('```json\n', '').replace('\n```', '')
-            elif text.startswith('```'):
-                text = text.replace('```\n', '').replace('\n```', '')
-            
-            result = json.loads(text)
-            return result
-            
+        result = await llm_gateway.complete_json(prompt, max_tokens=300, timeout=10.0)
+        return result
+        
     except Exception as e:
         print(f"Error analyzing chunk: {e}")
         return {
@@ -811,23 +1235,14 @@ Respond ONLY with valid JSON (no markdown):
         }
 
 # Generate full clinical summary (when session ends)
-@app.post("/api/meeting-mode/generate-summary")
-async def generate_summary(request: SummaryRequest):
-    """Generate comprehensive clinical summary using Claude"""
-    
-    api_key = os.getenv("ANTHROPIC_API_KEY")
-    if not api_key:
-        raise HTTPException(status_code=500, detail="API key not configured")
-    
-    if len(request.transcript) < 50:
-        return {"error": "Transcript too short for summary"}
-    
+def build_summary_prompt(request: SummaryRequest) -> str:
+    """Build the clinical summary prompt for Claude"""
     exercise_name = request.sessionContext.get('exercise_name', 'Unknown')
     rep_count = request.sessionContext.get('rep_count', 0)
     target_reps = request.sessionContext.get('target_reps', 0)
     duration = request.duration
     
-    prompt = f"""You are a physical therapist analyzing a patient exercise session. Generate a professional clinical summary.
+    return f"""You are a physical therapist analyzing a patient exercise session. Generate a professional clinical summary.
 
 **Session Context:**
 - Exercise: {exercise_name}
@@ -852,37 +1267,47 @@ Generate a clinical summary in JSON format (no markdown):
   "key_observations": "Any important clinical observations"
 }}"""
 
+@app.post("/api/meeting-mode/generate-summary")
+async def generate_summary(request: SummaryRequest):
+    """Generate comprehensive clinical summary using Claude"""
+    
+    api_key = os.getenv("ANTHROPIC_API_KEY")
+    if not api_key:
+        raise HTTPException(status_code=500, detail="API key not configured")
+    
+    if len(request.transcript) < 50:
+        return {"error": "Transcript too short for summary"}
+    
+    prompt = build_summary_prompt(request)
+
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                "https://api.anthropic.com/v1/messages",
-                headers={
-                    "Content-Type": "application/json",
-                    "x-api-key": api_key,
-                    "anthropic-version": "2023-06-01"
-                },
-                json={
-                    "model": "claude-sonnet-4-20250514",
-                    "max_tokens": 1500,
-                    "messages": [{"role": "user", "content": prompt}]
-                },
-                timeout=30.0
-            )
-            
-            if response.status_code != 200:
-                raise HTTPException(status_code=response.status_code, detail="Claude API error")
-            
-            data = response.json()
-            text = data['content'][0]['text'].strip()
-            
-            if text.startswith('```json'):
-                text = text.replace('```json\n', '').replace('\n```', '')
-            elif text.startswith('```'):
-                text = text.replace('```\n', '').replace('\n```', '')
-            
-            result = json.loads(text)
-            return result
-            
+        result = await llm_gateway.complete_json(prompt, max_tokens=1500, timeout=30.0)
+        return result
+        
     except Exception as e:
         print(f"Error generating summary: {e}")
-        return {"error": str(e)}
\ No newline at end of file
+        return {"error": str(e)}
+
+@app.post("/api/meeting-mode/generate-summary/stream")
+async def stream_generate_summary(request: SummaryRequest):
+    """Server-sent-event variant of /api/meeting-mode/generate-summary"""
+    
+    api_key = os.getenv("ANTHROPIC_API_KEY")
+    if not api_key:
+        raise HTTPException(status_code=500, detail="API key not configured")
+    
+    async def events():
+        if len(request.transcript) < 50:
+            yield sse_event("error", {"detail": "Transcript too short for summary"})
+            return
+        
+        result = {}
+        try:
+            async for event in stream_claude_json(build_summary_prompt(request), 1500, 30.0, SUMMARY_FIELDS, result):
+                yield event
+            yield sse_event("done", result["value"])
+        except Exception as e:
+            print(f"Error generating summary: {e}")
+            yield sse_event("error", {"detail": str(e)})
+    
+    return sse_response(events())
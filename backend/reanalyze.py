@@ -0,0 +1,323 @@
+"""
+Re-run pose analysis over every stored recording
+
+Use after changing analysis thresholds (services/pose_analysis.py,
+services/rep_counting.py) to see their effect on the whole session history.
+Recordings are streamed from storage a page at a time in session id order and
+analyzed on all cores. Each run writes to <out>/<run>/:
+
+    sessions.jsonl   one line per session: issue counts by type and severity, reps
+    checkpoint.json  last session id done, output offset, running totals
+    report.json      totals, plus a diff against the baseline run (written at the end)
+
+Progress is checkpointed after every page, so a run can be interrupted at any
+point; running the same command again resumes after the last checkpoint. The
+baseline defaults to the most recently finished other run in <out>.
+
+Usage (from the backend directory):
+    python reanalyze.py --run tremor-0.010
+    python reanalyze.py --run tremor-0.010 --baseline tremor-0.008 --workers 8
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
+from services import pose_analysis, rep_counting
+from services.analysis_jobs import analyze_recording
+from services.exercise_catalog import ExerciseCatalog
+from services.exercise_configs import BUILTIN_EVALUATORS, ExerciseEvaluator
+from services.pose_frames import PoseFrameFormatError, decode_pose_frames
+from services.storage import storage
+
+SESSIONS_FILE = "sessions.jsonl"
+CHECKPOINT_FILE = "checkpoint.json"
+REPORT_FILE = "report.json"
+
+_evaluators: Dict[int, ExerciseEvaluator] = {}
+
+
+def _init_worker(evaluators: Dict[int, ExerciseEvaluator]):
+    _evaluators.update(evaluators)
+
+
+def summarize_recordings(items: List[Tuple[int, bytes]]) -> List[Dict]:
+    """Worker: summaries of a chunk of (session_id, packed frames) recordings"""
+    return [summarize_recording(item) for item in items]
+
+
+def summarize_recording(item: Tuple[int, bytes]) -> Dict:
+    """Decode and analyze one stored recording into its summary line"""
+    session_id, data = item
+    try:
+        recording = decode_pose_frames(data)
+        analysis = analyze_recording(_evaluators.get(recording.exercise_id), recording.landmarks, recording.timestamps)
+    except (PoseFrameFormatError, ValueError) as e:
+        return {"session_id": session_id, "error": str(e)}
+    return {
+        "session_id": session_id,
+        "exercise_id": recording.exercise_id,
+        "frames": recording.frame_count,
+        "totalIssues": analysis["totalIssues"],
+        "byType": analysis["summary"]["byType"],
+        "bySeverity": analysis["summary"]["bySeverity"],
+        "reps": analysis["reps"]["repCount"] if analysis["reps"] else None,
+    }
+
+
+def analysis_parameters() -> Dict:
+    """Module-level analysis constants, recorded with each run"""
+    return {
+        f"{module.__name__.split('.')[-1]}.{name}": value
+        for module in (pose_analysis, rep_counting)
+        for name, value in vars(module).items()
+        if name.isupper() and isinstance(value, (int, float))
+    }
+
+
+def empty_totals() -> Dict:
+    return {"sessions": 0, "failed": 0, "frames": 0, "issues": 0, "reps": 0, "byType": {}, "bySeverity": {}}
+
+
+def add_to_totals(totals: Dict, summary: Dict):
+    totals["sessions"] += 1
+    if "error" in summary:
+        totals["failed"] += 1
+        return
+    totals["frames"] += summary["frames"]
+    totals["issues"] += summary["totalIssues"]
+    totals["reps"] += summary["reps"] or 0
+    for key in ("byType", "bySeverity"):
+        counts = Counter(totals[key])
+        counts.update(summary[key])
+        totals[key] = dict(counts)
+
+
+def write_json(path: str, data: Dict):
+    """Atomically replace a JSON file"""
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(data, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def read_json(path: str) -> Optional[Dict]:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+class Run:
+    """Output directory of one re-analysis run, with its checkpoint"""
+
+    def __init__(self, out_dir: str, name: str):
+        self.name = name
+        self.path = os.path.join(out_dir, name)
+        os.makedirs(self.path, exist_ok=True)
+        self.sessions_path = os.path.join(self.path, SESSIONS_FILE)
+        self.checkpoint_path = os.path.join(self.path, CHECKPOINT_FILE)
+        self.checkpoint = read_json(self.checkpoint_path) or {
+            "run": name,
+            "started_at": time.time(),
+            "finished_at": None,
+            "last_session_id": 0,
+            "offset": 0,
+            "parameters": analysis_parameters(),
+            "totals": empty_totals(),
+        }
+
+        # Drop lines written after the last checkpoint (interrupted mid-page)
+        with open(self.sessions_path, "a+b") as f:
+            f.truncate(self.checkpoint["offset"])
+        self._sessions = open(self.sessions_path, "ab")
+
+    @property
+    def finished(self) -> bool:
+        return self.checkpoint["finished_at"] is not None
+
+    def record(self, summaries: List[Dict]):
+        """Append a page of summaries, then checkpoint past it"""
+        for summary in summaries:
+            self._sessions.write(json.dumps(summary).encode() + b"\n")
+            add_to_totals(self.checkpoint["totals"], summary)
+        self._sessions.flush()
+        os.fsync(self._sessions.fileno())
+        self.checkpoint["offset"] = self._sessions.tell()
+        self.checkpoint["last_session_id"] = summaries[-1]["session_id"]
+        write_json(self.checkpoint_path, self.checkpoint)
+
+    def finish(self, report: Dict):
+        self.checkpoint["finished_at"] = time.time()
+        write_json(os.path.join(self.path, REPORT_FILE), report)
+        write_json(self.checkpoint_path, self.checkpoint)
+
+    def close(self):
+        self._sessions.close()
+
+
+def iter_sessions(path: str) -> Iterator[Dict]:
+    with open(path) as f:
+        for line in f:
+            yield json.loads(line)
+
+
+def latest_finished_run(out_dir: str, exclude: str) -> Optional[str]:
+    finished = []
+    for name in os.listdir(out_dir):
+        checkpoint = read_json(os.path.join(out_dir, name, CHECKPOINT_FILE))
+        if name != exclude and checkpoint and checkpoint.get("finished_at"):
+            finished.append((checkpoint["finished_at"], name))
+    return max(finished)[1] if finished else None
+
+
+def diff_runs(baseline_path: str, current_path: str, baseline_totals: Dict, current_totals: Dict,
+              limit: int) -> Dict:
+    """
+    Compare two runs session by session
+
+    Both sessions.jsonl files are in session id order, so they are merged in a
+    single pass without loading either into memory.
+    """
+    def delta(key: str) -> Dict:
+        before, after = baseline_totals[key], current_totals[key]
+        return {k: after.get(k, 0) - before.get(k, 0) for k in sorted(set(before) | set(after))
+                if after.get(k, 0) != before.get(k, 0)}
+
+    changed, only_baseline, only_current = 0, 0, 0
+    examples = []
+    baseline, current = iter_sessions(baseline_path), iter_sessions(current_path)
+    a, b = next(baseline, None), next(current, None)
+    while a is not None or b is not None:
+        if b is None or (a is not None and a["session_id"] < b["session_id"]):
+            only_baseline += 1
+            a = next(baseline, None)
+        elif a is None or b["session_id"] < a["session_id"]:
+            only_current += 1
+            b = next(current, None)
+        else:
+            if a.get("byType") != b.get("byType") or a.get("reps") != b.get("reps") or a.get("error") != b.get("error"):
+                changed += 1
+                if len(examples) < limit:
+                    examples.append({"session_id": a["session_id"], "before": a, "after": b})
+            a, b = next(baseline, None), next(current, None)
+
+    return {
+        "issues": current_totals["issues"] - baseline_totals["issues"],
+        "reps": current_totals["reps"] - baseline_totals["reps"],
+        "byType": delta("byType"),
+        "bySeverity": delta("bySeverity"),
+        "sessions_changed": changed,
+        "sessions_only_in_baseline": only_baseline,
+        "sessions_only_in_run": only_current,
+        "examples": examples,
+    }
+
+
+async def load_evaluators() -> Dict[int, ExerciseEvaluator]:
+    catalog = ExerciseCatalog([], storage)
+    await catalog.sync()
+    evaluators = dict(BUILTIN_EVALUATORS)
+    for exercise in catalog.custom():
+        evaluator = catalog.evaluator(exercise["id"])
+        if evaluator is not None:
+            evaluators[exercise["id"]] = evaluator
+    return evaluators
+
+
+async def reanalyze(args) -> Dict:
+    if not storage.multi_worker_safe:
+        raise SystemExit("Re-analysis reads persistent storage; set STORAGE_BACKEND=sqlite")
+
+    run_path = os.path.join(args.out, args.run)
+    if args.restart and os.path.isdir(run_path):
+        shutil.rmtree(run_path)
+    run = Run(args.out, args.run)
+    if run.finished:
+        print(f"Run {args.run} already finished; pass --restart to run it again")
+        return read_json(os.path.join(run.path, REPORT_FILE))
+
+    await storage.open()
+    try:
+        evaluators = await load_evaluators()
+        executor = ProcessPoolExecutor(args.workers, mp_context=multiprocessing.get_context("spawn"),
+                                       initializer=_init_worker, initargs=(evaluators,))
+        started, done = time.monotonic(), 0
+        if run.checkpoint["last_session_id"]:
+            print(f"Resuming {args.run} after session {run.checkpoint['last_session_id']}")
+
+        try:
+            page = await storage.list_pose_recordings(run.checkpoint["last_session_id"], args.page_size)
+            while page:
+                # Fetch the next page while this one is analyzed
+                next_page = asyncio.create_task(
+                    storage.list_pose_recordings(page[-1]["session_id"], args.page_size))
+                items = [(recording["session_id"], recording["data"]) for recording in page]
+                chunks = await asyncio.gather(*(
+                    asyncio.wrap_future(executor.submit(summarize_recordings, items[i:i + args.chunk_size]))
+                    for i in range(0, len(items), args.chunk_size)
+                ))
+                run.record([summary for chunk in chunks for summary in chunk])
+
+                done += len(items)
+                elapsed = time.monotonic() - started
+                print(f"{run.checkpoint['totals']['sessions']} sessions "
+                      f"(last id {run.checkpoint['last_session_id']}, {done / elapsed:.1f}/s)", flush=True)
+                page = await next_page
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+    finally:
+        run.close()
+        await storage.close()
+
+    report = {"run": args.run, "parameters": run.checkpoint["parameters"], "totals": run.checkpoint["totals"]}
+    baseline = args.baseline or latest_finished_run(args.out, args.run)
+    if baseline:
+        baseline_run = os.path.join(args.out, baseline)
+        baseline_checkpoint = read_json(os.path.join(baseline_run, CHECKPOINT_FILE))
+        if not baseline_checkpoint:
+            raise SystemExit(f"Baseline run {baseline} not found in {args.out}")
+        report["baseline"] = baseline
+        report["diff"] = diff_runs(
+            os.path.join(baseline_run, SESSIONS_FILE), run.sessions_path,
+            baseline_checkpoint["totals"], run.checkpoint["totals"], args.diff_examples,
+        )
+    run.finish(report)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-run pose analysis over all stored recordings")
+    parser.add_argument("--run", default=time.strftime("run-%Y%m%d-%H%M%S"),
+                        help="Run name; an unfinished run with this name is resumed")
+    parser.add_argument("--out", default="reanalysis", help="Directory holding all runs")
+    parser.add_argument("--baseline", help="Run to diff against (default: latest finished run)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--page-size", type=int, default=256, help="Recordings per storage page / checkpoint")
+    parser.add_argument("--chunk-size", type=int, default=8, help="Recordings per worker task")
+    parser.add_argument("--diff-examples", type=int, default=20, help="Changed sessions listed in the report")
+    parser.add_argument("--restart", action="store_true", help="Discard an existing run with this name")
+    args = parser.parse_args()
+
+    os.makedirs(args.out, exist_ok=True)
+    try:
+        report = asyncio.run(reanalyze(args))
+    except KeyboardInterrupt:
+        print(f"Interrupted; run with --run {args.run} again to resume", file=sys.stderr)
+        sys.exit(130)
+    if report:
+        json.dump({k: v for k, v in report.items() if k != "parameters"}, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
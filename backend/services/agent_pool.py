@@ -0,0 +1,300 @@
+from dotenv import load_dotenv
+import os
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Callable, Deque, Dict, Optional, Set
+from claude_agent_sdk import ClaudeAgentOptions, ClaudeSDKClient
+
+load_dotenv()
+
+
+def _env_float(name: str, default: float) -> float:
+    value = os.getenv(name)
+    return float(value) if value else default
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    return int(value) if value else default
+
+
+class AgentPoolError(Exception):
+    pass
+
+
+class AgentSession:
+    """One connected agent client and the MCP server processes it started"""
+
+    def __init__(self, client: ClaudeSDKClient):
+        self.client = client
+        self.created_at = time.monotonic()
+        self.uses = 0
+        # Set when a query fails or is abandoned mid-response; the session is then discarded
+        self.broken = False
+
+    @property
+    def age(self) -> float:
+        return time.monotonic() - self.created_at
+
+
+class AgentPool:
+    """
+    Warm, long-lived Claude agent clients with their MCP servers
+
+    Connecting a client starts the agent CLI and every configured MCP server
+    (e.g. `npx -y @brightdata/mcp`), which costs seconds of process startup and
+    package resolution. The pool keeps up to `size` connected sessions and hands
+    them out one query at a time, so a query pays only for the work itself.
+    At most `size` queries run at once; further callers wait up to
+    `acquire_timeout` for a session. Every query starts a fresh conversation:
+    a returned session has its conversation cleared (the CLI's local /clear
+    command) before it is handed out again, so no query sees an earlier one.
+    A session is replaced after `max_uses` queries or `max_age` seconds, after
+    any failed query, and when the periodic health check finds one of its MCP
+    servers disconnected and cannot reconnect it.
+    """
+
+    def __init__(self, name: str, options_factory: Callable[[], ClaudeAgentOptions], default_size: int = 2):
+        self.name = name
+        self.options_factory = options_factory
+        prefix = name.upper()
+        self.size = _env_int(f"{prefix}_POOL_SIZE", default_size)
+        self.max_uses = _env_int(f"{prefix}_POOL_MAX_USES", 10)
+        self.max_age = _env_float(f"{prefix}_POOL_MAX_AGE", 1800.0)
+        self.acquire_timeout = _env_float(f"{prefix}_POOL_ACQUIRE_TIMEOUT", 30.0)
+        self.connect_timeout = _env_float(f"{prefix}_POOL_CONNECT_TIMEOUT", 60.0)
+        self.health_interval = _env_float(f"{prefix}_POOL_HEALTH_INTERVAL", 60.0)
+
+        self._idle: Deque[AgentSession] = deque()
+        self._in_use: Set[AgentSession] = set()
+        self._checking: Set[AgentSession] = set()
+        self._slots = asyncio.Semaphore(self.size)
+        self._connecting: Set[asyncio.Task] = set()
+        self._disconnecting: Set[asyncio.Task] = set()
+        self._clearing: Set[asyncio.Task] = set()
+        self._health_task: Optional[asyncio.Task] = None
+        self._closed = False
+        self._stats = {
+            "queries": 0,
+            "failed": 0,
+            "connects": 0,
+            "connect_failures": 0,
+            "recycled": 0,
+            "unhealthy": 0,
+            "waits": 0,
+            "wait_time_total": 0.0,
+            "connect_time_total": 0.0,
+        }
+
+    def start(self):
+        """Connect the sessions in the background and start health checks (FastAPI lifespan hook)"""
+        self._closed = False
+        for _ in range(self.size - len(self._idle) - len(self._in_use)):
+            self._spawn_replacement()
+        if self._health_task is None:
+            self._health_task = asyncio.create_task(self._health_loop())
+
+    async def close(self):
+        """Stop health checks and disconnect every session"""
+        self._closed = True
+        if self._health_task is not None:
+            self._health_task.cancel()
+            self._health_task = None
+        for task in list(self._connecting) + list(self._clearing):
+            task.cancel()
+        sessions = list(self._idle) + list(self._in_use) + list(self._checking)
+        self._idle.clear()
+        await asyncio.gather(
+            *self._connecting, *self._clearing, *self._disconnecting, *(self._disconnect(session) for session in sessions),
+            return_exceptions=True,
+        )
+
+    async def _connect(self) -> AgentSession:
+        started = time.perf_counter()
+        client = ClaudeSDKClient(options=self.options_factory())
+        try:
+            await asyncio.wait_for(client.connect(), self.connect_timeout)
+        except BaseException:
+            self._stats["connect_failures"] += 1
+            await asyncio.shield(self._disconnect_client(client))
+            raise
+        self._stats["connects"] += 1
+        self._stats["connect_time_total"] += time.perf_counter() - started
+        return AgentSession(client)
+
+    @staticmethod
+    async def _disconnect_client(client: ClaudeSDKClient):
+        try:
+            await client.disconnect()
+        except Exception as e:
+            print(f"Agent client disconnect error: {e}")
+
+    async def _disconnect(self, session: AgentSession):
+        await self._disconnect_client(session.client)
+
+    def _spawn_replacement(self):
+        """Connect a new idle session in the background (warming it ahead of the next query)"""
+        if self._closed:
+            return
+
+        async def replace():
+            try:
+                session = await self._connect()
+            except Exception as e:
+                print(f"❌ {self.name} agent session failed to start: {e}")
+                return
+            self._park(session)
+
+        task = asyncio.create_task(replace())
+        self._connecting.add(task)
+        task.add_done_callback(self._connecting.discard)
+
+    def _retire(self, session: AgentSession, stat: Optional[str] = None, replace: bool = True):
+        """Disconnect a session in the background and (by default) warm a replacement"""
+        if stat:
+            self._stats[stat] += 1
+        task = asyncio.create_task(self._disconnect(session))
+        self._disconnecting.add(task)
+        task.add_done_callback(self._disconnecting.discard)
+        if replace:
+            self._spawn_replacement()
+
+    @staticmethod
+    async def _clear_conversation(client: ClaudeSDKClient):
+        # Handled by the CLI itself, without a model call
+        await client.query("/clear")
+        async for _ in client.receive_response():
+            pass
+
+    def _clear(self, session: AgentSession):
+        """Clear a returned session's conversation in the background, then park it and release its slot"""
+        self._checking.add(session)
+
+        async def clear():
+            try:
+                await asyncio.wait_for(self._clear_conversation(session.client), self.connect_timeout)
+                cleared = True
+            except Exception as e:
+                print(f"❌ {self.name} agent session failed to clear its conversation: {e}")
+                cleared = False
+            finally:
+                self._checking.discard(session)
+                self._slots.release()
+            if cleared:
+                self._park(session)
+            else:
+                self._retire(session, "failed")
+
+        task = asyncio.create_task(clear())
+        self._clearing.add(task)
+        task.add_done_callback(self._clearing.discard)
+
+    def _park(self, session: AgentSession):
+        """Return a session to the idle queue, or drop it if the pool is full or closed"""
+        if self._closed or len(self._idle) + len(self._in_use) + len(self._checking) >= self.size:
+            self._retire(session, replace=False)
+        else:
+            self._idle.append(session)
+
+    @asynccontextmanager
+    async def session(self):
+        """
+        Check out a connected session for one query
+
+        Set `broken` on the yielded session if its response was not read to
+        the end; it is then discarded instead of reused.
+
+        Raises:
+            AgentPoolError: If no session frees up within acquire_timeout
+        """
+        if self._slots.locked():
+            self._stats["waits"] += 1
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.acquire_timeout)
+        except asyncio.TimeoutError:
+            raise AgentPoolError(f"No {self.name} agent session available")
+        self._stats["wait_time_total"] += time.perf_counter() - started
+
+        session = None
+        release = True
+        try:
+            while self._idle:
+                candidate = self._idle.popleft()
+                if candidate.age < self.max_age:
+                    session = candidate
+                    break
+                self._retire(candidate, "recycled")
+            if session is None:
+                # Nothing warm yet (startup, or replacements still connecting)
+                session = await self._connect()
+            self._in_use.add(session)
+            session.uses += 1
+            self._stats["queries"] += 1
+            try:
+                yield session
+            except BaseException:
+                # Includes cancellation mid-response: the client may still be streaming
+                session.broken = True
+                raise
+        finally:
+            if session is not None:
+                self._in_use.discard(session)
+                if session.broken:
+                    self._retire(session, "failed")
+                elif session.uses >= self.max_uses or session.age >= self.max_age or self._closed:
+                    self._retire(session, "recycled")
+                else:
+                    # Waiters keep waiting for this session rather than connecting a cold one
+                    self._clear(session)
+                    release = False
+            if release:
+                self._slots.release()
+
+    async def _check(self, session: AgentSession) -> bool:
+        """Whether every MCP server of an idle session is connected (reconnecting failed ones once)"""
+        status = await asyncio.wait_for(session.client.get_mcp_status(), self.connect_timeout)
+        healthy = True
+        for server in status.get("mcpServers", []):
+            if server.get("status") == "connected":
+                continue
+            try:
+                await asyncio.wait_for(session.client.reconnect_mcp_server(server["name"]), self.connect_timeout)
+            except Exception:
+                healthy = False
+        return healthy
+
+    async def _health_loop(self):
+        while True:
+            await asyncio.sleep(self.health_interval)
+            # Only idle sessions are checked; ones in use are checked when they return
+            for _ in range(len(self._idle)):
+                session = self._idle.popleft()
+                self._checking.add(session)
+                try:
+                    healthy = session.age < self.max_age and await self._check(session)
+                except Exception:
+                    healthy = False
+                finally:
+                    self._checking.discard(session)
+                if healthy:
+                    self._park(session)
+                else:
+                    self._retire(session, "unhealthy")
+
+    def metrics(self) -> Dict:
+        connects = self._stats["connects"]
+        queries = self._stats["queries"]
+        return {
+            **self._stats,
+            "size": self.size,
+            "max_uses": self.max_uses,
+            "max_age": self.max_age,
+            "idle": len(self._idle),
+            "in_use": len(self._in_use),
+            "connecting": len(self._connecting),
+            "avg_connect_time": self._stats["connect_time_total"] / connects if connects else 0.0,
+            "avg_wait_ms": round(self._stats["wait_time_total"] / queries * 1000, 3) if queries else 0.0,
+        }
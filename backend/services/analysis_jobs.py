@@ -0,0 +1,311 @@
+from dotenv import load_dotenv
+import os
+import asyncio
+import multiprocessing
+import time
+import uuid
+from concurrent.futures import Future, ProcessPoolExecutor
+from functools import partial
+from multiprocessing import shared_memory
+from typing import Dict, Optional, Set, Tuple
+import numpy as np
+from services.exercise_configs import ConfigLike
+from services.pose_analysis import SessionAnalyzer
+from services.rep_counting import count_reps
+from services.storage import Repository, storage
+
+load_dotenv()
+
+
+def _env_float(name: str, default: float) -> float:
+    value = os.getenv(name)
+    return float(value) if value else default
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    return int(value) if value else default
+
+
+class AnalysisQueueFull(Exception):
+    pass
+
+
+class AnalysisJobError(Exception):
+    def __init__(self, job: "AnalysisJob"):
+        super().__init__(job.error or job.status)
+        self.job = job
+
+
+def _share_frames(landmarks: np.ndarray, timestamps: np.ndarray) -> Tuple[shared_memory.SharedMemory, Dict]:
+    """Copy landmarks and timestamps into one shared memory block, returning it and its layout"""
+    landmarks = np.ascontiguousarray(landmarks)
+    timestamps = np.ascontiguousarray(timestamps, dtype=np.float64)
+    offset = -(-landmarks.nbytes // 8) * 8
+    block = shared_memory.SharedMemory(create=True, size=max(offset + timestamps.nbytes, 1))
+    np.ndarray(landmarks.shape, landmarks.dtype, buffer=block.buf)[...] = landmarks
+    np.ndarray(timestamps.shape, timestamps.dtype, buffer=block.buf, offset=offset)[...] = timestamps
+    layout = {
+        "name": block.name,
+        "shape": landmarks.shape,
+        "dtype": landmarks.dtype.str,
+        "offset": offset,
+        "frames": len(timestamps),
+    }
+    return block, layout
+
+
+def analyze_recording(exercise_config: ConfigLike, landmarks: np.ndarray, timestamps: np.ndarray) -> Dict:
+    """Session analysis plus the server-side rep count ("reps", None without angle-based rep counting)"""
+    analyzer = SessionAnalyzer(exercise_config)
+    analysis = analyzer.analyze_session(landmarks, timestamps)
+    analysis["reps"] = count_reps(analyzer.evaluator, landmarks, timestamps)
+    return analysis
+
+
+def _analyze_shared(config: ConfigLike, layout: Dict) -> Dict:
+    """Worker process entry point: analyze frames read in place from shared memory"""
+    block = shared_memory.SharedMemory(name=layout["name"])
+    try:
+        landmarks = np.ndarray(layout["shape"], np.dtype(layout["dtype"]), buffer=block.buf)
+        timestamps = np.ndarray((layout["frames"],), np.float64, buffer=block.buf, offset=layout["offset"])
+        result = analyze_recording(config, landmarks, timestamps)
+        del landmarks, timestamps
+        return result
+    finally:
+        block.close()
+
+
+def _warm_up() -> int:
+    # Importing this module in the worker loads NumPy and the analyzer ahead of the first job
+    return os.getpid()
+
+
+class AnalysisJob:
+    """One session analysis submitted to the scheduler"""
+
+    def __init__(self, job_id: str, exercise_id: int, frames: int, session_id: Optional[int] = None):
+        self.job_id = job_id
+        self.exercise_id = exercise_id
+        self.session_id = session_id
+        self.frames = frames
+        self.status = "queued"
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.result: Optional[Dict] = None
+        self.error: Optional[str] = None
+        self.future: Optional[Future] = None
+        self.task: Optional[asyncio.Task] = None
+        # Status last written to storage
+        self.saved_status: Optional[str] = None
+
+    @property
+    def done(self) -> bool:
+        return self.finished_at is not None
+
+    @property
+    def current_status(self) -> str:
+        if self.status == "queued" and self.future is not None and self.future.running():
+            return "running"
+        return self.status
+
+    def to_dict(self) -> Dict:
+        job = {
+            "job_id": self.job_id,
+            "status": self.current_status,
+            "exercise_id": self.exercise_id,
+            "session_id": self.session_id,
+            "frames": self.frames,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+        }
+        if self.error:
+            job["error"] = self.error
+        if self.result is not None:
+            job["result"] = self.result
+        return job
+
+
+class AnalysisScheduler:
+    """
+    Runs CPU-bound session analysis in a process pool, off the event loop
+
+    At most max_queue jobs are queued or running at once; submit() raises
+    AnalysisQueueFull beyond that so callers can shed load instead of piling
+    work up. Frames are handed to the worker through shared memory rather
+    than pickled. A job that exceeds its timeout or is cancelled before a
+    worker picks it up never runs; one already running finishes in its worker
+    and its result is discarded. With ANALYSIS_WORKERS=0 jobs run in a thread
+    instead (for development and single-core hosts).
+
+    Job status and results are kept in storage, so any worker can answer a
+    status lookup. A cancellation requested through storage is picked up by
+    the worker running the job within `poll_interval` seconds.
+    """
+
+    def __init__(self, storage: Repository):
+        self.storage = storage
+        self.workers = _env_int("ANALYSIS_WORKERS", os.cpu_count() or 1)
+        self.max_queue = _env_int("ANALYSIS_MAX_QUEUE", 32)
+        self.timeout = _env_float("ANALYSIS_JOB_TIMEOUT", 60.0)
+        self.poll_interval = _env_float("ANALYSIS_JOB_POLL_INTERVAL", 1.0)
+
+        self._executor: Optional[ProcessPoolExecutor] = None
+        # Unfinished jobs of this worker
+        self._jobs: Dict[str, AnalysisJob] = {}
+        self._saving: Set[asyncio.Task] = set()
+        self._poll_task: Optional[asyncio.Task] = None
+        self._active = 0
+        self._stats = {
+            "submitted": 0,
+            "rejected": 0,
+            "completed": 0,
+            "failed": 0,
+            "timed_out": 0,
+            "cancelled": 0,
+            "latency_total": 0.0,
+        }
+
+    def start(self):
+        """Create the worker pool (called from the FastAPI lifespan hook)"""
+        if self._executor is None and self.workers > 0:
+            # spawn: forking a process that runs the event loop and storage threads is unsafe
+            self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+            for _ in range(self.workers):
+                self._executor.submit(_warm_up)
+        if self._poll_task is None:
+            self._poll_task = asyncio.create_task(self._poll_loop())
+
+    async def close(self):
+        """Cancel outstanding jobs, record them as cancelled and stop the workers"""
+        if self._poll_task is not None:
+            self._poll_task.cancel()
+            self._poll_task = None
+        tasks = [job.task for job in self._jobs.values() if job.task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await asyncio.gather(*self._saving, return_exceptions=True)
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def submit(self, exercise_config: ConfigLike, exercise_id: int, landmarks: np.ndarray,
+                     timestamps: np.ndarray, session_id: Optional[int] = None) -> AnalysisJob:
+        """
+        Queue an analysis of a (frames x 33 x channels) landmark array
+
+        Raises:
+            AnalysisQueueFull: If max_queue jobs are already queued or running
+        """
+        if self._active >= self.max_queue:
+            self._stats["rejected"] += 1
+            raise AnalysisQueueFull("Analysis queue is full")
+
+        job = AnalysisJob(uuid.uuid4().hex, exercise_id, len(timestamps), session_id)
+        # Counted before the first save so concurrent submits cannot overshoot max_queue
+        self._active += 1
+        try:
+            await self.storage.save_analysis_job(job.to_dict())
+        except BaseException:
+            self._active -= 1
+            raise
+        job.saved_status = job.status
+        self._jobs[job.job_id] = job
+        self._stats["submitted"] += 1
+        job.task = asyncio.create_task(self._run(job, exercise_config, landmarks, timestamps))
+        job.task.add_done_callback(partial(self._finish, job))
+        return job
+
+    async def _run(self, job: AnalysisJob, exercise_config: ConfigLike, landmarks: np.ndarray,
+                   timestamps: np.ndarray):
+        try:
+            if self._executor is None:
+                work = asyncio.to_thread(analyze_recording, exercise_config, landmarks, timestamps)
+            else:
+                block, layout = _share_frames(landmarks, timestamps)
+                job.future = self._executor.submit(_analyze_shared, exercise_config, layout)
+                # Released once the worker is done with it (or the job is dropped before it starts)
+                job.future.add_done_callback(lambda _: (block.close(), block.unlink()))
+                work = asyncio.wrap_future(job.future)
+            job.result = await asyncio.wait_for(work, self.timeout)
+            job.status = "completed"
+        except asyncio.TimeoutError:
+            job.status = "timed_out"
+            job.error = f"Analysis exceeded {self.timeout:g}s"
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e) or type(e).__name__
+
+    def _finish(self, job: AnalysisJob, task: asyncio.Task):
+        # Done callback rather than `finally`, so jobs cancelled before their task first runs are counted too
+        if task.cancelled():
+            job.status = "cancelled"
+        job.finished_at = time.time()
+        del self._jobs[job.job_id]
+        self._active -= 1
+        self._stats[job.status] += 1
+        if job.status == "completed":
+            self._stats["latency_total"] += job.finished_at - job.created_at
+        self._save(job)
+
+    def _save(self, job: AnalysisJob):
+        job.saved_status = job.current_status
+        task = asyncio.create_task(self.storage.save_analysis_job(job.to_dict()))
+        self._saving.add(task)
+        task.add_done_callback(partial(self._saved, job))
+
+    def _saved(self, job: AnalysisJob, task: asyncio.Task):
+        self._saving.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            print(f"❌ Saving analysis job {job.job_id}: {task.exception()}")
+
+    async def _poll_loop(self):
+        # Carries out cancellations requested through storage and records when queued jobs start running
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            if not self._jobs:
+                continue
+            try:
+                for job_id in await self.storage.cancel_requested_analysis_jobs():
+                    self.cancel(job_id)
+            except Exception as e:
+                print(f"❌ Polling analysis job cancellations: {e}")
+            for job in list(self._jobs.values()):
+                if job.current_status != job.saved_status:
+                    self._save(job)
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a job if this worker is running it (others pick the request up from storage)"""
+        job = self._jobs.get(job_id)
+        if job is None or job.task is None:
+            return False
+        job.task.cancel()
+        return True
+
+    async def wait(self, job: AnalysisJob) -> Dict:
+        """
+        Wait for a job's result (cancelling the caller does not cancel the job)
+
+        Raises:
+            AnalysisJobError: If the job failed, timed out or was cancelled
+        """
+        await asyncio.wait({job.task})
+        if job.status != "completed":
+            raise AnalysisJobError(job)
+        return job.result
+
+    def metrics(self) -> Dict:
+        completed = self._stats["completed"]
+        return {
+            **self._stats,
+            "active": self._active,
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "timeout": self.timeout,
+            "avg_latency": self._stats["latency_total"] / completed if completed else 0.0,
+        }
+
+
+# Shared instance used by main.py
+analysis_jobs = AnalysisScheduler(storage)
@@ -1,11 +1,14 @@
 from dotenv import load_dotenv
 import os
 import asyncio
-from claude_agent_sdk import query, ClaudeAgentOptions
+import shlex
+from claude_agent_sdk import ClaudeAgentOptions
 from claude_agent_sdk.types import StreamEvent
-from typing import List, Dict
-import json
+from typing import AsyncIterator, List, Dict, Optional
+from urllib.parse import urlsplit
 import re
+from services.agent_pool import AgentPool
+from services.json_stream import IncrementalJSONArrayParser
 
 load_dotenv()
 
@@ -19,41 +22,104 @@ if not BRIGHTDATA_API_TOKEN:
     raise ValueError("BRIGHTDATA_API_TOKEN not found in environment variables")
 
 
-class BrightDataService:
-    """Service for scraping physiology research using BrightData Web MCP and Claude Agent SDK"""
-    
-    def __init__(self):
-        # Configure the Claude agent with BrightData Web MCP
-        self.options = ClaudeAgentOptions(
-            mcp_servers={
-                "bright_data": {
-                    "command": "npx",
-                    "args": ["-y", "@brightdata/mcp"],
-                    "env": {
-                        "API_TOKEN": BRIGHTDATA_API_TOKEN,
-                        "PRO_MODE": "true"  # Enable Pro mode for full tool access
-                    }
-                }
-            },
-            allowed_tools=["mcp__bright_data__*"],  # Enable all Bright Data Web MCP tools
-            model="claude-sonnet-4-20250514",  # Use the latest Claude model
-            include_partial_messages=True,
-            permission_mode="acceptEdits",  # Allow file writing if needed
-            max_buffer_size=10 * 1024 * 1024,  # 10MB for handling large responses
-        )
-    
-    async def search_clinical_resources(self, query_text: str) -> List[Dict]:
-        """
-        Search multiple physiology research journals for relevant information
-        
-        Args:
-            query_text: Search query (e.g., "muscle physiology" or "exercise biomechanics")
-            
-        Returns:
-            List of research articles with title, url, authors, snippet, and source
-        """
-        
-        prompt = f"""Use ONLY the search_engine tool to find research articles about "{query_text}".
+# Command starting the BrightData MCP server (benchmarks/fake_mcp.py stands in for it offline)
+BRIGHTDATA_MCP_COMMAND = shlex.split(os.getenv("BRIGHTDATA_MCP_COMMAND", "npx -y @brightdata/mcp"))
+
+# Seconds one agent query may take before it is abandoned
+BRIGHTDATA_QUERY_TIMEOUT = float(os.getenv("BRIGHTDATA_QUERY_TIMEOUT", "180"))
+# Echo agent text and tool calls to stdout as they stream (debugging)
+BRIGHTDATA_LOG_STREAM = os.getenv("BRIGHTDATA_LOG_STREAM", "false").lower() == "true"
+
+# Search each journal source with its own agent query, concurrently
+BRIGHTDATA_FAN_OUT = os.getenv("BRIGHTDATA_FAN_OUT", "true").lower() != "false"
+# Seconds a fanned-out source search may take before results are returned without it
+BRIGHTDATA_SOURCE_DEADLINE = float(os.getenv("BRIGHTDATA_SOURCE_DEADLINE", "45"))
+
+# (source name, search_engine query prefix) of each journal source
+JOURNAL_SOURCES = [
+    ("Journal of Applied Physiology", "site:journals.physiology.org"),
+    ("The Journal of Physiology", "site:physoc.onlinelibrary.wiley.com"),
+    ("Mayo Clinic", "site:mayo.edu physiology"),
+]
+
+RESULT_FORMAT = """For EACH result, extract:
+- title
+- url (full link)
+- authors (if visible in search result)
+- snippet (brief description, max 200 chars)
+- source ({source})
+- pubDate (if visible)
+- doi (if visible)"""
+
+
+class SearchResults(list):
+    """Search results plus the outcome of each source ("ok", "empty", "timeout" or "error")"""
+
+    def __init__(self, results: List[Dict] = (), sources: Optional[Dict[str, str]] = None):
+        super().__init__(results)
+        self.sources = sources or {}
+
+    @property
+    def partial(self) -> bool:
+        """Whether a source timed out or failed (an empty source is a complete answer)"""
+        return any(status in ("timeout", "error") for status in self.sources.values())
+
+
+def parse_json_array(response_text: str) -> List[Dict]:
+    """Objects of the JSON array in an agent response (prose and code fences around it are ignored)"""
+    results = IncrementalJSONArrayParser().feed(response_text)
+    if not results:
+        print(f"Could not extract JSON from response: {response_text[:200]}...")
+    return results
+
+
+def _result_key(result: Dict) -> Optional[str]:
+    """Identity of an article: its DOI if known, else its URL without scheme, www, fragment or trailing slash"""
+    doi = (result.get("doi") or "").strip().lower()
+    doi = re.sub(r"^(https?://(dx\.)?doi\.org/|doi:\s*)", "", doi)
+    if doi.startswith("10."):
+        return f"doi:{doi}"
+    url = (result.get("url") or "").strip()
+    if not url:
+        return None
+    # A DOI link is the same article as its DOI
+    doi_in_url = re.search(r"(10\.\d{4,9}/[^\s?#]+)", url)
+    if doi_in_url:
+        return f"doi:{doi_in_url.group(1).lower().rstrip('/')}"
+    parts = urlsplit(url)
+    host = parts.netloc.lower().removeprefix("www.")
+    query = f"?{parts.query}" if parts.query else ""
+    return f"url:{host}{parts.path.rstrip('/')}{query}"
+
+
+def merge_results(result_lists: List[List[Dict]]) -> List[Dict]:
+    """
+    Concatenate result lists, dropping repeats of an article (same DOI or URL)
+
+    The first occurrence is kept; fields it lacks are filled from later ones.
+    """
+    merged: Dict[str, Dict] = {}
+    unkeyed = []
+    for results in result_lists:
+        for result in results:
+            if not isinstance(result, dict):
+                continue
+            key = _result_key(result)
+            if key is None:
+                unkeyed.append(result)
+            elif key not in merged:
+                merged[key] = dict(result)
+            else:
+                existing = merged[key]
+                for field, value in result.items():
+                    if value and not existing.get(field):
+                        existing[field] = value
+    return list(merged.values()) + unkeyed
+
+
+def combined_prompt(query_text: str) -> str:
+    """Prompt for one agent searching all journal sources in turn"""
+    return f"""Use ONLY the search_engine tool to find research articles about "{query_text}".
 
 IMPORTANT: You MUST get results from ALL THREE sources below. Search each one separately:
 
@@ -78,18 +144,79 @@ CRITICAL:
 
 [{{"title":"...","url":"...","authors":"...","snippet":"...","source":"...","pubDate":"...","doi":"..."}}]
 """
+
+
+def source_prompt(query_text: str, name: str, site_query: str) -> str:
+    """Prompt for one site-restricted search of a single journal source"""
+    return f"""Use ONLY the search_engine tool to find research articles about "{query_text}".
+
+Search "{site_query} {query_text}" once and take 3-4 results from {name}.
+
+{RESULT_FORMAT.format(source=name)}
+
+CRITICAL: 
+- Use ONLY search_engine tool (fastest), with a single search
+- Do NOT use scrape, grep, or batch tools
+- Return ONLY valid JSON array, no markdown
+
+[{{"title":"...","url":"...","authors":"...","snippet":"...","source":"{name}","pubDate":"...","doi":"..."}}]
+"""
+
+
+def agent_options() -> ClaudeAgentOptions:
+    """Configure the Claude agent with BrightData Web MCP"""
+    return ClaudeAgentOptions(
+        mcp_servers={
+            "bright_data": {
+                "command": BRIGHTDATA_MCP_COMMAND[0],
+                "args": BRIGHTDATA_MCP_COMMAND[1:],
+                "env": {
+                    "API_TOKEN": BRIGHTDATA_API_TOKEN,
+                    "PRO_MODE": "true"  # Enable Pro mode for full tool access
+                }
+            }
+        },
+        allowed_tools=["mcp__bright_data__*"],  # Enable all Bright Data Web MCP tools
+        model="claude-sonnet-4-20250514",  # Use the latest Claude model
+        include_partial_messages=True,
+        permission_mode="acceptEdits",  # Allow file writing if needed
+        max_buffer_size=10 * 1024 * 1024,  # 10MB for handling large responses
+    )
+
+
+# Warm agent clients (each with its own MCP server process) shared by all services;
+# one per journal source by default, so a fanned-out search never waits for a session
+brightdata_pool = AgentPool("brightdata", agent_options, default_size=len(JOURNAL_SOURCES))
+
+
+class BrightDataService:
+    """Service for scraping physiology research using BrightData Web MCP and Claude Agent SDK"""
+    
+    def __init__(self, pool: AgentPool = brightdata_pool):
+        self.pool = pool
+    
+    async def search_clinical_resources(self, query_text: str) -> List[Dict]:
+        """
+        Search multiple physiology research journals for relevant information
+        
+        With BRIGHTDATA_FAN_OUT (the default) each source is searched by its own
+        concurrent agent query (see search_sources); otherwise one agent searches
+        all three in turn.
+        
+        Args:
+            query_text: Search query (e.g., "muscle physiology" or "exercise biomechanics")
+            
+        Returns:
+            List of research articles with title, url, authors, snippet, and source
+        """
+        if BRIGHTDATA_FAN_OUT:
+            return await self.search_sources(query_text)
+        
+        prompt = combined_prompt(query_text)
         
         try:
             response_text = await self._execute_query(prompt)
-            
-            # Try to parse the response as JSON
-            json_match = re.search(r'\[[\s\S]*\]', response_text)
-            if json_match:
-                results = json.loads(json_match.group(0))
-                return results
-            else:
-                print(f"Could not extract JSON from response: {response_text[:200]}...")
-                return []
+            return merge_results([parse_json_array(response_text)])
                 
         except Exception as e:
             print(f"Error in search_clinical_resources: {e}")
@@ -97,6 +224,98 @@ CRITICAL:
             traceback.print_exc()
             return []
     
+    async def search_sources(self, query_text: str, deadline: float = BRIGHTDATA_SOURCE_DEADLINE) -> SearchResults:
+        """
+        Search every journal source concurrently and merge the results
+        
+        Each source gets its own agent query (one site-restricted search), so
+        latency is that of the slowest source rather than the sum of all three.
+        A source still running after `deadline` seconds is cancelled and the
+        results are returned with only the articles it produced before then.
+        
+        Args:
+            query_text: Search query
+            deadline: Seconds each source search may take
+            
+        Returns:
+            SearchResults de-duplicated by DOI / URL, with the outcome of each source
+        """
+        sources: Dict[str, str] = {}
+        results = [result async for result in self._fan_out(query_text, deadline, sources)]
+        return SearchResults(merge_results([results]), sources)
+    
+    async def stream_clinical_resources(self, query_text: str,
+                                        sources: Optional[Dict[str, str]] = None) -> AsyncIterator[Dict]:
+        """
+        Search for clinical resources, yielding each article as soon as it is parsed
+        
+        Articles arrive in the order the agents produce them (interleaved across
+        sources when fanning out); repeats of an article already yielded are
+        skipped. The outcome of each fanned-out source is recorded in `sources`.
+        
+        Args:
+            query_text: Search query
+            sources: Filled with source name -> "ok", "empty", "timeout" or "error"
+        """
+        sources = {} if sources is None else sources
+        if BRIGHTDATA_FAN_OUT:
+            results = self._fan_out(query_text, BRIGHTDATA_SOURCE_DEADLINE, sources)
+        else:
+            results = self.stream_items(combined_prompt(query_text))
+        
+        seen = set()
+        async for result in results:
+            key = _result_key(result)
+            if key is not None:
+                if key in seen:
+                    continue
+                seen.add(key)
+            yield result
+    
+    async def _fan_out(self, query_text: str, deadline: float, sources: Dict[str, str]) -> AsyncIterator[Dict]:
+        """
+        Raw results of every journal source, concurrently, in arrival order
+        
+        A source still running after `deadline` seconds is cancelled; the
+        articles it produced before then are kept.
+        """
+        queue: asyncio.Queue = asyncio.Queue()
+        
+        async def search_source(name: str, site_query: str):
+            found = 0
+            
+            async def consume():
+                nonlocal found
+                async for result in self.stream_items(source_prompt(query_text, name, site_query)):
+                    found += 1
+                    queue.put_nowait({**result, "source": result.get("source") or name})
+            
+            try:
+                await asyncio.wait_for(consume(), deadline)
+                sources[name] = "ok" if found else "empty"
+            except asyncio.TimeoutError:
+                sources[name] = "timeout"
+                print(f"Source search timed out after {deadline:g}s: {name}")
+            except Exception as e:
+                sources[name] = "error"
+                print(f"Error searching {name}: {e}")
+            finally:
+                queue.put_nowait(None)
+        
+        tasks = [asyncio.create_task(search_source(name, site_query)) for name, site_query in JOURNAL_SOURCES]
+        try:
+            running = len(tasks)
+            while running:
+                result = await queue.get()
+                if result is None:
+                    running -= 1
+                else:
+                    yield result
+        finally:
+            # The consumer stopped early (e.g. the client disconnected)
+            for task in tasks:
+                task.cancel()
+    
     async def scrape_physiology_journals(self) -> List[Dict]:
         """
         Scrape the specific physiology journal URLs for latest articles
@@ -138,14 +357,7 @@ Example format:
         
         try:
             response_text = await self._execute_query(prompt)
-            
-            json_match = re.search(r'\[[\s\S]*\]', response_text)
-            if json_match:
-                results = json.loads(json_match.group(0))
-                return results
-            else:
-                print(f"Could not extract JSON from response: {response_text[:200]}...")
-                return []
+            return merge_results([parse_json_array(response_text)])
                 
         except Exception as e:
             print(f"Error in scrape_physiology_journals: {e}")
@@ -174,22 +386,62 @@ Return the main content of the page in a clean, readable format."""
             print(f"Error scraping URL: {e}")
             raise
     
-    async def _execute_query(self, prompt: str) -> str:
+    async def _execute_query(self, prompt: str, log: bool = BRIGHTDATA_LOG_STREAM) -> str:
         """
-        Execute a query using the Claude Agent SDK with BrightData Web MCP
+        Execute a query on a pooled Claude agent client with BrightData Web MCP
         
         Args:
             prompt: The prompt to send to the agent
+            log: Echo the streamed text and tool calls to stdout
             
         Returns:
             The complete response text from the agent
         """
-        response_text = ""
+        chunks = []
+        async for chunk in self.stream_query(prompt, log):
+            chunks.append(chunk)
+        return "".join(chunks)
+    
+    async def stream_items(self, prompt: str, log: bool = BRIGHTDATA_LOG_STREAM) -> AsyncIterator[Dict]:
+        """Objects of the JSON array in an agent response, each yielded as soon as it closes"""
+        parser = IncrementalJSONArrayParser()
+        found = False
+        async for chunk in self.stream_query(prompt, log):
+            for item in parser.feed(chunk):
+                found = True
+                yield item
+        if not found:
+            print(f"Could not extract JSON from response: {parser.text()[:200]}...")
+    
+    async def stream_query(self, prompt: str, log: bool = BRIGHTDATA_LOG_STREAM) -> AsyncIterator[str]:
+        """
+        Text chunks of one agent response as they stream in
+        
+        The pooled session is held until the response ends. If the response
+        is not read to the end (the consumer stops iterating, an error, or
+        the timeout) the session is discarded. The whole response may take
+        at most BRIGHTDATA_QUERY_TIMEOUT seconds.
+        """
+        async with self.pool.session() as session:
+            messages = self._stream_text(session.client, log)
+            completed = False
+            try:
+                async with asyncio.timeout(BRIGHTDATA_QUERY_TIMEOUT):
+                    await session.client.query(prompt)
+                    async for chunk in messages:
+                        yield chunk
+                completed = True
+            finally:
+                await messages.aclose()
+                # The rest of an unfinished response would be read by the session's next query
+                session.broken = not completed
+    
+    async def _stream_text(self, client, log: bool) -> AsyncIterator[str]:
+        """Text deltas of one response"""
         current_tool = None
-        tool_input = ""
         
         # Agentic loop: Streams events returned by the Claude Agent SDK
-        async for message in query(prompt=prompt, options=self.options):
+        async for message in client.receive_response():
             # Intercept only streaming events
             if isinstance(message, StreamEvent):
                 event = message.event
@@ -200,29 +452,24 @@ Return the main content of the page in a clean, readable format."""
                     content_block = event.get("content_block", {})
                     if content_block.get("type") == "tool_use":
                         current_tool = content_block.get("name")
-                        tool_input = ""
-                        print(f"\n[Tool] Starting: {current_tool}")
+                        if log:
+                            print(f"\n[Tool] Starting: {current_tool}")
                 
                 # Handle incremental text output
                 elif event_type == "content_block_delta":
                     delta = event.get("delta", {})
                     if delta.get("type") == "text_delta":
-                        # Accumulate streamed text
                         text_chunk = delta.get("text", "")
-                        response_text += text_chunk
-                        print(text_chunk, end="", flush=True)
-                    elif delta.get("type") == "input_json_delta":
-                        # Accumulate JSON input as it streams in
-                        chunk = delta.get("partial_json", "")
-                        tool_input += chunk
+                        if log:
+                            print(text_chunk, end="", flush=True)
+                        yield text_chunk
                 
                 elif event_type == "content_block_stop":
                     # Tool call complete
                     if current_tool:
-                        print(f"\n[Tool] {current_tool} completed")
+                        if log:
+                            print(f"\n[Tool] {current_tool} completed")
                         current_tool = None
-        
-        return response_text
 
 
 # Example usage for testing
@@ -260,6 +507,8 @@ async def main():
         print(f"   DOI: {result.get('doi', 'N/A')}")
         print(f"   URL: {result.get('url', 'No URL')}")
         print(f"   Date: {result.get('pubDate', 'N/A')}")
+    
+    await brightdata_pool.close()
 
 
 if __name__ == "__main__":
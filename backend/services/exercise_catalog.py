@@ -0,0 +1,98 @@
+import asyncio
+import bisect
+from typing import Dict, List, Optional, Tuple
+from services.exercise_configs import BUILTIN_EVALUATORS, ExerciseConfigError, ExerciseEvaluator, compile_custom_config
+from services.storage import Repository
+
+
+def normalize_name(name: str) -> str:
+    return " ".join(name.lower().split())
+
+
+class ExerciseCatalog:
+    """
+    Indexed view of built-in plus custom exercises
+
+    Keeps an id -> exercise dict and a normalized-name index so lookups are O(1).
+    Custom exercises are append-only, so syncing with storage (which
+    other workers may have written to) only pulls rows newer than the last id
+    read from storage. Exercises this worker created itself do not move that
+    watermark: another worker may have stored a lower id in the meantime.
+    Compiled analysis configs (ExerciseEvaluator) are cached per id alongside.
+    """
+
+    def __init__(self, builtin_exercises: List[Dict], storage: Repository):
+        self.storage = storage
+        self._by_id: Dict[int, Dict] = {}
+        self._by_name: Dict[str, Dict] = {}
+        self._ordered: List[Dict] = []
+        self._custom: List[Dict] = []
+        self._last_custom_id = 0
+        # id -> (catalog entry it was compiled from, evaluator)
+        self._evaluators: Dict[int, Tuple[Dict, Optional[ExerciseEvaluator]]] = {}
+        self._sync_lock = asyncio.Lock()
+
+        for exercise in builtin_exercises:
+            self._index(exercise)
+
+    def _index(self, exercise: Dict):
+        self._evaluators.pop(exercise["id"], None)
+        self._by_id[exercise["id"]] = exercise
+        self._by_name.setdefault(normalize_name(exercise["name"]), exercise)
+        bisect.insort(self._ordered, exercise, key=lambda ex: ex["id"])
+
+    def add(self, exercise: Dict):
+        """Add a newly created custom exercise"""
+        if exercise["id"] in self._by_id:
+            return
+        self._index(exercise)
+        bisect.insort(self._custom, exercise, key=lambda ex: ex["id"])
+
+    async def sync(self):
+        """Pull custom exercises created since the last sync (e.g. by another worker)"""
+        async with self._sync_lock:
+            for exercise in await self.storage.list_custom_exercises(after_id=self._last_custom_id):
+                self.add(exercise)
+                self._last_custom_id = max(self._last_custom_id, exercise["id"])
+
+    def get(self, exercise_id: int) -> Optional[Dict]:
+        return self._by_id.get(exercise_id)
+
+    def get_custom(self, exercise_id: int) -> Optional[Dict]:
+        exercise = self._by_id.get(exercise_id)
+        return exercise if exercise is not None and "config" in exercise else None
+
+    def evaluator(self, exercise_id: int) -> Optional[ExerciseEvaluator]:
+        """
+        Compiled analysis config of an exercise (None if it has none)
+
+        Custom configs are compiled on first use and recompiled only when the
+        catalog entry is replaced.
+        """
+        if exercise_id in BUILTIN_EVALUATORS:
+            return BUILTIN_EVALUATORS[exercise_id]
+        exercise = self._by_id.get(exercise_id)
+        if exercise is None:
+            return None
+        cached = self._evaluators.get(exercise_id)
+        if cached is None or cached[0] is not exercise:
+            evaluator = None
+            if exercise.get("config"):
+                try:
+                    evaluator = compile_custom_config(exercise["config"])
+                except ExerciseConfigError as e:
+                    print(f"❌ Exercise {exercise_id} config: {e}")
+            cached = self._evaluators[exercise_id] = (exercise, evaluator)
+        return cached[1]
+
+    def get_by_name(self, name: str) -> Optional[Dict]:
+        return self._by_name.get(normalize_name(name))
+
+    def __contains__(self, exercise_id: int) -> bool:
+        return exercise_id in self._by_id
+
+    def all(self) -> List[Dict]:
+        return list(self._ordered)
+
+    def custom(self) -> List[Dict]:
+        return list(self._custom)
@@ -0,0 +1,354 @@
+from typing import Dict, Optional, Tuple, Union
+
+# MediaPipe Pose landmark indices (mirrors frontend/src/utils/poseUtils.js)
+POSE_LANDMARKS = {
+    "NOSE": 0,
+    "LEFT_EYE_INNER": 1,
+    "LEFT_EYE": 2,
+    "LEFT_EYE_OUTER": 3,
+    "RIGHT_EYE_INNER": 4,
+    "RIGHT_EYE": 5,
+    "RIGHT_EYE_OUTER": 6,
+    "LEFT_EAR": 7,
+    "RIGHT_EAR": 8,
+    "MOUTH_LEFT": 9,
+    "MOUTH_RIGHT": 10,
+    "LEFT_SHOULDER": 11,
+    "RIGHT_SHOULDER": 12,
+    "LEFT_ELBOW": 13,
+    "RIGHT_ELBOW": 14,
+    "LEFT_WRIST": 15,
+    "RIGHT_WRIST": 16,
+    "LEFT_PINKY": 17,
+    "RIGHT_PINKY": 18,
+    "LEFT_INDEX": 19,
+    "RIGHT_INDEX": 20,
+    "LEFT_THUMB": 21,
+    "RIGHT_THUMB": 22,
+    "LEFT_HIP": 23,
+    "RIGHT_HIP": 24,
+    "LEFT_KNEE": 25,
+    "RIGHT_KNEE": 26,
+    "LEFT_ANKLE": 27,
+    "RIGHT_ANKLE": 28,
+    "LEFT_HEEL": 29,
+    "RIGHT_HEEL": 30,
+    "LEFT_FOOT_INDEX": 31,
+    "RIGHT_FOOT_INDEX": 32,
+}
+
+NUM_LANDMARKS = len(POSE_LANDMARKS)
+
+L = POSE_LANDMARKS
+
+UPPER_BODY_LANDMARKS = [
+    L["LEFT_SHOULDER"], L["RIGHT_SHOULDER"], L["LEFT_ELBOW"], L["RIGHT_ELBOW"],
+    L["LEFT_WRIST"], L["RIGHT_WRIST"], L["LEFT_HIP"], L["RIGHT_HIP"],
+]
+
+FULL_BODY_LANDMARKS = [
+    L["NOSE"], L["LEFT_SHOULDER"], L["RIGHT_SHOULDER"], L["LEFT_HIP"], L["RIGHT_HIP"],
+    L["LEFT_KNEE"], L["RIGHT_KNEE"], L["LEFT_ANKLE"], L["RIGHT_ANKLE"],
+]
+
+# Built-in exercise configurations (mirrors frontend/src/utils/exerciseConfigs.js)
+BUILTIN_CONFIGS: Dict[int, Dict] = {
+    3: {
+        "name": "Bicep Curls",
+        "cameraType": "upper_body",
+        "requiredLandmarks": UPPER_BODY_LANDMARKS,
+        "repCounting": {
+            "type": "angle_based",
+            "arm": "right",
+            "landmarks": {"shoulder": L["RIGHT_SHOULDER"], "elbow": L["RIGHT_ELBOW"], "wrist": L["RIGHT_WRIST"]},
+            "thresholds": {"startAngle": 140, "endAngle": 90, "hysteresis": 15},
+            "phases": ["down", "up"],
+        },
+        "formChecks": {
+            "elbowStability": {"enabled": True, "maxMovement": 0.15, "warning": "Keep your elbow stable - avoid swinging"},
+            "shoulderStability": {"enabled": True, "maxRotation": 25, "warning": "Keep your shoulders steady"},
+            "controlledMovement": {"enabled": False, "maxSpeed": 200, "warning": "Move more slowly and with control"},
+        },
+    },
+    4: {
+        "name": "Shoulder Press",
+        "cameraType": "upper_body",
+        "requiredLandmarks": UPPER_BODY_LANDMARKS,
+        "repCounting": {
+            "type": "angle_based",
+            "arm": "right",
+            "landmarks": {"shoulder": L["RIGHT_SHOULDER"], "elbow": L["RIGHT_ELBOW"], "wrist": L["RIGHT_WRIST"]},
+            "thresholds": {"startAngle": 90, "endAngle": 160, "hysteresis": 15},
+            "phases": ["down", "up"],
+        },
+        "formChecks": {
+            "backStability": {"enabled": True, "maxMovement": 0.12, "warning": "Keep your back straight - avoid arching"},
+            "controlledPress": {"enabled": True, "maxRotation": 20, "warning": "Press straight up - avoid leaning"},
+        },
+    },
+    5: {
+        "name": "Lateral Raises",
+        "cameraType": "upper_body",
+        "requiredLandmarks": UPPER_BODY_LANDMARKS,
+        "repCounting": {
+            "type": "angle_based",
+            "arm": "right",
+            "landmarks": {"hip": L["RIGHT_HIP"], "shoulder": L["RIGHT_SHOULDER"], "elbow": L["RIGHT_ELBOW"]},
+            "thresholds": {"startAngle": 20, "endAngle": 90, "hysteresis": 12},
+            "phases": ["down", "up"],
+        },
+        "formChecks": {
+            "armStraight": {"enabled": True, "maxBend": 30, "warning": "Keep arms mostly straight"},
+            "noSwinging": {"enabled": True, "maxMovement": 0.15, "warning": "Avoid using momentum - lift with control"},
+        },
+    },
+    6: {
+        "name": "Front Raises",
+        "cameraType": "upper_body",
+        "requiredLandmarks": UPPER_BODY_LANDMARKS,
+        "repCounting": {
+            "type": "angle_based",
+            "arm": "right",
+            "landmarks": {"hip": L["RIGHT_HIP"], "shoulder": L["RIGHT_SHOULDER"], "wrist": L["RIGHT_WRIST"]},
+            "thresholds": {"startAngle": 20, "endAngle": 90, "hysteresis": 12},
+            "phases": ["down", "up"],
+        },
+        "formChecks": {
+            "noLeanBack": {"enabled": True, "maxLean": 15, "warning": "Keep your core tight - avoid leaning back"},
+            "controlledRaise": {"enabled": True, "maxMovement": 0.15, "warning": "Raise with control - no swinging"},
+        },
+    },
+    8: {
+        "name": "Standing Leg Raises",
+        "cameraType": "full_body",
+        "requiredLandmarks": FULL_BODY_LANDMARKS,
+        "repCounting": {
+            "type": "angle_based",
+            "arm": "right",
+            "landmarks": {"shoulder": L["RIGHT_SHOULDER"], "hip": L["RIGHT_HIP"], "knee": L["RIGHT_KNEE"]},
+            "thresholds": {"startAngle": 175, "endAngle": 90, "hysteresis": 15},
+            "phases": ["down", "up"],
+        },
+        "formChecks": {
+            "legStraight": {"enabled": True, "maxBend": 25, "warning": "Keep your leg straight while raising"},
+            "balanceStability": {"enabled": True, "maxMovement": 0.15, "warning": "Stand tall and stable - engage your core"},
+        },
+    },
+}
+
+
+def parse_custom_config(backend_config: Dict, problems: Optional[list] = None) -> Dict:
+    """
+    Normalize a Claude-generated exercise config the same way the frontend does
+
+    Landmark names ("RIGHT_ELBOW") are resolved to indices and thresholds fall
+    back to the bicep-curl defaults. Unknown landmark names are dropped (and
+    reported in `problems` if given).
+    """
+    rep_counting = backend_config.get("repCounting") or {}
+    config = {
+        "name": backend_config.get("name") or "Custom Exercise",
+        "cameraType": backend_config.get("cameraType") or "upper_body",
+        "requiredLandmarks": [],
+        "repCounting": {
+            "type": rep_counting.get("type") or "angle_based",
+            "arm": "right",
+            "landmarks": {},
+            "thresholds": rep_counting.get("thresholds") or {"startAngle": 140, "endAngle": 90, "hysteresis": 15},
+            "phases": rep_counting.get("phases") or ["down", "up"],
+        },
+        "formChecks": backend_config.get("formChecks") or {},
+    }
+
+    for key, landmark_name in (rep_counting.get("landmarks") or {}).items():
+        index = POSE_LANDMARKS.get(landmark_name)
+        if index is not None:
+            config["repCounting"]["landmarks"][key] = index
+            config["requiredLandmarks"].append(index)
+        elif problems is not None:
+            problems.append(f"repCounting.landmarks.{key}: unknown landmark {landmark_name!r}")
+
+    if config["cameraType"] == "upper_body":
+        config["requiredLandmarks"] += UPPER_BODY_LANDMARKS
+    elif config["cameraType"] == "full_body":
+        config["requiredLandmarks"] += FULL_BODY_LANDMARKS
+    config["requiredLandmarks"] = list(dict.fromkeys(config["requiredLandmarks"]))
+    return config
+
+
+# Exercise-specific form checks of the frontend analyzer (detectFormDeviations), keyed by
+# exercise name: (landmarks that must all be present, predicates). A predicate flags
+# frames where the z difference between two landmarks (optionally absolute) is above
+# (or below) a threshold.
+NAMED_FORM_CHECKS: Dict[str, Tuple[Tuple[str, ...], Tuple[Dict, ...]]] = {
+    "Bicep Curls": (("RIGHT_SHOULDER", "RIGHT_ELBOW", "RIGHT_WRIST", "RIGHT_HIP"), (
+        {"a": "RIGHT_ELBOW", "b": "RIGHT_SHOULDER", "absolute": True, "above": True, "threshold": 0.25, "issue": {
+            "type": "elbow_drift",
+            "severity": "medium",
+            "location": "Elbow position",
+            "message": "Elbow moving too far from body - keep it stable",
+            "details": "Drift detected",
+        }},
+        {"a": "RIGHT_SHOULDER", "b": "RIGHT_HIP", "absolute": False, "above": False, "threshold": -0.20, "issue": {
+            "type": "using_momentum",
+            "severity": "high",
+            "location": "Body positioning",
+            "message": "Using momentum - slow down and control the weight",
+            "details": "Body rocking detected",
+        }},
+    )),
+    "Shoulder Press": (("RIGHT_SHOULDER", "RIGHT_HIP"), (
+        {"a": "RIGHT_SHOULDER", "b": "RIGHT_HIP", "absolute": False, "above": False, "threshold": -0.18, "issue": {
+            "type": "back_arching",
+            "severity": "high",
+            "location": "Back position",
+            "message": "Excessive back arching - engage core",
+            "details": "Posture issue detected",
+        }},
+    )),
+}
+
+
+class ExerciseConfigError(ValueError):
+    pass
+
+
+class _Frozen:
+    __slots__ = ()
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+
+class FormPredicate(_Frozen):
+    """One form check: flag frames where z[a] - z[b] (or its magnitude) crosses threshold"""
+
+    __slots__ = ("a", "b", "absolute", "above", "threshold", "issue")
+
+    def __init__(self, a: int, b: int, absolute: bool, above: bool, threshold: float, issue: Dict):
+        for name, value in zip(self.__slots__, (a, b, absolute, above, threshold, issue)):
+            object.__setattr__(self, name, value)
+
+
+class ExerciseEvaluator(_Frozen):
+    """
+    An exercise config compiled for the analysis path
+
+    Built once per config: landmark names are resolved to indices, thresholds
+    are validated and the rep state machine's enter/complete angles and the
+    form-check predicates are precomputed, so analyzers and rep counters only
+    read attributes. Problems found while compiling are kept in `problems`
+    and disable the affected part (rep counting / range of motion) instead of
+    failing the analysis. Instances are immutable and pickle as their source
+    config, so they can be handed to analysis worker processes.
+    """
+
+    __slots__ = (
+        "name", "source", "angle_landmarks", "start_angle", "end_angle", "hysteresis", "decreasing",
+        "enter_threshold", "complete_threshold", "form_landmarks", "form_predicates", "problems",
+    )
+
+    def __init__(self, exercise_config: Optional[Dict], problems: Tuple[str, ...] = ()):
+        if exercise_config is not None and not isinstance(exercise_config, dict):
+            raise ExerciseConfigError("Exercise config must be an object")
+        config = exercise_config or {}
+        problems = list(problems)
+        values = dict.fromkeys(self.__slots__)
+        values.update(name=config.get("name"), source=exercise_config, form_landmarks=(), form_predicates=())
+
+        rep_counting = config.get("repCounting")
+        if rep_counting:
+            angle = self._compile_rep_counting(rep_counting, problems)
+            if angle is not None:
+                values.update(angle)
+
+        form_checks = NAMED_FORM_CHECKS.get(values["name"])
+        if form_checks:
+            required, predicates = form_checks
+            values["form_landmarks"] = tuple(POSE_LANDMARKS[name] for name in required)
+            values["form_predicates"] = tuple(
+                FormPredicate(POSE_LANDMARKS[p["a"]], POSE_LANDMARKS[p["b"]], p["absolute"], p["above"],
+                              p["threshold"], p["issue"])
+                for p in predicates
+            )
+
+        values["problems"] = tuple(problems)
+        for name, value in values.items():
+            object.__setattr__(self, name, value)
+
+    @staticmethod
+    def _compile_rep_counting(rep_counting: Dict, problems: list) -> Optional[Dict]:
+        if rep_counting.get("type") != "angle_based":
+            problems.append(f"repCounting.type {rep_counting.get('type')!r} is not supported")
+            return None
+
+        indices = []
+        for key, landmark in (rep_counting.get("landmarks") or {}).items():
+            index = POSE_LANDMARKS.get(landmark) if isinstance(landmark, str) else landmark
+            if not isinstance(index, int) or not 0 <= index < NUM_LANDMARKS:
+                problems.append(f"repCounting.landmarks.{key}: unknown landmark {landmark!r}")
+                continue
+            indices.append(index)
+        if len(indices) < 3:
+            problems.append("repCounting needs three landmarks")
+            return None
+
+        thresholds = rep_counting.get("thresholds") or {}
+        try:
+            start, end, hysteresis = (float(thresholds[key]) for key in ("startAngle", "endAngle", "hysteresis"))
+        except (KeyError, TypeError, ValueError):
+            problems.append("repCounting.thresholds needs numeric startAngle, endAngle and hysteresis")
+            return None
+        if start == end:
+            problems.append("repCounting.thresholds startAngle and endAngle are equal")
+            return None
+
+        # Movement goes start -> end -> start; a decreasing angle (bicep curl) or an increasing one (press)
+        decreasing = end < start
+        return {
+            "angle_landmarks": tuple(indices[:3]),
+            "start_angle": start,
+            "end_angle": end,
+            "hysteresis": hysteresis,
+            "decreasing": decreasing,
+            "enter_threshold": end + hysteresis if decreasing else end - hysteresis,
+            "complete_threshold": start - hysteresis if decreasing else start + hysteresis,
+        }
+
+    @property
+    def counts_reps(self) -> bool:
+        return self.angle_landmarks is not None
+
+    def __reduce__(self):
+        return (ExerciseEvaluator, (self.source, self.problems))
+
+    def __repr__(self):
+        return f"ExerciseEvaluator({self.name!r}, angle_landmarks={self.angle_landmarks}, problems={len(self.problems)})"
+
+
+ConfigLike = Union[Dict, ExerciseEvaluator, None]
+
+
+def compile_exercise_config(exercise_config: ConfigLike) -> ExerciseEvaluator:
+    """Compile a config dict (an already compiled evaluator is returned as is)"""
+    if isinstance(exercise_config, ExerciseEvaluator):
+        return exercise_config
+    return ExerciseEvaluator(exercise_config)
+
+
+def compile_custom_config(backend_config: Dict) -> ExerciseEvaluator:
+    """Validate and compile a Claude-generated config (see parse_custom_config)"""
+    if not isinstance(backend_config, dict):
+        raise ExerciseConfigError("Exercise config must be an object")
+    problems = []
+    config = parse_custom_config(backend_config, problems)
+    return ExerciseEvaluator(config, tuple(problems))
+
+
+# Built-in configs never change, so they are compiled once
+BUILTIN_EVALUATORS: Dict[int, ExerciseEvaluator] = {
+    exercise_id: ExerciseEvaluator(config) for exercise_id, config in BUILTIN_CONFIGS.items()
+}
@@ -0,0 +1,171 @@
+from dotenv import load_dotenv
+import os
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+import httpx
+
+load_dotenv()
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+def _env_float(name: str, default: float) -> float:
+    value = os.getenv(name)
+    return float(value) if value else default
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    return int(value) if value else default
+
+
+class HttpClientPool:
+    """Application-scoped pooled httpx.AsyncClient shared by all outbound calls"""
+
+    def __init__(self):
+        self.max_connections = _env_int("HTTP_POOL_MAX_CONNECTIONS", 100)
+        self.max_keepalive = _env_int("HTTP_POOL_MAX_KEEPALIVE", 20)
+        self.keepalive_expiry = _env_float("HTTP_POOL_KEEPALIVE_EXPIRY", 30.0)
+        self.per_host_limit = _env_int("HTTP_POOL_PER_HOST_LIMIT", 20)
+        self.connect_timeout = _env_float("HTTP_POOL_CONNECT_TIMEOUT", 5.0)
+        self.default_timeout = _env_float("HTTP_POOL_TIMEOUT", 30.0)
+        self.http2 = HTTP2_AVAILABLE and os.getenv("HTTP_POOL_HTTP2", "true").lower() != "false"
+
+        self._client: Optional[httpx.AsyncClient] = None
+        self._host_limits: Dict[str, asyncio.Semaphore] = {}
+        self._stats = {
+            "requests": 0,
+            "in_flight": 0,
+            "waits": 0,
+            "wait_time_total": 0.0,
+            "errors": 0,
+        }
+        self._host_stats: Dict[str, Dict[str, int]] = {}
+
+    async def start(self):
+        """Create the underlying client (called from the FastAPI lifespan hook)"""
+        if self._client is not None:
+            return
+        self._client = httpx.AsyncClient(
+            http2=self.http2,
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_keepalive,
+                keepalive_expiry=self.keepalive_expiry,
+            ),
+            timeout=httpx.Timeout(self.default_timeout, connect=self.connect_timeout),
+        )
+
+    async def close(self):
+        """Close all pooled connections"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            raise RuntimeError("HTTP client pool is not started")
+        return self._client
+
+    def _timeout(self, timeout: Optional[float]) -> httpx.Timeout:
+        return httpx.Timeout(timeout or self.default_timeout, connect=self.connect_timeout)
+
+    @asynccontextmanager
+    async def _slot(self, url: str):
+        """Hold a per-host slot for the duration of one request"""
+        host = urlsplit(url).netloc
+        semaphore = self._host_limits.get(host)
+        if semaphore is None:
+            semaphore = self._host_limits[host] = asyncio.Semaphore(self.per_host_limit)
+            self._host_stats[host] = {"requests": 0, "in_flight": 0, "waits": 0}
+        host_stats = self._host_stats[host]
+
+        if semaphore.locked():
+            self._stats["waits"] += 1
+            host_stats["waits"] += 1
+        started = time.perf_counter()
+        async with semaphore:
+            self._stats["wait_time_total"] += time.perf_counter() - started
+            self._stats["requests"] += 1
+            self._stats["in_flight"] += 1
+            host_stats["requests"] += 1
+            host_stats["in_flight"] += 1
+            try:
+                yield
+            except httpx.HTTPError:
+                self._stats["errors"] += 1
+                raise
+            finally:
+                self._stats["in_flight"] -= 1
+                host_stats["in_flight"] -= 1
+
+    async def request(self, method: str, url: str, timeout: Optional[float] = None, **kwargs) -> httpx.Response:
+        """Send a request through the shared client"""
+        async with self._slot(url):
+            return await self.client.request(method, url, timeout=self._timeout(timeout), **kwargs)
+
+    @asynccontextmanager
+    async def stream(self, method: str, url: str, timeout: Optional[float] = None, **kwargs):
+        """Stream a response through the shared client, holding the host slot until closed"""
+        async with self._slot(url):
+            async with self.client.stream(method, url, timeout=self._timeout(timeout), **kwargs) as response:
+                yield response
+
+    async def get(self, url: str, timeout: Optional[float] = None, **kwargs) -> httpx.Response:
+        return await self.request("GET", url, timeout=timeout, **kwargs)
+
+    async def post(self, url: str, timeout: Optional[float] = None, **kwargs) -> httpx.Response:
+        return await self.request("POST", url, timeout=timeout, **kwargs)
+
+    def metrics(self) -> Dict:
+        """
+        Snapshot of pool usage for sizing
+
+        Returns:
+            Connection counts (in-use / idle) from the transport plus request-level
+            counters (in-flight, waits on the per-host limit, errors)
+        """
+        connections = {"total": 0, "in_use": 0, "idle": 0, "http2": 0}
+        if self._client is not None:
+            # httpcore does not expose pool stats publicly; read them best-effort
+            pool = getattr(getattr(self._client, "_transport", None), "_pool", None)
+            for conn in getattr(pool, "connections", []):
+                connections["total"] += 1
+                if conn.is_idle():
+                    connections["idle"] += 1
+                else:
+                    connections["in_use"] += 1
+                if "HTTP/2" in repr(conn):
+                    connections["http2"] += 1
+
+        waits = self._stats["waits"]
+        return {
+            "config": {
+                "http2": self.http2,
+                "max_connections": self.max_connections,
+                "max_keepalive_connections": self.max_keepalive,
+                "keepalive_expiry": self.keepalive_expiry,
+                "per_host_limit": self.per_host_limit,
+                "connect_timeout": self.connect_timeout,
+                "default_timeout": self.default_timeout,
+            },
+            "connections": connections,
+            "requests": self._stats["requests"],
+            "in_flight": self._stats["in_flight"],
+            "errors": self._stats["errors"],
+            "waits": waits,
+            "avg_wait_ms": round(self._stats["wait_time_total"] / self._stats["requests"] * 1000, 3) if self._stats["requests"] else 0.0,
+            "hosts": {host: dict(stats) for host, stats in self._host_stats.items()},
+        }
+
+
+# Shared instance used by main.py and the service modules
+http_pool = HttpClientPool()
@@ -0,0 +1,237 @@
+import json
+from typing import Any, List, Tuple
+
+
+class IncrementalJSONObjectParser:
+    """
+    Incremental parser for a streamed top-level JSON object
+
+    Text is fed in arbitrary chunks (e.g. Claude text deltas). Each top-level
+    field is returned as a (key, value) pair as soon as its value closes, so
+    callers can forward "overallScore" or "strengths" long before the whole
+    object has arrived. Anything before the opening brace (such as a ```json
+    fence) is ignored.
+    """
+
+    def __init__(self):
+        self._chunks: List[str] = []
+        self._started = False
+        self._finished = False
+        self._state = "key"          # key | colon | value
+        self._depth = 0              # nesting depth inside the current value
+        self._in_string = False
+        self._escape = False
+        self._key_chars: List[str] = []
+        self._value_chars: List[str] = []
+        self._current_key = None
+
+    @property
+    def finished(self) -> bool:
+        return self._finished
+
+    def text(self) -> str:
+        """Everything fed so far"""
+        return "".join(self._chunks)
+
+    def _emit(self, fields: List[Tuple[str, Any]]):
+        raw = "".join(self._value_chars).strip()
+        self._value_chars = []
+        self._state = "key"
+        if raw:
+            fields.append((self._current_key, json.loads(raw)))
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        """
+        Consume a chunk of text
+
+        Args:
+            chunk: Next piece of streamed text
+
+        Returns:
+            (key, value) pairs for top-level fields completed by this chunk
+        """
+        self._chunks.append(chunk)
+        fields: List[Tuple[str, Any]] = []
+
+        for char in chunk:
+            if self._finished:
+                break
+
+            if not self._started:
+                if char == "{":
+                    self._started = True
+                continue
+
+            if self._state == "key":
+                if self._in_string:
+                    if self._escape:
+                        self._escape = False
+                        self._key_chars.append(char)
+                    elif char == "\\":
+                        self._escape = True
+                        self._key_chars.append(char)
+                    elif char == '"':
+                        self._in_string = False
+                        self._current_key = json.loads('"' + "".join(self._key_chars) + '"')
+                        self._key_chars = []
+                        self._state = "colon"
+                    else:
+                        self._key_chars.append(char)
+                elif char == '"':
+                    self._in_string = True
+                elif char == "}":
+                    self._finished = True
+                continue
+
+            if self._state == "colon":
+                if char == ":":
+                    self._state = "value"
+                continue
+
+            # state == "value"
+            if self._in_string:
+                self._value_chars.append(char)
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    if self._depth == 0:
+                        self._emit(fields)
+                continue
+
+            if char == '"':
+                self._in_string = True
+                self._value_chars.append(char)
+            elif char in "{[":
+                self._depth += 1
+                self._value_chars.append(char)
+            elif char in "}]":
+                if self._depth == 0:
+                    # Closing brace of the root object ends a scalar value
+                    self._emit(fields)
+                    self._finished = True
+                else:
+                    self._depth -= 1
+                    self._value_chars.append(char)
+                    if self._depth == 0:
+                        self._emit(fields)
+            elif char == "," and self._depth == 0:
+                self._emit(fields)
+            else:
+                self._value_chars.append(char)
+
+        return fields
+
+
+class IncrementalJSONArrayParser:
+    """
+    Incremental parser for a JSON array of objects inside streamed text
+
+    Text is fed in arbitrary chunks (e.g. agent text deltas, which may wrap the
+    array in prose or a ```json fence). Each object element is returned as
+    soon as its closing brace arrives. Bracketed prose before the array (such
+    as "[Tool]" or "[1]") is skipped: an array that turns out not to be JSON,
+    or that holds no objects, is dropped and scanning resumes after it.
+    """
+
+    def __init__(self):
+        self._chunks: List[str] = []
+        self._in_array = False
+        self._finished = False
+        self._depth = 0              # nesting depth inside the current element
+        self._in_string = False
+        self._escape = False
+        self._element_chars: List[str] = []
+        self._objects = 0            # objects emitted from the current array
+
+    @property
+    def finished(self) -> bool:
+        return self._finished
+
+    def text(self) -> str:
+        """Everything fed so far"""
+        return "".join(self._chunks)
+
+    def _reset(self):
+        """Abandon the current array and look for the next one"""
+        self._in_array = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._element_chars = []
+
+    def _emit(self, items: List[Any]) -> bool:
+        raw = "".join(self._element_chars).strip()
+        self._element_chars = []
+        if not raw:
+            return True
+        try:
+            value = json.loads(raw)
+        except json.JSONDecodeError:
+            return False
+        if isinstance(value, dict):
+            items.append(value)
+            self._objects += 1
+        return True
+
+    def feed(self, chunk: str) -> List[Any]:
+        """
+        Consume a chunk of text
+
+        Args:
+            chunk: Next piece of streamed text
+
+        Returns:
+            Object elements completed by this chunk
+        """
+        self._chunks.append(chunk)
+        items: List[Any] = []
+
+        for char in chunk:
+            if self._finished:
+                break
+
+            if not self._in_array:
+                if char == "[":
+                    self._in_array = True
+                    self._objects = 0
+                continue
+
+            if self._in_string:
+                self._element_chars.append(char)
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                continue
+
+            if char == '"':
+                self._in_string = True
+                self._element_chars.append(char)
+            elif char in "{[":
+                self._depth += 1
+                self._element_chars.append(char)
+            elif char in "}]":
+                if self._depth == 0:
+                    if char == "}" or not self._emit(items):
+                        self._reset()
+                    elif self._objects:
+                        self._finished = True
+                    else:
+                        self._reset()
+                    continue
+                self._depth -= 1
+                self._element_chars.append(char)
+                if self._depth == 0 and char == "}" and not self._emit(items):
+                    self._reset()
+            elif char == "," and self._depth == 0:
+                if not self._emit(items):
+                    self._reset()
+            else:
+                self._element_chars.append(char)
+
+        return items
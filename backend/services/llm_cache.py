@@ -0,0 +1,204 @@
+from dotenv import load_dotenv
+import os
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Union
+
+load_dotenv()
+
+
+def _normalize_text(text: str) -> str:
+    """Collapse whitespace so cosmetic prompt differences share a cache entry"""
+    return " ".join(text.split())
+
+
+def make_cache_key(model: str, content: Union[str, List[Dict]], max_tokens: int) -> str:
+    """
+    Content-addressed key for a Claude request
+
+    Args:
+        model: Claude model id
+        content: Prompt text or list of content blocks
+        max_tokens: Maximum tokens requested
+
+    Returns:
+        sha256 hex digest of (model, normalized prompt, max_tokens, image digests)
+    """
+    texts = []
+    images = []
+    if isinstance(content, str):
+        texts.append(_normalize_text(content))
+    else:
+        for block in content:
+            if block.get("type") == "text":
+                texts.append(_normalize_text(block.get("text", "")))
+            elif block.get("type") == "image":
+                data = block.get("source", {}).get("data", "")
+                images.append(hashlib.sha256(data.encode()).hexdigest())
+
+    material = json.dumps(
+        {"model": model, "prompt": texts, "max_tokens": max_tokens, "images": images},
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(material.encode()).hexdigest()
+
+
+class LLMResponseCache:
+    """
+    Two-tier cache for Claude responses
+
+    Tier 1 is an in-memory LRU bounded by entry count with a TTL. Tier 2 is an
+    optional SQLite file (enabled by LLM_CACHE_DB) that survives restarts; disk
+    hits are promoted back into memory.
+    """
+
+    def __init__(self):
+        self.enabled = os.getenv("LLM_CACHE_ENABLED", "true").lower() != "false"
+        self.max_entries = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "512"))
+        self.ttl = float(os.getenv("LLM_CACHE_TTL", str(24 * 3600)))
+        self.db_path = os.getenv("LLM_CACHE_DB")
+
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        self._stats = {
+            "hits": 0,
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "evictions": 0,
+            "expired": 0,
+        }
+
+    def open(self):
+        """Open the SQLite tier if LLM_CACHE_DB is set (FastAPI lifespan hook)"""
+        if self._db is not None or not (self.enabled and self.db_path):
+            return
+        db = sqlite3.connect(self.db_path, check_same_thread=False)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        db.commit()
+        self._db = db
+
+    def _memory_get(self, key: str) -> Optional[Dict]:
+        entry = self._memory.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.time():
+            del self._memory[key]
+            self._stats["expired"] += 1
+            return None
+        self._memory.move_to_end(key)
+        return value
+
+    def _memory_set(self, key: str, value: Dict, expires_at: float):
+        self._memory[key] = (expires_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def _disk_get(self, key: str) -> Optional[tuple]:
+        with self._db_lock:
+            if self._db is None:
+                return None
+            row = self._db.execute(
+                "SELECT value, expires_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None or row[1] < time.time():
+            return None
+        return json.loads(row[0]), row[1]
+
+    def _disk_set(self, key: str, value: Dict, expires_at: float):
+        with self._db_lock:
+            if self._db is None:
+                return
+            self._db.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value), expires_at),
+            )
+            self._db.execute("DELETE FROM llm_cache WHERE expires_at < ?", (time.time(),))
+            self._db.commit()
+
+    def _disk_delete(self, key: str):
+        with self._db_lock:
+            if self._db is None:
+                return
+            self._db.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+            self._db.commit()
+
+    async def get(self, key: str) -> Optional[Dict]:
+        if not self.enabled:
+            return None
+
+        value = self._memory_get(key)
+        if value is not None:
+            self._stats["hits"] += 1
+            self._stats["memory_hits"] += 1
+            return value
+
+        if self._db is not None:
+            found = await asyncio.to_thread(self._disk_get, key)
+            if found is not None:
+                value, expires_at = found
+                self._memory_set(key, value, expires_at)
+                self._stats["hits"] += 1
+                self._stats["disk_hits"] += 1
+                return value
+
+        self._stats["misses"] += 1
+        return None
+
+    async def set(self, key: str, value: Dict):
+        if not self.enabled:
+            return
+        expires_at = time.time() + self.ttl
+        self._memory_set(key, value, expires_at)
+        self._stats["stores"] += 1
+        if self._db is not None:
+            await asyncio.to_thread(self._disk_set, key, value, expires_at)
+
+    async def discard(self, key: str):
+        self._memory.pop(key, None)
+        if self._db is not None:
+            await asyncio.to_thread(self._disk_delete, key)
+
+    def clear(self):
+        self._memory.clear()
+        if self._db is not None:
+            with self._db_lock:
+                self._db.execute("DELETE FROM llm_cache")
+                self._db.commit()
+
+    def close(self):
+        if self._db is not None:
+            with self._db_lock:
+                self._db.close()
+            self._db = None
+
+    def metrics(self) -> Dict:
+        lookups = self._stats["hits"] + self._stats["misses"]
+        return {
+            **self._stats,
+            "hit_rate": round(self._stats["hits"] / lookups, 4) if lookups else 0.0,
+            "enabled": self.enabled,
+            "memory_entries": len(self._memory),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "disk_tier": self._db is not None,
+        }
+
+
+# Shared instance used by the LLM gateway
+llm_cache = LLMResponseCache()
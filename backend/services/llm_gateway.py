@@ -0,0 +1,295 @@
+from dotenv import load_dotenv
+import os
+import asyncio
+import hashlib
+import json
+import random
+import time
+from typing import AsyncIterator, Dict, List, Optional, Union
+from services.http_pool import http_pool
+from services.llm_cache import llm_cache, make_cache_key
+
+load_dotenv()
+
+# Also read by the agent CLI; point both at a stand-in server with e.g. benchmarks/fake_upstream.py
+ANTHROPIC_BASE_URL = os.getenv("ANTHROPIC_BASE_URL", "https://api.anthropic.com").rstrip("/")
+ANTHROPIC_MESSAGES_URL = f"{ANTHROPIC_BASE_URL}/v1/messages"
+ANTHROPIC_VERSION = "2023-06-01"
+DEFAULT_MODEL = "claude-sonnet-4-20250514"
+
+# Status codes worth retrying: rate limited (429) and overloaded (529)
+RETRYABLE_STATUS = {429, 529}
+
+
+# HTTP status of the error events a stream can end with
+STREAM_ERROR_STATUS = {"rate_limit_error": 429, "overloaded_error": 529}
+
+
+class LLMGatewayError(Exception):
+    """Non-200 response from the Anthropic API after retries are exhausted (with its status code)"""
+
+    def __init__(self, status_code: int, detail: str, retry_after: Optional[str] = None):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+def strip_code_fences(text: str) -> str:
+    """Remove ```json / ``` fences Claude sometimes wraps around JSON output"""
+    cleaned = text.strip()
+    if cleaned.startswith("```"):
+        cleaned = cleaned.split("\n", 1)[1] if "\n" in cleaned else ""
+        if cleaned.rstrip().endswith("```"):
+            cleaned = cleaned.rstrip()[:-3]
+    return cleaned.strip()
+
+
+class TokenBucket:
+    """Simple async token bucket for requests-per-minute limiting"""
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[int] = None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity or max(1, int(rate_per_minute // 6))
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class LLMGateway:
+    """
+    Single entry point for Claude /v1/messages calls
+
+    Identical in-flight requests share one upstream call, concurrency is capped
+    by a semaphore plus a requests-per-minute token bucket, and 429/529 responses
+    are retried with exponential backoff and full jitter.
+    """
+
+    def __init__(self):
+        self.max_concurrency = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+        self.requests_per_minute = float(os.getenv("LLM_REQUESTS_PER_MINUTE", "50"))
+        self.max_retries = int(os.getenv("LLM_MAX_RETRIES", "4"))
+        self.backoff_base = float(os.getenv("LLM_BACKOFF_BASE", "1.0"))
+        self.backoff_max = float(os.getenv("LLM_BACKOFF_MAX", "30.0"))
+
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._bucket = TokenBucket(self.requests_per_minute)
+        self._in_flight: Dict[str, asyncio.Task] = {}
+        self._stats = {
+            "requests": 0,
+            "upstream_calls": 0,
+            "coalesced": 0,
+            "retries": 0,
+            "errors": 0,
+        }
+
+    @staticmethod
+    def build_payload(content: Union[str, List[Dict]], max_tokens: int, model: str = DEFAULT_MODEL) -> Dict:
+        return {
+            "model": model,
+            "max_tokens": max_tokens,
+            "messages": [{"role": "user", "content": content}],
+        }
+
+    @staticmethod
+    def request_key(payload: Dict) -> str:
+        return hashlib.sha256(json.dumps(payload, sort_keys=True, separators=(",", ":")).encode()).hexdigest()
+
+    def _backoff(self, attempt: int, retry_after: Optional[str]) -> float:
+        if retry_after:
+            try:
+                return min(float(retry_after), self.backoff_max)
+            except ValueError:
+                pass
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    async def _send(self, payload: Dict, timeout: float) -> Dict:
+        api_key = os.getenv("ANTHROPIC_API_KEY")
+        attempt = 0
+        while True:
+            async with self._semaphore:
+                await self._bucket.acquire()
+                self._stats["upstream_calls"] += 1
+                response = await http_pool.post(
+                    ANTHROPIC_MESSAGES_URL,
+                    headers={
+                        "Content-Type": "application/json",
+                        "x-api-key": api_key,
+                        "anthropic-version": ANTHROPIC_VERSION
+                    },
+                    json=payload,
+                    timeout=timeout
+                )
+
+            if response.status_code == 200:
+                return response.json()
+
+            if response.status_code in RETRYABLE_STATUS and attempt < self.max_retries:
+                delay = self._backoff(attempt, response.headers.get("retry-after"))
+                attempt += 1
+                self._stats["retries"] += 1
+                print(f"Claude API returned {response.status_code}, retry {attempt} in {delay:.1f}s")
+                await asyncio.sleep(delay)
+                continue
+
+            self._stats["errors"] += 1
+            raise LLMGatewayError(response.status_code, f"Claude API error: {response.text}",
+                                  response.headers.get("retry-after"))
+
+    async def stream_text(self, content: Union[str, List[Dict]], max_tokens: int,
+                          timeout: float = 30.0, model: str = DEFAULT_MODEL,
+                          cache: bool = False) -> AsyncIterator[str]:
+        """
+        Stream Claude's text output as it is generated
+
+        Retries on 429/529 only happen before any text has been yielded. Streams
+        are not coalesced, but a cache hit is replayed as a single chunk and a
+        completed stream is stored for later non-streaming callers.
+
+        Yields:
+            Text deltas in order
+        """
+        self._stats["requests"] += 1
+        cache_key = make_cache_key(model, content, max_tokens) if cache else None
+        if cache_key:
+            cached = await llm_cache.get(cache_key)
+            if cached is not None:
+                yield cached["content"][0]["text"]
+                return
+
+        payload = {**self.build_payload(content, max_tokens, model), "stream": True}
+        api_key = os.getenv("ANTHROPIC_API_KEY")
+        chunks: List[str] = []
+        attempt = 0
+        while True:
+            async with self._semaphore:
+                await self._bucket.acquire()
+                self._stats["upstream_calls"] += 1
+                async with http_pool.stream(
+                    "POST",
+                    ANTHROPIC_MESSAGES_URL,
+                    headers={
+                        "Content-Type": "application/json",
+                        "x-api-key": api_key,
+                        "anthropic-version": ANTHROPIC_VERSION
+                    },
+                    json=payload,
+                    timeout=timeout
+                ) as response:
+                    if response.status_code == 200:
+                        async for line in response.aiter_lines():
+                            if not line.startswith("data:"):
+                                continue
+                            event = json.loads(line[5:])
+                            if event.get("type") == "content_block_delta":
+                                delta = event.get("delta", {})
+                                if delta.get("type") == "text_delta":
+                                    chunks.append(delta.get("text", ""))
+                                    yield chunks[-1]
+                            elif event.get("type") == "error":
+                                self._stats["errors"] += 1
+                                error = event.get("error", {})
+                                raise LLMGatewayError(STREAM_ERROR_STATUS.get(error.get("type"), 500),
+                                                      f"Claude API error: {error.get('message', error)}")
+                        break
+
+                    body = (await response.aread()).decode(errors="replace")
+                    retry_after = response.headers.get("retry-after")
+                    status_code = response.status_code
+
+            if status_code in RETRYABLE_STATUS and attempt < self.max_retries:
+                delay = self._backoff(attempt, retry_after)
+                attempt += 1
+                self._stats["retries"] += 1
+                print(f"Claude API returned {status_code}, retry {attempt} in {delay:.1f}s")
+                await asyncio.sleep(delay)
+                continue
+
+            self._stats["errors"] += 1
+            raise LLMGatewayError(status_code, f"Claude API error: {body}", retry_after)
+
+        if cache_key:
+            await llm_cache.set(cache_key, {"content": [{"type": "text", "text": "".join(chunks)}]})
+
+    async def create_message(self, content: Union[str, List[Dict]], max_tokens: int,
+                             timeout: float = 30.0, model: str = DEFAULT_MODEL,
+                             cache: bool = False) -> Dict:
+        """
+        Send a single-turn message to Claude
+
+        Args:
+            content: Prompt text or a list of content blocks (e.g. image + text)
+            max_tokens: Maximum tokens to generate
+            timeout: Per-attempt timeout in seconds
+            model: Claude model id
+            cache: Serve from / store into the content-addressed response cache
+
+        Returns:
+            The raw /v1/messages response body
+        """
+        self._stats["requests"] += 1
+        cache_key = make_cache_key(model, content, max_tokens) if cache else None
+        if cache_key:
+            cached = await llm_cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+        payload = self.build_payload(content, max_tokens, model)
+        key = self.request_key(payload)
+
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._send(payload, timeout))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        else:
+            self._stats["coalesced"] += 1
+
+        # Shield so one caller disconnecting doesn't cancel the shared call
+        data = await asyncio.shield(task)
+        if cache_key:
+            await llm_cache.set(cache_key, data)
+        return data
+
+    async def complete(self, content: Union[str, List[Dict]], max_tokens: int,
+                       timeout: float = 30.0, model: str = DEFAULT_MODEL,
+                       cache: bool = False) -> str:
+        """Return Claude's text response with any code fences stripped"""
+        data = await self.create_message(content, max_tokens, timeout, model, cache)
+        return strip_code_fences(data["content"][0]["text"])
+
+    async def complete_json(self, content: Union[str, List[Dict]], max_tokens: int,
+                            timeout: float = 30.0, model: str = DEFAULT_MODEL,
+                            cache: bool = False) -> Dict:
+        """Return Claude's response parsed as JSON (raises json.JSONDecodeError)"""
+        text = await self.complete(content, max_tokens, timeout, model, cache)
+        try:
+            return json.loads(text)
+        except json.JSONDecodeError:
+            # Don't keep serving a response we can't parse
+            if cache:
+                await llm_cache.discard(make_cache_key(model, content, max_tokens))
+            raise
+
+    def metrics(self) -> Dict:
+        return {
+            **self._stats,
+            "in_flight": len(self._in_flight),
+            "max_concurrency": self.max_concurrency,
+            "requests_per_minute": self.requests_per_minute,
+        }
+
+
+# Shared instance used by main.py
+llm_gateway = LLMGateway()
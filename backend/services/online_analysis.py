@@ -0,0 +1,200 @@
+import math
+from typing import Dict, List, Optional
+import numpy as np
+from services.exercise_configs import POSE_LANDMARKS, ConfigLike
+from services.pose_analysis import (
+    COMPENSATION_DEDUPE, COMPENSATION_STRIDE, FORM_DEDUPE, FORM_STRIDE, ROM_DEDUPE, ROM_STRIDE,
+    SPEED_DEDUPE, SPEED_ISSUE, SPEED_WINDOW, SUPPORT_DEDUPE, SUPPORT_STRIDE, TREMOR_DEDUPE,
+    TREMOR_ISSUE, TREMOR_WINDOW, SessionAnalyzer, deduplicate_nearby_issues, distance3d,
+    speed_flagged, tremor_flagged,
+)
+from services.rep_counting import RepCounter
+
+
+class IssueStream:
+    """
+    Issues of one detector, deduplicated as they arrive
+
+    Keeps the last kept timestamp per issue type, so each new issue is checked
+    in O(1). Assumes timestamps do not go backwards (the session timer).
+    """
+
+    def __init__(self, window_seconds: float):
+        self.window_seconds = window_seconds
+        self.issues: List[Dict] = []
+        self._last: Dict[str, float] = {}
+
+    def add(self, issues: List[Dict]):
+        for issue in issues:
+            if issue["timestamp"] - self._last.get(issue["type"], -math.inf) >= self.window_seconds:
+                self.issues.append(issue)
+                self._last[issue["type"]] = issue["timestamp"]
+
+    def ordered(self) -> List[Dict]:
+        # Same grouping and ordering as the batch deduplication (kept issues pass through unchanged)
+        return deduplicate_nearby_issues(self.issues, self.window_seconds)
+
+
+class WelfordVariance:
+    """Running mean / sum of squared deviations per channel, merged a chunk at a time (Chan et al.)"""
+
+    def __init__(self, channels: int):
+        self.count = 0
+        self.mean = np.zeros(channels)
+        self.m2 = np.zeros(channels)
+
+    def add(self, samples: np.ndarray):
+        n = len(samples)
+        if n == 0:
+            return
+        chunk_mean = samples.mean(axis=0)
+        chunk_m2 = ((samples - chunk_mean) ** 2).sum(axis=0)
+        total = self.count + n
+        delta = chunk_mean - self.mean
+        self.mean = self.mean + delta * n / total
+        self.m2 = self.m2 + chunk_m2 + delta ** 2 * self.count * n / total
+        self.count = total
+
+    def variance(self) -> float:
+        """Population variance summed over channels"""
+        return float(self.m2.sum() / self.count) if self.count else 0.0
+
+    def reset(self):
+        self.count = 0
+        self.mean[:] = 0.0
+        self.m2[:] = 0.0
+
+
+class OnlineSessionAnalyzer:
+    """
+    Streaming counterpart of SessionAnalyzer
+
+    Frames are fed in batches as they are captured. Every detector keeps O(1)
+    state between batches (a Welford accumulator for the current tremor
+    window, the wrist sample from the previous speed window, the last kept
+    timestamp per issue type), so the whole session is a single pass and
+    result() is ready as soon as the last batch arrives. For the same frames
+    it produces the same issues as SessionAnalyzer.analyze_session.
+
+    Also counts reps and tracks live statistics for progress reporting: the
+    running min/max of the tracked joint angle and an EWMA of wrist speed.
+    """
+
+    def __init__(self, exercise_config: ConfigLike, speed_alpha: float = 0.3):
+        self.batch = SessionAnalyzer(exercise_config)
+        self.reps = RepCounter.for_config(self.batch.evaluator)
+        self.speed_alpha = speed_alpha
+        self.frame_count = 0
+
+        # Detector order matches SessionAnalyzer.analyze_session
+        self._tremor = IssueStream(TREMOR_DEDUPE)
+        self._support = IssueStream(SUPPORT_DEDUPE)
+        self._compensation = IssueStream(COMPENSATION_DEDUPE)
+        self._speed = IssueStream(SPEED_DEDUPE)
+        self._rom = IssueStream(ROM_DEDUPE)
+        self._form = IssueStream(FORM_DEDUPE)
+        self._streams = [self._tremor, self._support, self._compensation, self._speed, self._rom, self._form]
+        self._sampled: List[tuple] = [
+            (SUPPORT_STRIDE, self.batch.check_opposite_hand_support, self._support),
+            (COMPENSATION_STRIDE, self.batch.check_compensation_patterns, self._compensation),
+            (ROM_STRIDE, self.batch.check_range_of_motion, self._rom),
+            (FORM_STRIDE, self.batch.check_form_deviations, self._form),
+        ]
+
+        self._elbow = WelfordVariance(3)
+        self._previous_wrist: Optional[np.ndarray] = None
+        self._previous_wrist_time = math.nan
+
+        self.angle_min = math.inf
+        self.angle_max = -math.inf
+        self.speed_ewma: Optional[float] = None
+
+    def update(self, landmarks: np.ndarray, timestamps: np.ndarray) -> int:
+        """
+        Feed the next batch of frames
+
+        Args:
+            landmarks: (frames x 33 x 4) landmark array
+            timestamps: (frames,) timestamps in seconds
+
+        Returns:
+            Number of issues kept so far
+        """
+        landmarks = np.asarray(landmarks, dtype=np.float64)
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+        n = len(landmarks)
+        if n == 0:
+            return self.issue_count
+        frame_index = self.frame_count + np.arange(n)
+
+        self._update_tremor(landmarks, timestamps, frame_index)
+        self._update_speed(landmarks, timestamps, frame_index)
+        for stride, check, stream in self._sampled:
+            stream.add(check(landmarks, np.flatnonzero(frame_index % stride == 0), timestamps))
+
+        angle = self.batch.tracked_angle(landmarks, np.arange(n))
+        if angle is not None and not np.isnan(angle).all():
+            self.angle_min = min(self.angle_min, float(np.nanmin(angle)))
+            self.angle_max = max(self.angle_max, float(np.nanmax(angle)))
+        if self.reps is not None:
+            self.reps.update(landmarks, timestamps)
+
+        self.frame_count += n
+        return self.issue_count
+
+    def _update_tremor(self, landmarks: np.ndarray, timestamps: np.ndarray, frame_index: np.ndarray):
+        positions = landmarks[:, POSE_LANDMARKS["RIGHT_ELBOW"], :3]
+        valid = ~np.isnan(positions).any(axis=1)
+
+        start = 0
+        # Window boundaries in this batch: the frame at a boundary closes the previous
+        # window (its timestamp labels the issue) and opens the next one
+        for position in np.flatnonzero((frame_index % TREMOR_WINDOW == 0) & (frame_index > 0)):
+            self._elbow.add(positions[start:position][valid[start:position]])
+            if tremor_flagged(self._elbow.variance(), self._elbow.count):
+                self._tremor.add([{**TREMOR_ISSUE, "timestamp": timestamps[position].item()}])
+            self._elbow.reset()
+            start = position
+        self._elbow.add(positions[start:][valid[start:]])
+
+    def _update_speed(self, landmarks: np.ndarray, timestamps: np.ndarray, frame_index: np.ndarray):
+        wrists = landmarks[:, POSE_LANDMARKS["RIGHT_WRIST"], :3]
+        for position in np.flatnonzero(frame_index % SPEED_WINDOW == 0):
+            wrist = wrists[position]
+            if self._previous_wrist is not None and not np.isnan(wrist).any() and frame_index[position] > 0:
+                time_diff = timestamps[position] - self._previous_wrist_time
+                distance = distance3d(wrist, self._previous_wrist)
+                if speed_flagged(distance, time_diff):
+                    self._speed.add([{**SPEED_ISSUE, "timestamp": timestamps[position].item()}])
+                if time_diff > 0:
+                    speed = float(distance / time_diff)
+                    self.speed_ewma = speed if self.speed_ewma is None else (
+                        self.speed_alpha * speed + (1 - self.speed_alpha) * self.speed_ewma)
+            valid = not np.isnan(wrist).any()
+            self._previous_wrist = wrist if valid else None
+            self._previous_wrist_time = timestamps[position]
+
+    @property
+    def issue_count(self) -> int:
+        return sum(len(stream.issues) for stream in self._streams)
+
+    def progress(self) -> Dict:
+        """Live statistics for the frames seen so far"""
+        return {
+            "frames": self.frame_count,
+            "issues": self.issue_count,
+            "reps": self.reps.rep_count if self.reps is not None else None,
+            "angle_range": [round(self.angle_min, 1), round(self.angle_max, 1)] if self.angle_min <= self.angle_max else None,
+            "wrist_speed_ewma": round(self.speed_ewma, 4) if self.speed_ewma is not None else None,
+        }
+
+    def result(self) -> Dict:
+        """Same shape as SessionAnalyzer.analyze_session, with the server-side rep count added as reps"""
+        issues = [issue for stream in self._streams for issue in stream.ordered()]
+        self.batch.detected_issues = sorted(issues, key=lambda issue: issue["timestamp"])
+        return {
+            "totalIssues": len(self.batch.detected_issues),
+            "issues": self.batch.detected_issues,
+            "summary": self.batch.generate_summary(),
+            "reps": self.reps.result() if self.reps is not None else None,
+        }
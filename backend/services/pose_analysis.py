@@ -0,0 +1,413 @@
+import math
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from services.exercise_configs import POSE_LANDMARKS, NUM_LANDMARKS, ConfigLike, compile_exercise_config
+
+# Channels per landmark in a recorded array: x, y, z, visibility
+CHANNELS = 4
+
+
+def pose_sequence_to_arrays(sequence: Sequence[Dict]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Convert the frontend's recorded pose log into arrays
+
+    Args:
+        sequence: List of {"timestamp", "landmarks": [{"x", "y", "z", "visibility"}, ...]}
+
+    Returns:
+        (landmarks, timestamps) - a (frames x 33 x 4) float64 array with NaN for
+        missing landmarks/frames, and a (frames,) array of timestamps
+    """
+    landmarks = np.full((len(sequence), NUM_LANDMARKS, CHANNELS), np.nan)
+    timestamps = np.empty(len(sequence))
+    for i, frame in enumerate(sequence):
+        timestamps[i] = frame.get("timestamp", np.nan)
+        for j, point in enumerate((frame.get("landmarks") or [])[:NUM_LANDMARKS]):
+            if point:
+                landmarks[i, j] = (point.get("x", np.nan), point.get("y", np.nan),
+                                   point.get("z", np.nan), point.get("visibility", np.nan))
+    return landmarks, timestamps
+
+
+def distance3d(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Euclidean distance between (..., 3) point arrays"""
+    return np.sqrt(((b - a) ** 2).sum(axis=-1))
+
+
+def angle3d(a: np.ndarray, b: np.ndarray, c: np.ndarray) -> np.ndarray:
+    """Angle ABC in degrees for (..., 3) point arrays (NaN where undefined, like calculate3DAngle)"""
+    ba = a - b
+    bc = c - b
+    with np.errstate(invalid="ignore", divide="ignore"):
+        cosine = (ba * bc).sum(axis=-1) / (np.sqrt((ba ** 2).sum(axis=-1)) * np.sqrt((bc ** 2).sum(axis=-1)))
+        return np.degrees(np.arccos(cosine))
+
+
+def window_variance(values: np.ndarray, valid: np.ndarray, ends: np.ndarray, window: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Population variance of the `window` frames before each index in `ends`
+
+    Uses prefix sums of x and x^2 so every window costs O(1) regardless of size.
+
+    Args:
+        values: (frames, channels) samples
+        valid: (frames,) mask of samples to include
+        ends: Window end indices (exclusive)
+        window: Window length in frames
+
+    Returns:
+        (variance, count) - per-window summed variance across channels and the
+        number of valid frames in each window
+    """
+    weights = valid.astype(np.float64)
+    samples = np.where(valid[:, None], values, 0.0)
+    zero = np.zeros((1, values.shape[1]))
+    sums = np.concatenate([zero, np.cumsum(samples, axis=0)])
+    squares = np.concatenate([zero, np.cumsum(samples ** 2, axis=0)])
+    counts = np.concatenate([[0.0], np.cumsum(weights)])
+
+    count = counts[ends] - counts[ends - window]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = (sums[ends] - sums[ends - window]) / count[:, None]
+        variance = (squares[ends] - squares[ends - window]) / count[:, None] - mean ** 2
+    return np.maximum(variance, 0.0).sum(axis=1), count
+
+
+def round_half_up(value: float) -> int:
+    """Math.round semantics (Python's round() is banker's rounding)"""
+    return int(math.floor(value + 0.5))
+
+
+def deduplicate_nearby_issues(issues: List[Dict], window_seconds: float) -> List[Dict]:
+    """Keep at most one issue of each type per time window"""
+    if not issues:
+        return issues
+
+    by_type: Dict[str, List[Dict]] = {}
+    for issue in issues:
+        by_type.setdefault(issue["type"], []).append(issue)
+
+    deduplicated = []
+    for type_issues in by_type.values():
+        last_timestamp = -math.inf
+        for issue in sorted(type_issues, key=lambda item: item["timestamp"]):
+            if issue["timestamp"] - last_timestamp >= window_seconds:
+                deduplicated.append(issue)
+                last_timestamp = issue["timestamp"]
+
+    return sorted(deduplicated, key=lambda item: item["timestamp"])
+
+
+TREMOR_ISSUE = {
+    "type": "tremor",
+    "severity": "medium",
+    "location": "Right Elbow",
+    "message": "Significant tremor detected - consider reducing weight",
+    "details": "Instability detected",
+}
+
+SPEED_ISSUE = {
+    "type": "movement_too_fast",
+    "severity": "medium",
+    "location": "Movement speed",
+    "message": "Movement too fast - slow down for better control",
+    "details": "Fast movement detected",
+}
+
+# Frame spacing and dedupe windows (seconds) of the detectors
+TREMOR_WINDOW, TREMOR_DEDUPE = 30, 8.0
+SPEED_WINDOW, SPEED_DEDUPE = 25, 8.0
+SUPPORT_STRIDE, SUPPORT_DEDUPE = 15, 3.0
+COMPENSATION_STRIDE, COMPENSATION_DEDUPE = 30, 6.0
+ROM_STRIDE, ROM_DEDUPE = 45, 8.0
+FORM_STRIDE, FORM_DEDUPE = 35, 7.0
+
+# Elbow position variance above which a window counts as tremor, and the share
+# of the window's frames that must have the landmarks
+TREMOR_THRESHOLD = 0.008
+TREMOR_MIN_COVERAGE = 0.8
+
+# Wrist speeds (normalized units per second) counted as too fast; faster ones are tracking glitches
+SPEED_THRESHOLD, SPEED_MAX = 0.8, 10.0
+
+
+def tremor_flagged(variance, count):
+    return (count >= TREMOR_WINDOW * TREMOR_MIN_COVERAGE) & (variance > TREMOR_THRESHOLD)
+
+
+def speed_flagged(distance, time_diff):
+    with np.errstate(invalid="ignore", divide="ignore"):
+        speed = distance / time_diff
+        return ((time_diff > 0) & np.isfinite(time_diff) & np.isfinite(speed) & (speed <= SPEED_MAX)
+                & (speed > SPEED_THRESHOLD))
+
+
+class SessionAnalyzer:
+    """
+    Vectorized port of the frontend SessionAnalyzer (advancedAnalysis.js)
+
+    Works on a whole recording at once: landmarks is a (frames x 33 x 4) array
+    (x, y, z, visibility; NaN where a landmark was not detected) and timestamps
+    is a (frames,) array in seconds. Every detector evaluates its sampled frames
+    or sliding windows as array operations, and the result has the same shape as
+    analyzeSession's so it can be posted straight to /api/claude-analysis.
+    """
+
+    def __init__(self, exercise_config: ConfigLike):
+        self.evaluator = compile_exercise_config(exercise_config)
+        self.detected_issues: List[Dict] = []
+
+    def analyze_session(self, landmarks: np.ndarray, timestamps: np.ndarray) -> Dict:
+        """
+        Run all detectors over a recorded session
+
+        Args:
+            landmarks: (frames x 33 x 4) landmark array
+            timestamps: (frames,) timestamps in seconds
+
+        Returns:
+            {"totalIssues", "issues", "summary"} matching the frontend analyzer
+        """
+        landmarks = np.asarray(landmarks, dtype=np.float64)
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+        if landmarks.ndim != 3 or landmarks.shape[1] != NUM_LANDMARKS or landmarks.shape[2] < 3:
+            raise ValueError(f"Expected a (frames x {NUM_LANDMARKS} x {CHANNELS}) landmark array, got {landmarks.shape}")
+        if timestamps.shape != (landmarks.shape[0],):
+            raise ValueError("Expected one timestamp per frame")
+
+        issues = []
+        for detector in (
+            self.detect_tremor,
+            self.detect_opposite_hand_support,
+            self.detect_compensation_patterns,
+            self.detect_speed_variations,
+            self.detect_range_of_motion_issues,
+            self.detect_balance_problems,
+            self.detect_form_deviations,
+            self.detect_asymmetry,
+            self.detect_fatigue_signs,
+        ):
+            issues.extend(detector(landmarks, timestamps))
+
+        # Stable sort keeps detector order for equal timestamps, like Array.sort
+        self.detected_issues = sorted(issues, key=lambda issue: issue["timestamp"])
+        return {
+            "totalIssues": len(self.detected_issues),
+            "issues": self.detected_issues,
+            "summary": self.generate_summary(),
+        }
+
+    @staticmethod
+    def _points(landmarks: np.ndarray, frames: np.ndarray, *names: str) -> Tuple[List[np.ndarray], np.ndarray]:
+        """xyz of the named landmarks at the given frames plus a mask of frames where all are present"""
+        points = [landmarks[frames, POSE_LANDMARKS[name], :3] for name in names]
+        valid = np.logical_and.reduce([~np.isnan(p).any(axis=-1) for p in points])
+        return points, valid
+
+    @staticmethod
+    def _emit(flagged: List[Tuple[np.ndarray, Dict]], frames: np.ndarray, timestamps: np.ndarray,
+              details: Optional[Dict[int, Dict[int, str]]] = None) -> List[Dict]:
+        """
+        Build issue dicts from per-check masks, in the frontend's push order
+
+        Args:
+            flagged: (mask over frames, issue template) per check, in check order
+            frames: Sampled frame indices the masks refer to
+            timestamps: Session timestamps
+            details: Optional per-check {position: details} overrides, keyed by check index
+
+        Returns:
+            Issues ordered by frame, then by check
+        """
+        ordered = []
+        for check, (mask, template) in enumerate(flagged):
+            for position in np.flatnonzero(mask):
+                issue = {**template, "timestamp": timestamps[frames[position]].item()}
+                if details and check in details:
+                    issue["details"] = details[check][position]
+                ordered.append((frames[position], check, issue))
+        ordered.sort(key=lambda item: (item[0], item[1]))
+        return [issue for _, _, issue in ordered]
+
+    def detect_tremor(self, landmarks: np.ndarray, timestamps: np.ndarray) -> List[Dict]:
+        """Positional variance of the right elbow over consecutive 1 second windows"""
+        ends = np.arange(TREMOR_WINDOW, len(landmarks), TREMOR_WINDOW)
+        if len(ends) == 0:
+            return []
+
+        positions = landmarks[:, POSE_LANDMARKS["RIGHT_ELBOW"], :3]
+        variance, count = window_variance(positions, ~np.isnan(positions).any(axis=1), ends, TREMOR_WINDOW)
+        issues = self._emit([(tremor_flagged(variance, count), TREMOR_ISSUE)], ends, timestamps)
+        return deduplicate_nearby_issues(issues, TREMOR_DEDUPE)
+
+    def detect_opposite_hand_support(self, landmarks: np.ndarray, timestamps: np.ndarray) -> List[Dict]:
+        """Left wrist touching the working (right) arm"""
+        frames = np.arange(0, len(landmarks), SUPPORT_STRIDE)
+        return deduplicate_nearby_issues(self.check_opposite_hand_support(landmarks, frames, timestamps), SUPPORT_DEDUPE)
+
+    def check_opposite_hand_support(self, landmarks: np.ndarray, frames: np.ndarray, timestamps: np.ndarray) -> List[Dict]:
+        (right_wrist, right_elbow, left_wrist), valid = self._points(
+            landmarks, frames, "RIGHT_WRIST", "RIGHT_ELBOW", "LEFT_WRIST")
+
+        touching = (distance3d(left_wrist, right_elbow) < 0.08) | (distance3d(left_wrist, right_wrist) < 0.08)
+
+        return self._emit([(valid & touching, {
+            "type": "opposite_support",
+            "severity": "high",
+            "location": "Hand positioning",
+            "message": "Using left hand for support - work arm independently",
+            "details": "Support detected",
+        })], frames, timestamps)
+
+    def detect_compensation_patterns(self, landmarks: np.ndarray, timestamps: np.ndarray) -> List[Dict]:
+        """Lateral lean, forward/backward lean and shoulder-vs-hip rotation"""
+        frames = np.arange(0, len(landmarks), COMPENSATION_STRIDE)
+        return deduplicate_nearby_issues(self.check_compensation_patterns(landmarks, frames, timestamps), COMPENSATION_DEDUPE)
+
+    def check_compensation_patterns(self, landmarks: np.ndarray, frames: np.ndarray, timestamps: np.ndarray) -> List[Dict]:
+        (left_shoulder, right_shoulder, left_hip, right_hip), valid = self._points(
+            landmarks, frames, "LEFT_SHOULDER", "RIGHT_SHOULDER", "LEFT_HIP", "RIGHT_HIP")
+
+        shoulder_mid = (left_shoulder + right_shoulder) / 2
+        hip_mid = (left_hip + right_hip) / 2
+        lateral_lean = np.abs(shoulder_mid[:, 0] - hip_mid[:, 0])
+        sagittal_lean = np.abs(shoulder_mid[:, 2] - hip_mid[:, 2])
+        leaning_forward = shoulder_mid[:, 2] > hip_mid[:, 2]
+
+        shoulder_angle = np.degrees(np.arctan2(right_shoulder[:, 1] - left_shoulder[:, 1],
+                                               right_shoulder[:, 0] - left_shoulder[:, 0]))
+        hip_angle = np.degrees(np.arctan2(right_hip[:, 1] - left_hip[:, 1], right_hip[:, 0] - left_hip[:, 0]))
+        rotation = np.abs(shoulder_angle - hip_angle)
+        rotation = np.where(rotation > 180, 360 - rotation, rotation)
+
+        lateral = valid & (lateral_lean > 0.20)
+        sagittal = valid & (sagittal_lean > 0.25)
+        twisting = valid & (rotation > 35) & (rotation < 180)
+
+        posture_template = {"type": "posture_lean", "severity": "medium", "location": "Posture",
+                            "details": "Posture issue detected"}
+        return self._emit([
+            (lateral, {
+                "type": "lateral_lean",
+                "severity": "medium",
+                "location": "Posture",
+                "message": "Leaning to the side - keep torso upright",
+                "details": "Significant lean detected",
+            }),
+            (sagittal & leaning_forward, {**posture_template, "message": "Leaning forward - engage core"}),
+            (sagittal & ~leaning_forward, {**posture_template, "message": "Leaning backward - maintain posture"}),
+            (twisting, {
+                "type": "torso_rotation",
+                "severity": "medium",
+                "location": "Torso",
+                "message": "Excessive twisting detected - keep shoulders square",
+            }),
+        ], frames, timestamps, details={
+            3: {position: f"{round_half_up(rotation[position])}° rotation" for position in np.flatnonzero(twisting)},
+        })
+
+    def detect_speed_variations(self, landmarks: np.ndarray, timestamps: np.ndarray) -> List[Dict]:
+        """Right wrist speed between frames 25 apart"""
+        ends = np.arange(SPEED_WINDOW, len(landmarks), SPEED_WINDOW)
+        if len(ends) == 0:
+            return []
+
+        (wrist,), valid = self._points(landmarks, ends, "RIGHT_WRIST")
+        (previous,), previous_valid = self._points(landmarks, ends - SPEED_WINDOW, "RIGHT_WRIST")
+        time_diff = timestamps[ends] - timestamps[ends - SPEED_WINDOW]
+        flagged = valid & previous_valid & speed_flagged(distance3d(wrist, previous), time_diff)
+
+        issues = self._emit([(flagged, SPEED_ISSUE)], ends, timestamps)
+        return deduplicate_nearby_issues(issues, SPEED_DEDUPE)
+
+    def detect_range_of_motion_issues(self, landmarks: np.ndarray, timestamps: np.ndarray) -> List[Dict]:
+        """Tracked joint angle stopping 20-35 degrees short of either end of the movement"""
+        frames = np.arange(0, len(landmarks), ROM_STRIDE)
+        return deduplicate_nearby_issues(self.check_range_of_motion(landmarks, frames, timestamps), ROM_DEDUPE)
+
+    def tracked_angle(self, landmarks: np.ndarray, frames: np.ndarray) -> Optional[np.ndarray]:
+        """Angle of the config's rep-counting joint at the given frames (None if not angle based)"""
+        if self.evaluator.angle_landmarks is None:
+            return None
+        a, b, c = (landmarks[frames, index, :3] for index in self.evaluator.angle_landmarks)
+        return angle3d(a, b, c)
+
+    def check_range_of_motion(self, landmarks: np.ndarray, frames: np.ndarray, timestamps: np.ndarray) -> List[Dict]:
+        angle = self.tracked_angle(landmarks, frames)
+        if angle is None:
+            return []
+        measured = ~np.isnan(angle) & (angle != 0)
+
+        expected_min = self.evaluator.end_angle
+        expected_max = self.evaluator.start_angle
+        short_bottom = measured & (angle > expected_min + 20) & (angle < expected_min + 35)
+        short_top = measured & (angle < expected_max - 20) & (angle > expected_max - 35)
+
+        return self._emit([
+            (short_bottom, {
+                "type": "limited_range_bottom",
+                "severity": "low",
+                "location": "Range of motion",
+                "message": "Not reaching full bottom position - go deeper",
+            }),
+            (short_top, {
+                "type": "limited_range_top",
+                "severity": "low",
+                "location": "Range of motion",
+                "message": "Not reaching full top position - extend fully",
+            }),
+        ], frames, timestamps, details={
+            0: {p: f"{round_half_up(angle[p])}° (target: {expected_min:g}°)" for p in np.flatnonzero(short_bottom)},
+            1: {p: f"{round_half_up(angle[p])}° (target: {expected_max:g}°)" for p in np.flatnonzero(short_top)},
+        })
+
+    def detect_balance_problems(self, landmarks: np.ndarray, timestamps: np.ndarray) -> List[Dict]:
+        """Disabled in the frontend analyzer (too many false positives); kept for parity"""
+        return []
+
+    def detect_form_deviations(self, landmarks: np.ndarray, timestamps: np.ndarray) -> List[Dict]:
+        """Exercise-specific checks for bicep curls and shoulder press"""
+        frames = np.arange(0, len(landmarks), FORM_STRIDE)
+        return deduplicate_nearby_issues(self.check_form_deviations(landmarks, frames, timestamps), FORM_DEDUPE)
+
+    def check_form_deviations(self, landmarks: np.ndarray, frames: np.ndarray, timestamps: np.ndarray) -> List[Dict]:
+        evaluator = self.evaluator
+        if not evaluator.form_predicates:
+            return []
+        valid = np.logical_and.reduce([~np.isnan(landmarks[frames, index, :3]).any(axis=-1)
+                                       for index in evaluator.form_landmarks])
+
+        flagged = []
+        for predicate in evaluator.form_predicates:
+            value = landmarks[frames, predicate.a, 2] - landmarks[frames, predicate.b, 2]
+            if predicate.absolute:
+                value = np.abs(value)
+            crossed = value > predicate.threshold if predicate.above else value < predicate.threshold
+            flagged.append((valid & crossed, predicate.issue))
+        return self._emit(flagged, frames, timestamps)
+
+    def detect_asymmetry(self, landmarks: np.ndarray, timestamps: np.ndarray) -> List[Dict]:
+        """Disabled in the frontend analyzer (unreliable across camera angles); kept for parity"""
+        return []
+
+    def detect_fatigue_signs(self, landmarks: np.ndarray, timestamps: np.ndarray) -> List[Dict]:
+        """Disabled in the frontend analyzer (too many false positives); kept for parity"""
+        return []
+
+    def generate_summary(self) -> Dict:
+        """Issue counts by type and severity"""
+        summary = {
+            "totalIssues": len(self.detected_issues),
+            "byType": {},
+            "bySeverity": {"high": 0, "medium": 0, "low": 0},
+        }
+        for issue in self.detected_issues:
+            summary["byType"][issue["type"]] = summary["byType"].get(issue["type"], 0) + 1
+            summary["bySeverity"][issue["severity"]] += 1
+        return summary
+
+
+def analyze_pose_sequence(sequence: Sequence[Dict], exercise_config: ConfigLike) -> Dict:
+    """Analyze a recorded pose log in the frontend's JSON format"""
+    landmarks, timestamps = pose_sequence_to_arrays(sequence)
+    return SessionAnalyzer(exercise_config).analyze_session(landmarks, timestamps)
@@ -0,0 +1,286 @@
+from dotenv import load_dotenv
+import os
+import re
+import struct
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from services.exercise_configs import NUM_LANDMARKS, ExerciseEvaluator
+from services.pose_analysis import angle3d
+
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:
+    FCNTL_AVAILABLE = False
+
+load_dotenv()
+
+# Archive of one patient's recordings of one exercise, a directory of
+# append-only columns (all little-endian):
+#   index.bin    header (magic "PLPA", version, channels, 2 pad bytes, 8 reserved),
+#                then one INDEX_DTYPE record per session in append order
+#   frames.f16   frames x 33 x CHANNELS float16 (x, y, z, visibility; NaN if missing)
+#   times.f32    frames float32 seconds from the start of each session
+#   reps.f32     rep completion times, seconds from the start of each session
+# A session's index record points at its rows in the other columns. Columns are
+# written before the record, so readers never see a record without its data,
+# and column bytes past the last record (an interrupted append) are overwritten
+# by the next one.
+MAGIC = b"PLPA"
+VERSION = 1
+HEADER = struct.Struct("<4sBB2x8x")
+CHANNELS = 4
+FRAME_DTYPE = np.dtype("<f2")
+TIME_DTYPE = np.dtype("<f4")
+INDEX_DTYPE = np.dtype([
+    ("session_id", "<u4"),
+    ("recorded_at", "<f8"),     # Unix time the session was completed
+    ("frame_start", "<u8"),     # Row of the first frame in frames.f16 / times.f32
+    ("frames", "<u4"),
+    ("fps", "<f4"),
+    ("duration", "<f4"),
+    ("min_angle", "<f4"),       # Tracked joint angle range (NaN without angle-based tracking)
+    ("max_angle", "<f4"),
+    ("rep_start", "<u8"),       # Row of the first rep time in reps.f32
+    ("reps", "<u4"),
+    ("issues", "<u4"),
+])
+
+FRAMES_FILE = "frames.f16"
+TIMES_FILE = "times.f32"
+REPS_FILE = "reps.f32"
+INDEX_FILE = "index.bin"
+
+_SAFE_KEY = re.compile(r"[^A-Za-z0-9_.-]")
+
+
+class PoseArchiveError(ValueError):
+    pass
+
+
+def angle_range(evaluator: Optional[ExerciseEvaluator], landmarks: np.ndarray) -> Tuple[float, float]:
+    """(min, max) of the evaluator's tracked joint angle over a recording, NaN if there is none"""
+    if evaluator is None or evaluator.angle_landmarks is None or len(landmarks) == 0:
+        return float("nan"), float("nan")
+    a, b, c = (np.asarray(landmarks[:, index, :3], dtype=np.float64) for index in evaluator.angle_landmarks)
+    angles = angle3d(a, b, c)
+    angles = angles[np.isfinite(angles)]
+    if len(angles) == 0:
+        return float("nan"), float("nan")
+    return float(angles.min()), float(angles.max())
+
+
+def _map(path: str, dtype: np.dtype, start: int, count: int, shape: Tuple = ()) -> np.ndarray:
+    """Read-only memory map of rows [start, start + count) of a column file"""
+    if count == 0:
+        return np.empty((0, *shape), dtype)
+    row_bytes = dtype.itemsize * int(np.prod(shape, dtype=np.int64))
+    return np.memmap(path, dtype=dtype, mode="r", offset=start * row_bytes, shape=(count, *shape))
+
+
+class PatientExerciseArchive:
+    """Columns of one patient / exercise archive (see the layout above)"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.index_path = os.path.join(path, INDEX_FILE)
+        self.frames_path = os.path.join(path, FRAMES_FILE)
+        self.times_path = os.path.join(path, TIMES_FILE)
+        self.reps_path = os.path.join(path, REPS_FILE)
+
+    def index(self) -> np.ndarray:
+        """All complete index records (a memory map; empty if nothing is archived)"""
+        try:
+            size = os.path.getsize(self.index_path)
+        except FileNotFoundError:
+            return np.empty(0, INDEX_DTYPE)
+        count = max(0, size - HEADER.size) // INDEX_DTYPE.itemsize
+        if count == 0:
+            return np.empty(0, INDEX_DTYPE)
+        with open(self.index_path, "rb") as f:
+            magic, version, channels = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC or version != VERSION or channels != CHANNELS:
+            raise PoseArchiveError(f"{self.index_path} is not a version {VERSION} pose archive index")
+        return np.memmap(self.index_path, dtype=INDEX_DTYPE, mode="r", offset=HEADER.size, shape=(count,))
+
+    def append(self, record: Dict, landmarks: np.ndarray, timestamps: np.ndarray, rep_timestamps: np.ndarray):
+        os.makedirs(self.path, exist_ok=True)
+        with open(self.index_path, "a+b") as index_file:
+            if FCNTL_AVAILABLE:
+                # Serializes appends from several API workers
+                fcntl.flock(index_file, fcntl.LOCK_EX)
+            try:
+                index_file.seek(0, os.SEEK_END)
+                size = index_file.tell()
+                if size < HEADER.size:
+                    index_file.truncate(0)
+                    index_file.write(HEADER.pack(MAGIC, VERSION, CHANNELS))
+                    size = HEADER.size
+                count = (size - HEADER.size) // INDEX_DTYPE.itemsize
+                if size != HEADER.size + count * INDEX_DTYPE.itemsize:
+                    # Drop a partly written record
+                    index_file.truncate(HEADER.size + count * INDEX_DTYPE.itemsize)
+
+                frame_start, rep_start = 0, 0
+                if count:
+                    index_file.seek(HEADER.size + (count - 1) * INDEX_DTYPE.itemsize)
+                    last = np.frombuffer(index_file.read(INDEX_DTYPE.itemsize), INDEX_DTYPE)[0]
+                    frame_start = int(last["frame_start"]) + int(last["frames"])
+                    rep_start = int(last["rep_start"]) + int(last["reps"])
+
+                self._write_column(self.frames_path, frame_start * CHANNELS * NUM_LANDMARKS * FRAME_DTYPE.itemsize,
+                                   landmarks.tobytes())
+                self._write_column(self.times_path, frame_start * TIME_DTYPE.itemsize, timestamps.tobytes())
+                self._write_column(self.reps_path, rep_start * TIME_DTYPE.itemsize, rep_timestamps.tobytes())
+
+                entry = np.zeros(1, INDEX_DTYPE)
+                for key, value in record.items():
+                    entry[key] = value
+                entry["frame_start"] = frame_start
+                entry["frames"] = len(timestamps)
+                entry["rep_start"] = rep_start
+                entry["reps"] = len(rep_timestamps)
+                index_file.seek(0, os.SEEK_END)
+                index_file.write(entry.tobytes())
+                index_file.flush()
+                os.fsync(index_file.fileno())
+            finally:
+                if FCNTL_AVAILABLE:
+                    fcntl.flock(index_file, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _write_column(path: str, offset: int, data: bytes):
+        with open(path, "r+b" if os.path.exists(path) else "w+b") as f:
+            f.truncate(offset)
+            f.seek(offset)
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def frames(self, record: np.void) -> Tuple[np.ndarray, np.ndarray]:
+        start, count = int(record["frame_start"]), int(record["frames"])
+        landmarks = _map(self.frames_path, FRAME_DTYPE, start, count, (NUM_LANDMARKS, CHANNELS))
+        return landmarks, _map(self.times_path, TIME_DTYPE, start, count)
+
+    def rep_timestamps(self, record: np.void) -> np.ndarray:
+        return _map(self.reps_path, TIME_DTYPE, int(record["rep_start"]), int(record["reps"]))
+
+
+class PoseArchive:
+    """
+    Long-term store of pose recordings for longitudinal queries
+
+    One append-only archive per patient and exercise, with fixed-width float16
+    frames, a session index and per-session aggregates (tracked angle range,
+    rep times, issue count) computed once at append time. Listing sessions
+    over a date range reads only the index; fetching a time window of one
+    session maps only the pages holding those frames. Set POSE_ARCHIVE_DIR
+    to an empty string to disable archiving.
+    """
+
+    def __init__(self, root: Optional[str] = None):
+        self.root = os.getenv("POSE_ARCHIVE_DIR", "pose_archive") if root is None else root
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.root)
+
+    def archive(self, patient: str, exercise_id: int) -> PatientExerciseArchive:
+        return PatientExerciseArchive(os.path.join(self.root, _SAFE_KEY.sub("_", patient), str(exercise_id)))
+
+    def append(self, patient: str, exercise_id: int, session_id: int, recorded_at: float, fps: float,
+               landmarks: np.ndarray, timestamps: np.ndarray, analysis: Optional[Dict] = None,
+               evaluator: Optional[ExerciseEvaluator] = None):
+        """
+        Archive one session's recording
+
+        Args:
+            patient: Patient key
+            exercise_id: Exercise the recording belongs to
+            session_id: Recorded session id
+            recorded_at: Unix time the session was completed
+            fps: Capture rate
+            landmarks: (frames x 33 x channels) landmark array
+            timestamps: (frames,) timestamps in seconds
+            analysis: Session analysis, for the issue count and rep times
+            evaluator: Compiled exercise config, for the tracked angle range
+        """
+        frames = len(timestamps)
+        packed = np.full((frames, NUM_LANDMARKS, CHANNELS), np.nan, dtype=FRAME_DTYPE)
+        channels = min(CHANNELS, landmarks.shape[2])
+        packed[:, :, :channels] = landmarks[:, :NUM_LANDMARKS, :channels]
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+        start = timestamps[0] if frames else 0.0
+        times = (timestamps - start).astype(TIME_DTYPE)
+
+        analysis = analysis or {}
+        reps = analysis.get("reps") or {}
+        rep_times = (np.asarray(reps.get("repTimestamps", []), dtype=np.float64) - start).astype(TIME_DTYPE)
+        min_angle, max_angle = angle_range(evaluator, landmarks)
+
+        self.archive(patient, exercise_id).append({
+            "session_id": session_id,
+            "recorded_at": recorded_at,
+            "fps": fps,
+            "duration": float(times[-1]) + 1.0 / fps if frames else 0.0,
+            "min_angle": min_angle,
+            "max_angle": max_angle,
+            "issues": analysis.get("totalIssues", 0),
+        }, packed, times, rep_times)
+
+    def sessions(self, patient: str, exercise_id: int, since: Optional[float] = None,
+                 until: Optional[float] = None) -> List[Dict]:
+        """
+        Aggregates of the archived sessions completed in [since, until), oldest first
+
+        Reads only the index and rep time columns. A session archived more than
+        once (e.g. re-uploaded frames) is reported from its latest copy.
+        """
+        archive = self.archive(patient, exercise_id)
+        index = archive.index()
+        selected = np.ones(len(index), dtype=bool)
+        if since is not None:
+            selected &= index["recorded_at"] >= since
+        if until is not None:
+            selected &= index["recorded_at"] < until
+        latest = {int(record["session_id"]): record for record in index[selected]}
+
+        sessions = []
+        for record in sorted(latest.values(), key=lambda r: (float(r["recorded_at"]), int(r["session_id"]))):
+            sessions.append({
+                "session_id": int(record["session_id"]),
+                "recorded_at": float(record["recorded_at"]),
+                "frames": int(record["frames"]),
+                "fps": float(record["fps"]),
+                "duration": round(float(record["duration"]), 3),
+                "min_angle": None if np.isnan(record["min_angle"]) else round(float(record["min_angle"]), 2),
+                "max_angle": None if np.isnan(record["max_angle"]) else round(float(record["max_angle"]), 2),
+                "issues": int(record["issues"]),
+                "reps": int(record["reps"]),
+                "rep_timestamps": [round(t, 3) for t in archive.rep_timestamps(record).tolist()],
+            })
+        return sessions
+
+    def frames(self, patient: str, exercise_id: int, session_id: int, start: Optional[float] = None,
+               end: Optional[float] = None) -> Optional[Tuple[np.ndarray, np.ndarray, float]]:
+        """
+        Frames of one archived session between `start` and `end` seconds
+
+        Returns:
+            (landmarks, timestamps, fps) memory-mapped over the archive, or None if
+            the session is not archived
+        """
+        archive = self.archive(patient, exercise_id)
+        index = archive.index()
+        matches = np.flatnonzero(index["session_id"] == session_id)
+        if len(matches) == 0:
+            return None
+        record = index[matches[-1]]
+        landmarks, times = archive.frames(record)
+        first = 0 if start is None else int(np.searchsorted(times, start, side="left"))
+        last = len(times) if end is None else int(np.searchsorted(times, end, side="right"))
+        return landmarks[first:last], times[first:last], float(record["fps"])
+
+
+# Shared instance used by main.py
+pose_archive = PoseArchive()
@@ -0,0 +1,179 @@
+import gzip
+import struct
+import zlib
+from typing import Optional
+import numpy as np
+from services.exercise_configs import NUM_LANDMARKS
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+# Packed pose recording layout (all little-endian):
+#   header   magic "PLPF", version, bits per value (16/32), landmarks per frame,
+#            channels per landmark, flags, 3 pad bytes, fps (f32), exercise id (u32),
+#            frame count (u32)
+#   [timestamps]  frame count x float32 seconds, present if FLAG_TIMESTAMPS
+#   frames   frame count x landmarks x channels values, NaN for missing landmarks
+# The whole blob may be gzip- or zstd-compressed.
+MAGIC = b"PLPF"
+VERSION = 1
+HEADER = struct.Struct("<4sBBBBB3xfII")
+FLAG_TIMESTAMPS = 0x01
+DTYPES = {16: np.dtype("<f2"), 32: np.dtype("<f4")}
+TIMESTAMP_DTYPE = np.dtype("<f4")
+
+GZIP_MAGIC = b"\x1f\x8b"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+
+class PoseFrameFormatError(ValueError):
+    pass
+
+
+class PoseRecording:
+    """
+    A decoded pose recording
+
+    `landmarks` and `timestamps` are read-only views over the uploaded bytes
+    (np.frombuffer), so decoding does not copy the frame data. Without
+    per-frame timestamps in the upload, timestamps count frames at `fps`
+    from zero and `has_timestamps` is False.
+    """
+
+    def __init__(self, fps: float, exercise_id: int, landmarks: np.ndarray, timestamps: np.ndarray, raw: bytes,
+                 has_timestamps: bool = True):
+        self.fps = fps
+        self.exercise_id = exercise_id
+        self.landmarks = landmarks
+        self.timestamps = timestamps
+        self.raw = raw
+        self.has_timestamps = has_timestamps
+
+    @property
+    def frame_count(self) -> int:
+        return self.landmarks.shape[0]
+
+    @property
+    def duration(self) -> float:
+        if self.frame_count == 0:
+            return 0.0
+        return float(self.timestamps[-1] - self.timestamps[0]) + 1.0 / self.fps
+
+    def info(self) -> dict:
+        return {
+            "exercise_id": self.exercise_id,
+            "fps": self.fps,
+            "frames": self.frame_count,
+            "landmarks": self.landmarks.shape[1],
+            "channels": self.landmarks.shape[2],
+            "dtype": self.landmarks.dtype.name,
+            "duration": round(self.duration, 3),
+            "bytes": len(self.raw),
+        }
+
+
+def decompress(data: bytes, max_size: int) -> bytes:
+    """Undo gzip/zstd compression (detected by magic bytes), refusing output over max_size"""
+    if data[:2] == GZIP_MAGIC:
+        decompressor = zlib.decompressobj(wbits=16 + zlib.MAX_WBITS)
+        output = decompressor.decompress(data, max_size + 1)
+        if len(output) > max_size or decompressor.unconsumed_tail:
+            raise PoseFrameFormatError("Decompressed pose data exceeds the upload limit")
+        if not decompressor.eof:
+            raise PoseFrameFormatError("Truncated gzip data")
+        return output
+    if data[:4] == ZSTD_MAGIC:
+        if not ZSTD_AVAILABLE:
+            raise PoseFrameFormatError("zstd-compressed uploads require the zstandard package")
+        try:
+            output = zstandard.ZstdDecompressor().stream_reader(data).read(max_size + 1)
+        except zstandard.ZstdError as e:
+            raise PoseFrameFormatError(f"Invalid zstd data: {e}")
+        if len(output) > max_size:
+            raise PoseFrameFormatError("Decompressed pose data exceeds the upload limit")
+        return output
+    return data
+
+
+def decode_pose_frames(data: bytes, max_size: int = 64 * 1024 * 1024) -> PoseRecording:
+    """
+    Decode a (possibly compressed) packed pose recording
+
+    Args:
+        data: Uploaded bytes
+        max_size: Upper bound on the uncompressed size
+
+    Returns:
+        PoseRecording whose arrays view the uncompressed bytes
+
+    Raises:
+        PoseFrameFormatError: If the header or payload size is invalid
+    """
+    try:
+        raw = decompress(data, max_size)
+    except (zlib.error, EOFError) as e:
+        raise PoseFrameFormatError(f"Invalid gzip data: {e}")
+    if len(raw) < HEADER.size:
+        raise PoseFrameFormatError("Pose data is shorter than its header")
+
+    magic, version, bits, landmark_count, channels, flags, fps, exercise_id, frames = HEADER.unpack_from(raw)
+    if magic != MAGIC:
+        raise PoseFrameFormatError("Not a packed pose recording")
+    if version != VERSION:
+        raise PoseFrameFormatError(f"Unsupported pose format version {version}")
+    if bits not in DTYPES:
+        raise PoseFrameFormatError("Values must be float16 or float32")
+    if landmark_count != NUM_LANDMARKS or channels < 3:
+        raise PoseFrameFormatError(f"Expected {NUM_LANDMARKS} landmarks with at least x, y, z per frame")
+    if not fps > 0:
+        raise PoseFrameFormatError("fps must be positive")
+
+    dtype = DTYPES[bits]
+    offset = HEADER.size
+    timestamps: Optional[np.ndarray] = None
+    if flags & FLAG_TIMESTAMPS:
+        if len(raw) < offset + frames * TIMESTAMP_DTYPE.itemsize:
+            raise PoseFrameFormatError("Pose data is truncated")
+        timestamps = np.frombuffer(raw, dtype=TIMESTAMP_DTYPE, count=frames, offset=offset)
+        offset += frames * TIMESTAMP_DTYPE.itemsize
+
+    values = frames * landmark_count * channels
+    if len(raw) != offset + values * dtype.itemsize:
+        raise PoseFrameFormatError(
+            f"Expected {values * dtype.itemsize} bytes of frame data, got {len(raw) - offset}"
+        )
+    landmarks = np.frombuffer(raw, dtype=dtype, count=values, offset=offset).reshape(frames, landmark_count, channels)
+    has_timestamps = timestamps is not None
+    if not has_timestamps:
+        timestamps = np.arange(frames, dtype=np.float64) / fps
+
+    return PoseRecording(float(fps), exercise_id, landmarks, timestamps, raw, has_timestamps)
+
+
+def encode_pose_frames(landmarks: np.ndarray, fps: float, exercise_id: int,
+                       timestamps: Optional[np.ndarray] = None, bits: int = 16, compress: bool = False) -> bytes:
+    """
+    Pack a (frames x 33 x channels) landmark array into the upload format
+
+    Args:
+        landmarks: Landmark array (NaN for missing landmarks)
+        fps: Capture rate
+        exercise_id: Exercise the recording belongs to
+        timestamps: Optional per-frame timestamps in seconds
+        bits: 16 or 32 bits per value
+        compress: gzip the result
+
+    Returns:
+        Packed bytes accepted by decode_pose_frames
+    """
+    frames, landmark_count, channels = landmarks.shape
+    flags = FLAG_TIMESTAMPS if timestamps is not None else 0
+    parts = [HEADER.pack(MAGIC, VERSION, bits, landmark_count, channels, flags, fps, exercise_id, frames)]
+    if timestamps is not None:
+        parts.append(np.asarray(timestamps, dtype=TIMESTAMP_DTYPE).tobytes())
+    parts.append(np.ascontiguousarray(landmarks, dtype=DTYPES[bits]).tobytes())
+    data = b"".join(parts)
+    return gzip.compress(data) if compress else data
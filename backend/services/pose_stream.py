@@ -0,0 +1,159 @@
+from dotenv import load_dotenv
+import os
+import uuid
+from typing import Dict, Optional, Tuple
+import numpy as np
+from services.exercise_configs import NUM_LANDMARKS, ConfigLike
+from services.online_analysis import OnlineSessionAnalyzer
+from services.pose_analysis import CHANNELS
+from services.pose_frames import PoseRecording, encode_pose_frames
+
+load_dotenv()
+
+
+class PoseStreamError(Exception):
+    pass
+
+
+class PoseStreamBuffer:
+    """
+    Append buffer for the pose frames of one live recording
+
+    Frames arrive in small batches while the patient exercises and are copied
+    into float16 arrays that grow by doubling up to max_frames, so memory per
+    session is bounded (max_frames x 33 x 4 x 2 bytes) and the finished
+    recording is already in one contiguous block when the session is saved.
+    With an analyzer, each batch is analyzed as it is appended, so the
+    analysis is complete as soon as the last batch arrives.
+    """
+
+    def __init__(self, stream_id: str, exercise_id: int, fps: float, max_frames: int, initial_frames: int = 1024,
+                 analyzer: Optional[OnlineSessionAnalyzer] = None):
+        self.stream_id = stream_id
+        self.exercise_id = exercise_id
+        self.fps = fps
+        self.max_frames = max_frames
+        self.analyzer = analyzer
+        self.count = 0
+        capacity = min(initial_frames, max_frames)
+        self._landmarks = np.empty((capacity, NUM_LANDMARKS, CHANNELS), dtype=np.float16)
+        self._timestamps = np.empty(capacity, dtype=np.float32)
+
+    @property
+    def nbytes(self) -> int:
+        return self._landmarks.nbytes + self._timestamps.nbytes
+
+    def _reserve(self, frames: int):
+        needed = self.count + frames
+        if needed > self.max_frames:
+            raise PoseStreamError(f"Recording exceeds {self.max_frames} frames")
+        capacity = len(self._timestamps)
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        capacity = min(capacity, self.max_frames)
+        landmarks = np.empty((capacity, NUM_LANDMARKS, CHANNELS), dtype=np.float16)
+        timestamps = np.empty(capacity, dtype=np.float32)
+        landmarks[:self.count] = self._landmarks[:self.count]
+        timestamps[:self.count] = self._timestamps[:self.count]
+        self._landmarks, self._timestamps = landmarks, timestamps
+
+    def append(self, batch: PoseRecording) -> int:
+        """
+        Append a decoded batch of frames
+
+        Batches without timestamps continue the recording's frame clock at its fps.
+
+        Returns:
+            Total frames buffered
+        """
+        if batch.exercise_id != self.exercise_id:
+            raise PoseStreamError("Pose frames belong to a different exercise")
+        frames, _, channels = batch.landmarks.shape
+        self._reserve(frames)
+
+        end = self.count + frames
+        target = self._landmarks[self.count:end]
+        target[..., :min(channels, CHANNELS)] = batch.landmarks[..., :CHANNELS]
+        if channels < CHANNELS:
+            target[..., channels:] = np.nan
+        if batch.has_timestamps:
+            self._timestamps[self.count:end] = batch.timestamps
+        else:
+            self._timestamps[self.count:end] = self.count / self.fps + batch.timestamps
+        if self.analyzer is not None:
+            # Analyze the stored (float16) values so the result matches a re-analysis of the saved recording
+            self.analyzer.update(target, self._timestamps[self.count:end])
+        self.count = end
+        return self.count
+
+    def frames(self) -> Tuple[np.ndarray, np.ndarray]:
+        """(landmarks, timestamps) views of the frames received so far"""
+        return self._landmarks[:self.count], self._timestamps[:self.count]
+
+    def to_bytes(self) -> bytes:
+        """The whole recording in the packed upload format (float16)"""
+        landmarks, timestamps = self.frames()
+        return encode_pose_frames(landmarks, self.fps, self.exercise_id, timestamps, bits=16)
+
+    def info(self, packed_bytes: int) -> Dict:
+        """PoseRecording.info() of the packed recording (to_bytes(), packed_bytes long), without decoding it"""
+        # The packed header stores fps as float32
+        fps = float(np.float32(self.fps))
+        timestamps = self._timestamps[:self.count]
+        duration = float(timestamps[-1] - timestamps[0]) + 1.0 / fps if self.count else 0.0
+        return {
+            "exercise_id": self.exercise_id,
+            "fps": fps,
+            "frames": self.count,
+            "landmarks": NUM_LANDMARKS,
+            "channels": CHANNELS,
+            "dtype": "float16",
+            "duration": round(duration, 3),
+            "bytes": packed_bytes,
+        }
+
+
+class PoseStreamRegistry:
+    """Live pose streams of this worker, capped in number and size"""
+
+    def __init__(self):
+        self.max_frames = int(os.getenv("POSE_STREAM_MAX_FRAMES", str(30 * 60 * 30)))
+        self.max_active = int(os.getenv("POSE_STREAM_MAX_ACTIVE", "64"))
+        self._streams: Dict[str, PoseStreamBuffer] = {}
+        self._stats = {"opened": 0, "finalized": 0, "aborted": 0, "frames": 0, "batches": 0}
+
+    def open(self, exercise_id: int, fps: float, exercise_config: ConfigLike = None) -> PoseStreamBuffer:
+        if len(self._streams) >= self.max_active:
+            raise PoseStreamError("Too many active pose streams")
+        if not fps > 0:
+            raise PoseStreamError("fps must be positive")
+        stream = PoseStreamBuffer(uuid.uuid4().hex, exercise_id, fps, self.max_frames,
+                                  analyzer=OnlineSessionAnalyzer(exercise_config))
+        self._streams[stream.stream_id] = stream
+        self._stats["opened"] += 1
+        return stream
+
+    def append(self, stream: PoseStreamBuffer, batch: PoseRecording) -> int:
+        total = stream.append(batch)
+        self._stats["frames"] += batch.frame_count
+        self._stats["batches"] += 1
+        return total
+
+    def close(self, stream: PoseStreamBuffer, finalized: bool):
+        if self._streams.pop(stream.stream_id, None) is not None:
+            self._stats["finalized" if finalized else "aborted"] += 1
+
+    def metrics(self) -> Dict:
+        return {
+            **self._stats,
+            "active": len(self._streams),
+            "buffered_bytes": sum(stream.nbytes for stream in self._streams.values()),
+            "max_frames": self.max_frames,
+            "max_active": self.max_active,
+        }
+
+
+# Shared instance used by main.py
+pose_streams = PoseStreamRegistry()
@@ -0,0 +1,280 @@
+from dotenv import load_dotenv
+import os
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from services.http_pool import http_pool
+from services.llm_gateway import TokenBucket
+
+load_dotenv()
+
+PUBMED_EUTILS_URL = os.getenv("PUBMED_EUTILS_URL", "https://eutils.ncbi.nlm.nih.gov/entrez/eutils").rstrip("/")
+ESEARCH_URL = f"{PUBMED_EUTILS_URL}/esearch.fcgi"
+ESUMMARY_URL = f"{PUBMED_EUTILS_URL}/esummary.fcgi"
+
+# Default PUBMED_CACHE_DB, next to main.py rather than in the working directory
+DEFAULT_CACHE_DB = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "pubmed_references.db")
+
+# NCBI allows 3 requests/second without an API key
+NCBI_REQUESTS_PER_SECOND = 3
+ESUMMARY_MAX_IDS = 200
+
+
+def normalize_query(exercise_name: str) -> str:
+    """Case/whitespace-insensitive key for an exercise's reference lookup"""
+    return " ".join(exercise_name.lower().split())
+
+
+def build_reference_query(exercise_name: str) -> str:
+    return f"({exercise_name}) AND (physical therapy OR rehabilitation OR exercise therapy)"
+
+
+def _parse_summary(pmid: str, paper: Dict) -> Dict:
+    return {
+        "pmid": pmid,
+        "title": paper.get("title", ""),
+        "authors": paper.get("authors", [{}])[0].get("name", "Unknown") if paper.get("authors") else "Unknown",
+        "source": paper.get("source", ""),
+        "pubdate": paper.get("pubdate", ""),
+        "url": f"https://pubmed.ncbi.nlm.nih.gov/{pmid}/"
+    }
+
+
+class PubMedReferenceStore:
+    """
+    Persistent PubMed reference store keyed by normalized exercise name
+
+    Fresh entries are served directly; stale entries are served immediately
+    while a background refresh runs (stale-while-revalidate). Misses that arrive
+    within a short window are batched: each query still needs its own esearch,
+    but all PMIDs are resolved with a single esummary call, and every E-utilities
+    request goes through a 3 req/s token bucket.
+
+    The SQLite file (PUBMED_CACHE_DB, empty for memory only) is opened by
+    open(), called from the FastAPI lifespan hook.
+    """
+
+    def __init__(self):
+        self.fresh_ttl = float(os.getenv("PUBMED_FRESH_TTL", str(7 * 24 * 3600)))
+        self.max_stale = float(os.getenv("PUBMED_MAX_STALE", str(90 * 24 * 3600)))
+        self.batch_window = float(os.getenv("PUBMED_BATCH_WINDOW", "0.05"))
+        self.max_results = int(os.getenv("PUBMED_MAX_RESULTS", "3"))
+        self.db_path = os.getenv("PUBMED_CACHE_DB", DEFAULT_CACHE_DB)
+
+        self._bucket = TokenBucket(NCBI_REQUESTS_PER_SECOND * 60, capacity=NCBI_REQUESTS_PER_SECOND)
+        self._entries: Dict[str, Tuple[float, List[Dict]]] = {}
+        self._pending: Dict[str, str] = {}
+        self._futures: Dict[str, asyncio.Future] = {}
+        # Task collecting the next batch; _flushing also holds batches still being fetched
+        self._flush_task: Optional[asyncio.Task] = None
+        self._flushing: Set[asyncio.Task] = set()
+        # query_key -> background refresh of a stale entry
+        self._refreshing: Dict[str, asyncio.Task] = {}
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        self._stats = {
+            "fresh_hits": 0,
+            "stale_hits": 0,
+            "misses": 0,
+            "refreshes": 0,
+            "batches": 0,
+            "esearch_calls": 0,
+            "esummary_calls": 0,
+            "errors": 0,
+        }
+
+
+    # ---------- E-utilities ----------
+
+    async def _esearch(self, term: str) -> List[str]:
+        await self._bucket.acquire()
+        self._stats["esearch_calls"] += 1
+        response = await http_pool.get(ESEARCH_URL, params={
+            "db": "pubmed",
+            "term": term,
+            "retmax": self.max_results,
+            "retmode": "json",
+            "sort": "relevance"
+        }, timeout=10.0)
+        response.raise_for_status()
+        return response.json().get("esearchresult", {}).get("idlist", [])
+
+    async def _esummary(self, pmids: List[str]) -> Dict[str, Dict]:
+        summaries = {}
+        for start in range(0, len(pmids), ESUMMARY_MAX_IDS):
+            chunk = pmids[start:start + ESUMMARY_MAX_IDS]
+            await self._bucket.acquire()
+            self._stats["esummary_calls"] += 1
+            response = await http_pool.get(ESUMMARY_URL, params={
+                "db": "pubmed",
+                "id": ",".join(chunk),
+                "retmode": "json"
+            }, timeout=10.0)
+            response.raise_for_status()
+            result = response.json().get("result", {})
+            for pmid in chunk:
+                if pmid in result:
+                    summaries[pmid] = _parse_summary(pmid, result[pmid])
+        return summaries
+
+    async def _fetch_batch(self, batch: Dict[str, str]) -> Dict[str, List[Dict]]:
+        """Resolve {query_key: exercise_name} with N esearch calls and one esummary"""
+        self._stats["batches"] += 1
+        keys = list(batch)
+        id_lists = await asyncio.gather(*[self._esearch(build_reference_query(batch[k])) for k in keys])
+        all_ids = list(dict.fromkeys(pmid for ids in id_lists for pmid in ids))
+        summaries = await self._esummary(all_ids) if all_ids else {}
+        return {
+            key: [summaries[pmid] for pmid in ids if pmid in summaries]
+            for key, ids in zip(keys, id_lists)
+        }
+
+    # ---------- persistence ----------
+
+    def _persist(self, rows: List[Tuple[str, str, float]]):
+        with self._db_lock:
+            if self._db is None:
+                return
+            self._db.executemany(
+                "INSERT OR REPLACE INTO pubmed_references (query_key, references_json, fetched_at) VALUES (?, ?, ?)",
+                rows,
+            )
+            self._db.commit()
+
+    # ---------- batching ----------
+
+    async def _flush(self):
+        await asyncio.sleep(self.batch_window)
+        batch, self._pending, self._flush_task = self._pending, {}, None
+        try:
+            results = await self._fetch_batch(batch)
+        except Exception as e:
+            self._stats["errors"] += 1
+            print(f"PubMed batch lookup error: {e}")
+            for key in batch:
+                future = self._futures.pop(key)
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        fetched_at = time.time()
+        rows = []
+        for key in batch:
+            references = results.get(key, [])
+            self._entries[key] = (fetched_at, references)
+            rows.append((key, json.dumps(references), fetched_at))
+            future = self._futures.pop(key)
+            if not future.done():
+                future.set_result(references)
+        await asyncio.to_thread(self._persist, rows)
+
+    async def _lookup(self, key: str, exercise_name: str) -> List[Dict]:
+        future = self._futures.get(key)
+        if future is None:
+            future = self._futures[key] = asyncio.get_running_loop().create_future()
+            self._pending[key] = exercise_name
+            if self._flush_task is None:
+                self._flush_task = asyncio.create_task(self._flush())
+                self._flushing.add(self._flush_task)
+                self._flush_task.add_done_callback(self._flushing.discard)
+        return await asyncio.shield(future)
+
+    async def _refresh(self, key: str, exercise_name: str):
+        self._stats["refreshes"] += 1
+        try:
+            await self._lookup(key, exercise_name)
+        except Exception:
+            pass
+        finally:
+            self._refreshing.pop(key, None)
+
+    # ---------- public API ----------
+
+    async def get_references(self, exercise_name: str) -> List[Dict]:
+        """
+        Get PubMed references for an exercise
+
+        Args:
+            exercise_name: Exercise name used to build the PubMed query
+
+        Returns:
+            List of references (empty on lookup failure)
+        """
+        key = normalize_query(exercise_name)
+        entry = self._entries.get(key)
+        if entry is not None:
+            age = time.time() - entry[0]
+            if age < self.fresh_ttl:
+                self._stats["fresh_hits"] += 1
+                return entry[1]
+            if age < self.max_stale:
+                self._stats["stale_hits"] += 1
+                if key not in self._refreshing:
+                    self._refreshing[key] = asyncio.create_task(self._refresh(key, exercise_name))
+                return entry[1]
+
+        self._stats["misses"] += 1
+        try:
+            return await self._lookup(key, exercise_name)
+        except Exception:
+            return []
+
+    def cached_references(self, exercise_name: str) -> Optional[List[Dict]]:
+        """Return stored references without any network I/O (None if unknown)"""
+        entry = self._entries.get(normalize_query(exercise_name))
+        return entry[1] if entry is not None else None
+
+    async def prefetch(self, exercise_names: Iterable[str]):
+        """Warm the store for exercises that are missing or stale"""
+        names = [name for name in exercise_names if name]
+        await asyncio.gather(*[self.get_references(name) for name in names], return_exceptions=True)
+
+    def open(self):
+        """Open the SQLite file and load the stored references (FastAPI lifespan hook)"""
+        if self._db is not None or not self.db_path:
+            return
+        db = sqlite3.connect(self.db_path, check_same_thread=False)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS pubmed_references ("
+            "query_key TEXT PRIMARY KEY, references_json TEXT NOT NULL, fetched_at REAL NOT NULL)"
+        )
+        db.commit()
+        for key, refs, fetched_at in db.execute(
+            "SELECT query_key, references_json, fetched_at FROM pubmed_references"
+        ):
+            # Lookups made before opening are newer than what is stored
+            self._entries.setdefault(key, (fetched_at, json.loads(refs)))
+        with self._db_lock:
+            self._db = db
+
+    async def close(self):
+        """Stop in-flight batches and refreshes, then close the database"""
+        tasks = [*self._flushing, *self._refreshing.values()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for future in self._futures.values():
+            future.cancel()
+        self._pending, self._futures, self._flush_task = {}, {}, None
+        if self._db is not None:
+            with self._db_lock:
+                self._db.close()
+            self._db = None
+
+    def metrics(self) -> Dict:
+        return {
+            **self._stats,
+            "entries": len(self._entries),
+            "pending": len(self._futures),
+            "fresh_ttl_seconds": self.fresh_ttl,
+            "max_stale_seconds": self.max_stale,
+            "persistent": self._db is not None,
+        }
+
+
+# Shared instance used by main.py
+pubmed_store = PubMedReferenceStore()
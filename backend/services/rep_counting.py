@@ -0,0 +1,134 @@
+from typing import Dict, List, Optional
+import numpy as np
+from services.exercise_configs import ConfigLike, ExerciseEvaluator, compile_exercise_config
+from services.pose_analysis import angle3d
+
+# Frames in the moving average applied to the joint angle (maxHistorySize in repCounters.js)
+SMOOTHING_WINDOW = 5
+
+
+def smooth_angles(angles: np.ndarray, history: np.ndarray) -> np.ndarray:
+    """
+    Moving average of each angle with up to SMOOTHING_WINDOW - 1 preceding ones
+
+    A box convolution, but summed oldest-first like the frontend's
+    angleHistory.reduce so thresholds see bit-identical values.
+
+    Args:
+        angles: Valid (finite) angles in frame order
+        history: Up to SMOOTHING_WINDOW - 1 angles preceding `angles`
+    """
+    series = np.concatenate([history, angles])
+    # Leading zeros stand in for a not yet full history: 0.0 + a == a exactly
+    padded = np.concatenate([np.zeros(SMOOTHING_WINDOW - 1), series])
+    total = padded[:len(series)].copy()
+    for offset in range(1, SMOOTHING_WINDOW):
+        total += padded[offset:offset + len(series)]
+    counts = np.minimum(np.arange(1, len(series) + 1), SMOOTHING_WINDOW)
+    return (total / counts)[len(history):]
+
+
+class RepCounter:
+    """
+    Vectorized port of GenericAngleCounter / BicepCurlCounter (repCounters.js)
+
+    The tracked joint angle is computed for a whole block of frames at once,
+    smoothed with a 5-frame moving average and run through the same two-phase
+    hysteresis state machine (down -> up when the angle passes endAngle,
+    up -> down, completing a rep, when it returns past startAngle). Frames
+    where a landmark is missing are skipped, as in the frontend. update() can
+    be called repeatedly with consecutive blocks (e.g. streamed batches); the
+    smoothing history and phase carry over, so the result does not depend on
+    how the recording is split.
+    """
+
+    def __init__(self, evaluator: ExerciseEvaluator):
+        if not evaluator.counts_reps:
+            raise ValueError("Rep counting needs an angle_based config with three landmarks")
+        self.evaluator = evaluator
+
+        self.rep_count = 0
+        self.phase = "down"
+        self.rep_timestamps: List[float] = []
+        self._history = np.empty(0)
+
+    @classmethod
+    def for_config(cls, exercise_config: ConfigLike) -> Optional["RepCounter"]:
+        """Counter for a config, or None if the exercise has no angle-based rep counting"""
+        evaluator = compile_exercise_config(exercise_config)
+        return cls(evaluator) if evaluator.counts_reps else None
+
+    def update(self, landmarks: np.ndarray, timestamps: np.ndarray) -> int:
+        """
+        Count reps over the next block of frames
+
+        Args:
+            landmarks: (frames x 33 x channels) landmark array
+            timestamps: (frames,) timestamps in seconds
+
+        Returns:
+            Total reps so far
+        """
+        evaluator = self.evaluator
+        a, b, c = (np.asarray(landmarks[:, index, :3], dtype=np.float64) for index in evaluator.angle_landmarks)
+        angles = angle3d(a, b, c)
+        valid = np.isfinite(angles)
+        angles = angles[valid]
+        if len(angles) == 0:
+            return self.rep_count
+        times = np.asarray(timestamps, dtype=np.float64)[valid]
+
+        smoothed = smooth_angles(angles, self._history)
+        self._history = np.concatenate([self._history, angles])[-(SMOOTHING_WINDOW - 1):]
+
+        if evaluator.decreasing:
+            enter, complete = smoothed < evaluator.enter_threshold, smoothed > evaluator.complete_threshold
+        else:
+            enter, complete = smoothed > evaluator.enter_threshold, smoothed < evaluator.complete_threshold
+        self._run_state_machine(enter, complete, times)
+        return self.rep_count
+
+    def _run_state_machine(self, enter: np.ndarray, complete: np.ndarray, times: np.ndarray):
+        # Only frames that can change the phase matter; walk those alone
+        candidates = np.flatnonzero(enter | complete)
+        if len(candidates) == 0:
+            return
+        if not (enter & complete).any():
+            # Phases alternate, so transitions are the first frame of each run of the
+            # opposite condition: compress to runs and keep the ones after the current phase
+            is_enter = enter[candidates]
+            starts = np.concatenate([[True], is_enter[1:] != is_enter[:-1]])
+            runs, run_is_enter = candidates[starts], is_enter[starts]
+            if run_is_enter[0] != (self.phase == "down"):
+                runs, run_is_enter = runs[1:], run_is_enter[1:]
+            completed = runs[~run_is_enter]
+            self.rep_count += len(completed)
+            self.rep_timestamps.extend(times[completed].tolist())
+            if len(runs):
+                self.phase = "up" if run_is_enter[-1] else "down"
+            return
+
+        # Overlapping thresholds: a frame can satisfy both, so step through candidates
+        for frame in candidates:
+            if self.phase == "down" and enter[frame]:
+                self.phase = "up"
+            elif self.phase == "up" and complete[frame]:
+                self.phase = "down"
+                self.rep_count += 1
+                self.rep_timestamps.append(times[frame].item())
+
+    def result(self) -> Dict:
+        return {
+            "repCount": self.rep_count,
+            "repTimestamps": self.rep_timestamps,
+            "phase": self.phase,
+        }
+
+
+def count_reps(exercise_config: ConfigLike, landmarks: np.ndarray, timestamps: np.ndarray) -> Optional[Dict]:
+    """Rep count of a whole recording ({"repCount", "repTimestamps", "phase"}), or None without rep counting"""
+    counter = RepCounter.for_config(exercise_config)
+    if counter is None:
+        return None
+    counter.update(landmarks, timestamps)
+    return counter.result()
@@ -0,0 +1,359 @@
+from dotenv import load_dotenv
+import os
+import asyncio
+import json
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+load_dotenv()
+
+# Default RESOURCE_CACHE_DB, next to main.py rather than in the working directory
+DEFAULT_CACHE_DB = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "clinical_resources.db")
+
+# Key of the precomputed scrape_physiology_journals() result
+JOURNALS_KEY = "__journals__"
+
+_WORD = re.compile(r"[a-z0-9]+")
+# Longest suffix first; (suffix, replacement, minimum stem length)
+_SUFFIXES = (
+    ("ational", "ate", 3), ("ization", "ize", 3), ("iveness", "ive", 3), ("fulness", "ful", 3),
+    ("ousness", "ous", 3), ("ations", "ate", 3), ("ation", "ate", 3), ("ities", "ity", 3),
+    ("ings", "", 3), ("ies", "y", 2), ("ing", "", 3), ("ied", "y", 2), ("sses", "ss", 2),
+    ("ed", "", 3), ("es", "", 3), ("s", "", 3),
+)
+
+
+def stem(word: str) -> str:
+    """Light suffix-stripping stemmer (plural / -ing / -ed / common derivations)"""
+    if len(word) <= 3 or word.isdigit():
+        return word
+    for suffix, replacement, min_stem in _SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= min_stem:
+            if suffix == "s" and word.endswith(("ss", "us", "is")):
+                return word
+            if suffix == "es" and not word.endswith(("ches", "shes", "xes", "zes", "sses")):
+                # "muscles" -> "muscl" would not match "muscle"; only strip "es" after sibilants
+                continue
+            word = word[:len(word) - len(suffix)] + replacement
+            # running -> runn -> run
+            if suffix in ("ing", "ed", "ings") and len(word) > 3 and word[-1] == word[-2] and word[-1] not in "lsz":
+                word = word[:-1]
+            return word
+    return word
+
+
+def normalize_search_query(query_text: str) -> str:
+    """Cache key of a search: lowercased, punctuation and extra whitespace removed, words stemmed"""
+    return " ".join(stem(word) for word in _WORD.findall(query_text.lower()))
+
+
+class ClinicalResourceCache:
+    """
+    Cache of BrightData clinical resource searches
+
+    Each search is a multi-step agent run taking tens of seconds, so results
+    are kept per normalized query (case, punctuation, whitespace and word
+    endings ignored: "Muscle physiology" and "muscle  physiologies" share an
+    entry). Entries younger than RESOURCE_CACHE_FRESH_TTL are served directly;
+    older ones up to RESOURCE_CACHE_MAX_STALE are served while a background
+    refresh runs. Concurrent misses for one query share a single agent run.
+    The in-memory LRU holds RESOURCE_CACHE_MAX_ENTRIES queries and is backed
+    by a SQLite file (RESOURCE_CACHE_DB, empty for memory only), opened by
+    start().
+
+    A background loop refreshes the most requested queries before they go
+    stale and keeps a precomputed scrape_physiology_journals() result, so the
+    common case never waits for the agent.
+    """
+
+    def __init__(self, search: Callable[[str], Awaitable[List[Dict]]],
+                 scrape_journals: Callable[[], Awaitable[List[Dict]]]):
+        self.search_fn = search
+        self.scrape_journals_fn = scrape_journals
+        self.fresh_ttl = float(os.getenv("RESOURCE_CACHE_FRESH_TTL", str(24 * 3600)))
+        self.max_stale = float(os.getenv("RESOURCE_CACHE_MAX_STALE", str(7 * 24 * 3600)))
+        self.max_entries = int(os.getenv("RESOURCE_CACHE_MAX_ENTRIES", "500"))
+        self.refresh_interval = float(os.getenv("RESOURCE_CACHE_REFRESH_INTERVAL", "900"))
+        self.refresh_top = int(os.getenv("RESOURCE_CACHE_REFRESH_TOP", "20"))
+        self.journals_ttl = float(os.getenv("RESOURCE_CACHE_JOURNALS_TTL", str(6 * 3600)))
+        self.db_path = os.getenv("RESOURCE_CACHE_DB", DEFAULT_CACHE_DB)
+
+        # key -> (fetched_at, query text, results); most recently used last
+        self._entries: "OrderedDict[str, Tuple[float, str, List[Dict]]]" = OrderedDict()
+        # key -> requests, for picking the queries worth refreshing
+        self._hits: Dict[str, int] = {}
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._refreshing: Set[asyncio.Task] = set()
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        self._stats = {
+            "fresh_hits": 0,
+            "stale_hits": 0,
+            "misses": 0,
+            "coalesced": 0,
+            "agent_runs": 0,
+            "refreshes": 0,
+            "empty_results": 0,
+            "partial_results": 0,
+            "evictions": 0,
+            "errors": 0,
+        }
+
+
+    # ---------- entries ----------
+
+    def _remember(self, key: str, fetched_at: float, query_text: str, results: List[Dict]):
+        self._entries[key] = (fetched_at, query_text, results)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            if next(iter(self._entries)) == JOURNALS_KEY:
+                # The precomputed journal scrape is never evicted
+                self._entries.move_to_end(JOURNALS_KEY)
+            evicted, _ = self._entries.popitem(last=False)
+            self._hits.pop(evicted, None)
+            self._stats["evictions"] += 1
+
+    def _persist(self, key: str, query_text: str, results: List[Dict], fetched_at: float):
+        with self._db_lock:
+            # Checked under the lock: close() may have run since the write was scheduled
+            if self._db is None:
+                return
+            self._db.execute(
+                "INSERT INTO clinical_resources (query_key, query_text, results_json, fetched_at, hits, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT (query_key) DO UPDATE SET "
+                "query_text = excluded.query_text, results_json = excluded.results_json, "
+                "fetched_at = excluded.fetched_at, hits = excluded.hits, last_used = excluded.last_used",
+                (key, query_text, json.dumps(results), fetched_at, self._hits.get(key, 0), time.time()),
+            )
+            self._db.execute("DELETE FROM clinical_resources WHERE fetched_at < ?", (time.time() - self.max_stale,))
+            self._db.commit()
+
+    def _load(self, key: str) -> Optional[Tuple[float, str, List[Dict]]]:
+        """Entry as stored on disk (possibly refreshed by another worker)"""
+        with self._db_lock:
+            if self._db is None:
+                return None
+            row = self._db.execute(
+                "SELECT fetched_at, query_text, results_json FROM clinical_resources WHERE query_key = ?", (key,)
+            ).fetchone()
+        return (row[0], row[1], json.loads(row[2])) if row else None
+
+    # ---------- fetching ----------
+
+    async def _run(self, key: str, query_text: str) -> List[Dict]:
+        self._stats["agent_runs"] += 1
+        try:
+            if key == JOURNALS_KEY:
+                results = await self.scrape_journals_fn()
+            else:
+                results = await self.search_fn(query_text)
+        except Exception as e:
+            self._stats["errors"] += 1
+            print(f"Clinical resource search error for {query_text!r}: {e}")
+            return []
+        return await self._store(key, query_text, results)
+
+    async def _store(self, key: str, query_text: str, results: List[Dict]) -> List[Dict]:
+        if not results:
+            # The service reports failures as an empty list; do not cache those
+            self._stats["empty_results"] += 1
+            return results
+        fetched_at = time.time()
+        if getattr(results, "partial", False):
+            # Some sources missed their deadline: serve this, but as stale so the next request refreshes it
+            self._stats["partial_results"] += 1
+            fetched_at -= self.fresh_ttl
+        self._remember(key, fetched_at, query_text, results)
+        await asyncio.to_thread(self._persist, key, query_text, results, fetched_at)
+        return results
+
+    async def _fetch(self, key: str, query_text: str) -> List[Dict]:
+        """
+        Run the agent for a key, sharing the run with concurrent callers
+
+        The run is a task of its own, so a caller that disconnects does not
+        cancel it for the others (or for the cache).
+        """
+        task = self._inflight.get(key)
+        if task is None:
+            task = self._inflight[key] = asyncio.create_task(self._run(key, query_text))
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self._stats["coalesced"] += 1
+        return await asyncio.shield(task)
+
+    async def _refresh(self, key: str, query_text: str):
+        if key in self._inflight:
+            return
+        # Another worker sharing the cache file may have refreshed it already
+        stored = await asyncio.to_thread(self._load, key)
+        if stored is not None and time.time() - stored[0] < self.fresh_ttl / 2:
+            self._remember(key, *stored)
+            return
+        self._stats["refreshes"] += 1
+        await self._fetch(key, query_text)
+
+    def _background_refresh(self, key: str, query_text: str):
+        task = asyncio.create_task(self._refresh(key, query_text))
+        self._refreshing.add(task)
+        task.add_done_callback(self._refreshed)
+
+    def _refreshed(self, task: asyncio.Task):
+        self._refreshing.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            self._stats["errors"] += 1
+            print(f"Clinical resource refresh error: {task.exception()}")
+
+    def _lookup(self, key: str) -> Optional[List[Dict]]:
+        """Cached results for a key (refreshing stale ones in the background), or None on a miss"""
+        self._hits[key] = self._hits.get(key, 0) + 1
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            age = time.time() - entry[0]
+            if age < self.fresh_ttl:
+                self._stats["fresh_hits"] += 1
+                return entry[2]
+            if age < self.max_stale:
+                self._stats["stale_hits"] += 1
+                self._background_refresh(key, entry[1])
+                return entry[2]
+        self._stats["misses"] += 1
+        return None
+
+    async def _get(self, key: str, query_text: str) -> List[Dict]:
+        cached = self._lookup(key)
+        if cached is not None:
+            return cached
+        results = await self._fetch(key, query_text)
+        if key not in self._entries:
+            # Nothing cached (failed search): do not let one-off queries accumulate counters
+            self._hits.pop(key, None)
+        return results
+
+    # ---------- public API ----------
+
+    async def search(self, query_text: str) -> List[Dict]:
+        """Clinical resources for a query, from the cache when possible"""
+        key = normalize_search_query(query_text)
+        if not key:
+            return []
+        return await self._get(key, query_text)
+
+    def cached(self, query_text: str) -> Optional[List[Dict]]:
+        """
+        Cached results for a query without running the agent
+
+        For callers that stream a search themselves on a miss (None) and hand
+        the final results to store().
+        """
+        key = normalize_search_query(query_text)
+        if not key:
+            return []
+        return self._lookup(key)
+
+    async def store(self, query_text: str, results: List[Dict]):
+        """Cache the results of a search run outside the cache (see cached())"""
+        key = normalize_search_query(query_text)
+        if not key:
+            return
+        self._stats["agent_runs"] += 1
+        await self._store(key, query_text, results)
+        if key not in self._entries:
+            self._hits.pop(key, None)
+
+    async def journals(self) -> List[Dict]:
+        """Latest articles from the physiology journals (precomputed by the refresh loop)"""
+        return await self._get(JOURNALS_KEY, "physiology journals")
+
+    def _open(self):
+        if self._db is not None or not self.db_path:
+            return
+        db = sqlite3.connect(self.db_path, check_same_thread=False)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS clinical_resources ("
+            "query_key TEXT PRIMARY KEY, query_text TEXT NOT NULL, results_json TEXT NOT NULL, "
+            "fetched_at REAL NOT NULL, hits INTEGER NOT NULL DEFAULT 0, last_used REAL NOT NULL)"
+        )
+        db.commit()
+        rows = db.execute(
+            "SELECT query_key, query_text, results_json, fetched_at, hits FROM clinical_resources "
+            "WHERE fetched_at > ? ORDER BY query_key = ? DESC, last_used DESC LIMIT ?",
+            (time.time() - self.max_stale, JOURNALS_KEY, self.max_entries),
+        ).fetchall()
+        for key, query_text, results, fetched_at, hits in reversed(rows):
+            self._entries[key] = (fetched_at, query_text, json.loads(results))
+            self._hits[key] = hits
+        with self._db_lock:
+            self._db = db
+
+    def start(self):
+        """Open the SQLite file and start the background refresh loop (FastAPI lifespan hook)"""
+        self._open()
+        if self._refresh_task is None:
+            self._refresh_task = asyncio.create_task(self._refresh_loop())
+
+    async def _refresh_loop(self):
+        while True:
+            try:
+                await self.refresh_popular()
+            except Exception as e:
+                print(f"Clinical resource refresh error: {e}")
+            await asyncio.sleep(self.refresh_interval)
+
+    async def refresh_popular(self):
+        """
+        Refresh the journal scrape and the most requested queries ahead of expiry
+
+        Runs one agent search at a time so user searches keep most of the agent pool.
+        """
+        now = time.time()
+        journals = self._entries.get(JOURNALS_KEY)
+        if journals is None or now - journals[0] >= self.journals_ttl:
+            await self._refresh(JOURNALS_KEY, "physiology journals")
+
+        popular = sorted(
+            (key for key in self._entries if key != JOURNALS_KEY),
+            key=lambda k: self._hits.get(k, 0), reverse=True,
+        )[:self.refresh_top]
+        for key in popular:
+            entry = self._entries.get(key)
+            # Refresh once an entry is half way to going stale
+            if entry is not None and self._hits.get(key, 0) > 0 and time.time() - entry[0] >= self.fresh_ttl / 2:
+                await self._refresh(key, entry[1])
+
+    async def close(self):
+        """Stop the refresh loop and pending agent runs, then close the database"""
+        tasks = [*self._refreshing, *self._inflight.values()]
+        if self._refresh_task is not None:
+            tasks.append(self._refresh_task)
+            self._refresh_task = None
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if self._db is not None:
+            with self._db_lock:
+                self._db.close()
+            self._db = None
+
+    def metrics(self) -> Dict:
+        hits = self._stats["fresh_hits"] + self._stats["stale_hits"]
+        lookups = hits + self._stats["misses"]
+        journals = self._entries.get(JOURNALS_KEY)
+        return {
+            **self._stats,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "inflight": len(self._inflight),
+            "fresh_ttl_seconds": self.fresh_ttl,
+            "max_stale_seconds": self.max_stale,
+            "journals_age_seconds": round(time.time() - journals[0], 1) if journals else None,
+            "persistent": self._db is not None,
+        }
@@ -0,0 +1,88 @@
+import re
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+from fastapi import Request, Response
+
+try:
+    import orjson
+
+    def dumps(payload) -> bytes:
+        return orjson.dumps(payload)
+except ImportError:
+    import json
+
+    def dumps(payload) -> bytes:
+        return json.dumps(payload).encode()
+
+
+# One entry of an If-None-Match list: "*" or an optionally weak (W/) quoted entity tag
+_ETAG_ENTRY = re.compile(r'(\*)|(?:W/)?("[^"]*")')
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Whether an If-None-Match header matches an ETag
+
+    The header may list several tags separated by commas, or be "*". Tags are
+    compared weakly (a W/ prefix is ignored), as RFC 9110 requires for If-None-Match.
+    """
+    if not if_none_match:
+        return False
+    return any(star or tag == etag for star, tag in _ETAG_ENTRY.findall(if_none_match))
+
+
+class VersionedResponseCache:
+    """
+    Serialized-response cache for read-heavy GET endpoints
+
+    Each collection carries a generation counter (bumped by storage on every
+    write). The serialized body is cached per collection and generation, so
+    repeated polls skip both the storage read and JSON serialization, and the
+    generation doubles as the ETag so a matching If-None-Match gets a 304.
+    """
+
+    def __init__(self):
+        # Set to the storage epoch on startup so ETags never repeat across databases
+        self.namespace = "0"
+        self._entries: Dict[str, Tuple[int, bytes]] = {}
+        self._stats = {"hits": 0, "misses": 0, "not_modified": 0}
+
+    def etag(self, collection: str, generation: int) -> str:
+        return f'"{self.namespace}-{collection}-{generation}"'
+
+    async def respond(self, request: Request, collection: str, generation: int,
+                      build: Callable[[], Awaitable[Dict]]) -> Response:
+        """
+        Serve a collection's payload for the given generation
+
+        Args:
+            request: Incoming request (for If-None-Match)
+            collection: Cache key, also used in the ETag
+            generation: Current generation of the collection
+            build: Coroutine factory producing the payload on a cache miss
+
+        Returns:
+            304 if the client's ETag matches, otherwise the cached or freshly
+            serialized JSON body
+        """
+        etag = self.etag(collection, generation)
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            self._stats["not_modified"] += 1
+            return Response(status_code=304, headers=headers)
+
+        entry = self._entries.get(collection)
+        if entry is not None and entry[0] == generation:
+            self._stats["hits"] += 1
+            body = entry[1]
+        else:
+            self._stats["misses"] += 1
+            body = dumps(await build())
+            self._entries[collection] = (generation, body)
+        return Response(content=body, media_type="application/json", headers=headers)
+
+    def metrics(self) -> Dict:
+        return {**self._stats, "collections": {name: gen for name, (gen, _) in self._entries.items()}}
+
+
+# Shared instance used by main.py
+response_cache = VersionedResponseCache()
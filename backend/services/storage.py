@@ -0,0 +1,917 @@
+from dotenv import load_dotenv
+import os
+import abc
+import asyncio
+import json
+import queue
+import random
+import sqlite3
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+load_dotenv()
+
+# Custom exercise IDs continue after the built-in catalog (ids 3-8)
+FIRST_CUSTOM_EXERCISE_ID = 9
+
+# Seconds a finished live pose recording waits for its session to be saved
+POSE_STREAM_RETENTION = 24 * 60 * 60
+
+# Seconds a finished analysis job stays available to status lookups
+ANALYSIS_JOB_RETENTION = 24 * 60 * 60
+
+# Bucket sizes of the progress rollups
+GRANULARITIES = ("day", "week")
+
+
+def progress_buckets(completed_at: Optional[str]) -> Optional[Dict[str, str]]:
+    """
+    Rollup buckets of a session: its UTC date and the Monday of its ISO week
+
+    Returns:
+        {"day": "YYYY-MM-DD", "week": "YYYY-MM-DD"}, or None if completed_at is
+        missing or not an ISO 8601 timestamp
+    """
+    try:
+        completed = datetime.fromisoformat(completed_at.replace("Z", "+00:00"))
+    except (AttributeError, ValueError):
+        return None
+    if completed.tzinfo is not None:
+        completed = completed.astimezone(timezone.utc)
+    day = completed.date()
+    return {"day": day.isoformat(), "week": (day - timedelta(days=day.weekday())).isoformat()}
+
+
+def session_rollup(session: Dict) -> Dict:
+    """A session's contribution to its progress buckets"""
+    warnings = session.get("warnings") or []
+    by_severity: Dict[str, int] = {}
+    by_type: Dict[str, int] = {}
+    for warning in warnings:
+        # Sessions saved before warnings carried their check type fall back to the message
+        severity = warning.get("severity", "unknown")
+        issue_type = warning.get("type") or warning.get("message", "")
+        by_severity[severity] = by_severity.get(severity, 0) + 1
+        by_type[issue_type] = by_type.get(issue_type, 0) + 1
+    reps, target_reps = session.get("rep_count") or 0, session.get("target_reps") or 0
+    return {
+        "sessions": 1,
+        "reps": reps,
+        "target_reps": target_reps,
+        "sessions_at_target": int(reps >= target_reps),
+        "duration": session.get("duration") or 0,
+        "issues": len(warnings),
+        "severity": by_severity,
+        "type": by_type,
+    }
+
+
+def progress_point(bucket: str, totals: Dict) -> Dict:
+    """One time series entry, from a bucket's summed rollup"""
+    sessions = totals["sessions"]
+    return {
+        "bucket": bucket,
+        "sessions": sessions,
+        "reps": totals["reps"],
+        "target_reps": totals["target_reps"],
+        "rep_completion": round(totals["reps"] / totals["target_reps"], 3) if totals["target_reps"] else None,
+        "sessions_at_target": totals["sessions_at_target"],
+        "duration": totals["duration"],
+        "avg_duration": round(totals["duration"] / sessions, 1) if sessions else 0,
+        "issues": totals["issues"],
+        "issuesBySeverity": totals["severity"],
+        "issuesByType": totals["type"],
+    }
+
+
+class Repository(abc.ABC):
+    """
+    Storage interface for exercises, assignments, sessions and meetings
+
+    All methods are async so handlers can await them regardless of backend.
+    """
+
+    # Whether several worker processes can share this backend consistently
+    multi_worker_safe = True
+
+    # Random id of this data store; generations restart at 0 when it is recreated
+    epoch = "0"
+
+    async def open(self):
+        pass
+
+    async def close(self):
+        pass
+
+    # Custom exercises
+    @abc.abstractmethod
+    async def list_custom_exercises(self, after_id: int = 0) -> List[Dict]:
+        """Custom exercises in id order, optionally only those with id > after_id"""
+
+    @abc.abstractmethod
+    async def get_custom_exercise(self, exercise_id: int) -> Optional[Dict]:
+        ...
+
+    @abc.abstractmethod
+    async def add_custom_exercise(self, exercise: Dict) -> Dict:
+        """Store a new exercise (without "id") and return it with its assigned id"""
+
+    # Assigned exercises
+    @abc.abstractmethod
+    async def list_assigned_exercises(self) -> List[Dict]:
+        ...
+
+    @abc.abstractmethod
+    async def assign_exercises(self, assignments: List[Tuple[Dict, int]]) -> List[Dict]:
+        """
+        Assign exercises atomically
+
+        Args:
+            assignments: (exercise, target_reps) pairs; already-assigned exercises
+                get their target reps updated and completion reset
+
+        Returns:
+            All assigned exercises after the update
+        """
+
+    @abc.abstractmethod
+    async def complete_exercise(self, exercise_id: int) -> Optional[Dict]:
+        ...
+
+    # Recorded sessions
+    @abc.abstractmethod
+    async def add_session(self, session: Dict) -> Dict:
+        ...
+
+    @abc.abstractmethod
+    async def list_sessions(self) -> List[Dict]:
+        ...
+
+    @abc.abstractmethod
+    async def get_session(self, session_id: int) -> Optional[Dict]:
+        ...
+
+    # Progress rollups
+    @abc.abstractmethod
+    async def progress(self, granularity: str, exercise_id: Optional[int] = None, since: Optional[str] = None,
+                       until: Optional[str] = None) -> Dict[int, List[Dict]]:
+        """
+        Per-exercise progress time series from the rollups kept by add_session
+
+        Args:
+            granularity: "day" or "week"
+            exercise_id: Only this exercise
+            since: First bucket (YYYY-MM-DD, inclusive)
+            until: End bucket (YYYY-MM-DD, exclusive)
+
+        Returns:
+            exercise_id -> progress_point() entries in bucket order
+        """
+
+    # Pose recordings
+    @abc.abstractmethod
+    async def save_pose_recording(self, session_id: int, info: Dict, data: bytes, analysis: Optional[Dict] = None):
+        """Store (or replace) the packed pose frames for a session and their analysis"""
+
+    @abc.abstractmethod
+    async def get_pose_recording(self, session_id: int) -> Optional[bytes]:
+        """Packed (uncompressed) pose frames for a session, or None"""
+
+    @abc.abstractmethod
+    async def get_pose_analysis(self, session_id: int) -> Optional[Dict]:
+        ...
+
+    @abc.abstractmethod
+    async def save_pose_analysis(self, session_id: int, analysis: Dict):
+        """Set the analysis of an already stored pose recording"""
+
+    @abc.abstractmethod
+    async def list_pose_recordings(self, after_session_id: int = 0, limit: int = 100) -> List[Dict]:
+        """
+        A page of stored pose recordings in session id order
+
+        Returns:
+            Up to `limit` {"session_id", "info", "data"} dicts with session_id > after_session_id
+        """
+
+    @abc.abstractmethod
+    async def save_pose_stream(self, stream_id: str, info: Dict, data: bytes, analysis: Optional[Dict]):
+        """Keep a finished live recording until its session is saved"""
+
+    @abc.abstractmethod
+    async def attach_pose_stream(self, stream_id: str, session_id: int) -> Optional[Dict]:
+        """
+        Move a finished live recording onto a saved session
+
+        Returns:
+            {"info", "analysis"} of the recording, or None if the stream is unknown
+        """
+
+    # Analysis jobs
+    @abc.abstractmethod
+    async def save_analysis_job(self, job: Dict):
+        """
+        Store the status dict of an analysis job (keyed by its "job_id")
+
+        A job that has "finished_at" set is final and later saves leave it unchanged.
+        """
+
+    @abc.abstractmethod
+    async def get_analysis_job(self, job_id: str) -> Optional[Dict]:
+        ...
+
+    @abc.abstractmethod
+    async def cancel_analysis_job(self, job_id: str) -> Optional[Dict]:
+        """
+        Request cancellation of an unfinished job (carried out by the worker running it)
+
+        Returns:
+            The job's status dict, or None if the job is unknown
+        """
+
+    @abc.abstractmethod
+    async def cancel_requested_analysis_jobs(self) -> List[str]:
+        """IDs of unfinished jobs whose cancellation was requested"""
+
+    # Meetings
+    @abc.abstractmethod
+    async def add_meeting(self, meeting: Dict) -> Dict:
+        ...
+
+    @abc.abstractmethod
+    async def list_meetings(self) -> List[Dict]:
+        ...
+
+    @abc.abstractmethod
+    async def delete_meeting(self, meeting_id: int):
+        ...
+
+    # Generations
+    @abc.abstractmethod
+    async def generation(self, collection: str) -> int:
+        """
+        Change counter for a collection, bumped by every write to it
+
+        Collections: custom_exercises, assigned_exercises, sessions, meetings.
+        Read endpoints use it to reuse serialized responses and as an ETag.
+        """
+
+
+class InMemoryRepository(Repository):
+    """Process-local lists (the original storage model); data is lost on restart"""
+
+    # State lives in one process, so several workers would each see their own copy
+    multi_worker_safe = False
+
+    def __init__(self):
+        self.custom_exercises: List[Dict] = []
+        self.assigned_exercises: List[Dict] = []
+        self.recorded_sessions: List[Dict] = []
+        self.meetings: List[Dict] = []
+        self.pose_recordings: Dict[int, Tuple[Dict, bytes, Optional[Dict]]] = {}
+        self.pose_streams: Dict[str, Tuple[Dict, bytes, Optional[Dict]]] = {}
+        # job_id -> status dict, in submission order
+        self.analysis_jobs: Dict[str, Dict] = {}
+        self.cancel_requested: Set[str] = set()
+        # (granularity, exercise_id) -> bucket -> summed session_rollup()
+        self.rollups: Dict[Tuple[str, int], Dict[str, Dict]] = {}
+        self.next_exercise_id = FIRST_CUSTOM_EXERCISE_ID
+        self.next_meeting_id = 1
+        self.generations: Dict[str, int] = {}
+        self.epoch = "%08x" % random.getrandbits(32)
+
+    def _bump(self, collection: str):
+        self.generations[collection] = self.generations.get(collection, 0) + 1
+
+    async def list_custom_exercises(self, after_id: int = 0) -> List[Dict]:
+        return [ex for ex in self.custom_exercises if ex["id"] > after_id]
+
+    async def get_custom_exercise(self, exercise_id: int) -> Optional[Dict]:
+        return next((ex for ex in self.custom_exercises if ex["id"] == exercise_id), None)
+
+    async def add_custom_exercise(self, exercise: Dict) -> Dict:
+        new_exercise = {"id": self.next_exercise_id, **exercise}
+        self.custom_exercises.append(new_exercise)
+        self.next_exercise_id += 1
+        self._bump("custom_exercises")
+        return new_exercise
+
+    async def list_assigned_exercises(self) -> List[Dict]:
+        return list(self.assigned_exercises)
+
+    async def assign_exercises(self, assignments: List[Tuple[Dict, int]]) -> List[Dict]:
+        for exercise, target_reps in assignments:
+            existing = next((ex for ex in self.assigned_exercises if ex["id"] == exercise["id"]), None)
+            if existing:
+                existing["target_reps"] = target_reps
+                existing["completed"] = False
+            else:
+                self.assigned_exercises.append({**exercise, "target_reps": target_reps, "completed": False})
+        self._bump("assigned_exercises")
+        return list(self.assigned_exercises)
+
+    async def complete_exercise(self, exercise_id: int) -> Optional[Dict]:
+        for exercise in self.assigned_exercises:
+            if exercise["id"] == exercise_id:
+                exercise["completed"] = True
+                self._bump("assigned_exercises")
+                return exercise
+        return None
+
+    async def add_session(self, session: Dict) -> Dict:
+        session = {**session, "id": len(self.recorded_sessions) + 1}
+        self.recorded_sessions.append(session)
+        buckets = progress_buckets(session.get("completed_at"))
+        if buckets:
+            rollup = session_rollup(session)
+            for granularity in GRANULARITIES:
+                series = self.rollups.setdefault((granularity, session["exercise_id"]), {})
+                totals = series.setdefault(buckets[granularity], {
+                    key: {} if isinstance(value, dict) else 0 for key, value in rollup.items()
+                })
+                for key, value in rollup.items():
+                    if isinstance(value, dict):
+                        for name, count in value.items():
+                            totals[key][name] = totals[key].get(name, 0) + count
+                    else:
+                        totals[key] += value
+        self._bump("sessions")
+        return session
+
+    async def list_sessions(self) -> List[Dict]:
+        return list(self.recorded_sessions)
+
+    async def get_session(self, session_id: int) -> Optional[Dict]:
+        return next((s for s in self.recorded_sessions if s["id"] == session_id), None)
+
+    async def progress(self, granularity: str, exercise_id: Optional[int] = None, since: Optional[str] = None,
+                       until: Optional[str] = None) -> Dict[int, List[Dict]]:
+        result = {}
+        for (rollup_granularity, rollup_exercise), series in sorted(self.rollups.items()):
+            if rollup_granularity != granularity or exercise_id not in (None, rollup_exercise):
+                continue
+            points = [
+                progress_point(bucket, totals) for bucket, totals in sorted(series.items())
+                if (since is None or bucket >= since) and (until is None or bucket < until)
+            ]
+            if points:
+                result[rollup_exercise] = points
+        return result
+
+    async def save_pose_recording(self, session_id: int, info: Dict, data: bytes, analysis: Optional[Dict] = None):
+        self.pose_recordings[session_id] = (info, data, analysis)
+
+    async def get_pose_recording(self, session_id: int) -> Optional[bytes]:
+        recording = self.pose_recordings.get(session_id)
+        return recording[1] if recording else None
+
+    async def get_pose_analysis(self, session_id: int) -> Optional[Dict]:
+        recording = self.pose_recordings.get(session_id)
+        return recording[2] if recording else None
+
+    async def save_pose_analysis(self, session_id: int, analysis: Dict):
+        recording = self.pose_recordings.get(session_id)
+        if recording:
+            self.pose_recordings[session_id] = (recording[0], recording[1], analysis)
+
+    async def list_pose_recordings(self, after_session_id: int = 0, limit: int = 100) -> List[Dict]:
+        session_ids = sorted(sid for sid in self.pose_recordings if sid > after_session_id)[:limit]
+        return [
+            {"session_id": sid, "info": self.pose_recordings[sid][0], "data": self.pose_recordings[sid][1]}
+            for sid in session_ids
+        ]
+
+    async def save_pose_stream(self, stream_id: str, info: Dict, data: bytes, analysis: Optional[Dict]):
+        self.pose_streams[stream_id] = (info, data, analysis)
+
+    async def attach_pose_stream(self, stream_id: str, session_id: int) -> Optional[Dict]:
+        recording = self.pose_streams.pop(stream_id, None)
+        if recording is None:
+            return None
+        self.pose_recordings[session_id] = recording
+        return {"info": recording[0], "analysis": recording[2]}
+
+    async def save_analysis_job(self, job: Dict):
+        existing = self.analysis_jobs.get(job["job_id"])
+        if existing is None:
+            # Finished jobs past their retention, oldest first
+            expired = time.time() - ANALYSIS_JOB_RETENTION
+            for job_id, old in list(self.analysis_jobs.items()):
+                if old["created_at"] >= expired:
+                    break
+                if old.get("finished_at") is not None:
+                    del self.analysis_jobs[job_id]
+                    self.cancel_requested.discard(job_id)
+        elif existing.get("finished_at") is not None:
+            return
+        self.analysis_jobs[job["job_id"]] = job
+
+    async def get_analysis_job(self, job_id: str) -> Optional[Dict]:
+        return self.analysis_jobs.get(job_id)
+
+    async def cancel_analysis_job(self, job_id: str) -> Optional[Dict]:
+        job = self.analysis_jobs.get(job_id)
+        if job is not None and job.get("finished_at") is None:
+            self.cancel_requested.add(job_id)
+        return job
+
+    async def cancel_requested_analysis_jobs(self) -> List[str]:
+        return [
+            job_id for job_id in self.cancel_requested
+            if self.analysis_jobs.get(job_id, {}).get("finished_at") is None
+        ]
+
+    async def add_meeting(self, meeting: Dict) -> Dict:
+        meeting = {**meeting, "id": self.next_meeting_id}
+        self.meetings.append(meeting)
+        self.next_meeting_id += 1
+        self._bump("meetings")
+        return meeting
+
+    async def list_meetings(self) -> List[Dict]:
+        return list(self.meetings)
+
+    async def delete_meeting(self, meeting_id: int):
+        self.meetings = [m for m in self.meetings if m["id"] != meeting_id]
+        self._bump("meetings")
+
+    async def generation(self, collection: str) -> int:
+        return self.generations.get(collection, 0)
+
+
+SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS custom_exercises (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL,
+        data TEXT NOT NULL
+    )""",
+    "CREATE INDEX IF NOT EXISTS idx_custom_exercises_name ON custom_exercises (name)",
+    """CREATE TABLE IF NOT EXISTS assigned_exercises (
+        position INTEGER PRIMARY KEY AUTOINCREMENT,
+        exercise_id INTEGER NOT NULL UNIQUE,
+        target_reps INTEGER NOT NULL,
+        completed INTEGER NOT NULL DEFAULT 0,
+        data TEXT NOT NULL
+    )""",
+    """CREATE TABLE IF NOT EXISTS recorded_sessions (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        exercise_id INTEGER NOT NULL,
+        completed_at TEXT,
+        data TEXT NOT NULL
+    )""",
+    "CREATE INDEX IF NOT EXISTS idx_recorded_sessions_exercise_id ON recorded_sessions (exercise_id)",
+    """CREATE TABLE IF NOT EXISTS pose_recordings (
+        session_id INTEGER PRIMARY KEY REFERENCES recorded_sessions (id),
+        info TEXT NOT NULL,
+        data BLOB NOT NULL,
+        analysis TEXT
+    )""",
+    """CREATE TABLE IF NOT EXISTS pose_streams (
+        stream_id TEXT PRIMARY KEY,
+        created_at REAL NOT NULL,
+        info TEXT NOT NULL,
+        data BLOB NOT NULL,
+        analysis TEXT
+    )""",
+    """CREATE TABLE IF NOT EXISTS analysis_jobs (
+        job_id TEXT PRIMARY KEY,
+        finished_at REAL,
+        cancel_requested INTEGER NOT NULL DEFAULT 0,
+        data TEXT NOT NULL
+    )""",
+    "CREATE INDEX IF NOT EXISTS idx_analysis_jobs_finished_at ON analysis_jobs (finished_at)",
+    """CREATE TABLE IF NOT EXISTS progress_rollups (
+        granularity TEXT NOT NULL,
+        exercise_id INTEGER NOT NULL,
+        bucket TEXT NOT NULL,
+        sessions INTEGER NOT NULL,
+        reps INTEGER NOT NULL,
+        target_reps INTEGER NOT NULL,
+        sessions_at_target INTEGER NOT NULL,
+        duration INTEGER NOT NULL,
+        issues INTEGER NOT NULL,
+        PRIMARY KEY (granularity, exercise_id, bucket)
+    ) WITHOUT ROWID""",
+    """CREATE TABLE IF NOT EXISTS progress_issue_rollups (
+        granularity TEXT NOT NULL,
+        exercise_id INTEGER NOT NULL,
+        bucket TEXT NOT NULL,
+        dimension TEXT NOT NULL,
+        name TEXT NOT NULL,
+        count INTEGER NOT NULL,
+        PRIMARY KEY (granularity, exercise_id, bucket, dimension, name)
+    ) WITHOUT ROWID""",
+    """CREATE TABLE IF NOT EXISTS meetings (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        scheduled_date TEXT,
+        data TEXT NOT NULL
+    )""",
+    "CREATE INDEX IF NOT EXISTS idx_meetings_scheduled_date ON meetings (scheduled_date)",
+    """CREATE TABLE IF NOT EXISTS generations (
+        collection TEXT PRIMARY KEY,
+        generation INTEGER NOT NULL
+    )""",
+]
+
+
+class SQLiteConnectionPool:
+    """
+    Fixed-size pool of SQLite connections for use from async handlers
+
+    Each call checks a connection out, runs the function in a worker thread
+    and returns the connection. Queries use constant parameterized SQL so
+    sqlite3's per-connection statement cache reuses the prepared statements.
+
+    Writes run inside BEGIN IMMEDIATE, which takes SQLite's write lock up front.
+    That serializes writers across every worker process sharing the file, so
+    AUTOINCREMENT ids and read-modify-write sequences stay consistent.
+    """
+
+    def __init__(self, path: str, size: int = 4):
+        self.path = path
+        self.size = size
+        self._connections: "queue.Queue[sqlite3.Connection]" = queue.Queue()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.path, check_same_thread=False, timeout=30.0, cached_statements=256, isolation_level=None
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=30000")
+        return conn
+
+    def open(self):
+        for _ in range(self.size):
+            self._connections.put(self._connect())
+
+    def close(self):
+        while not self._connections.empty():
+            self._connections.get_nowait().close()
+
+    def _call(self, fn: Callable, write: bool, *args):
+        conn = self._connections.get()
+        try:
+            if not write:
+                return fn(conn, *args)
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = fn(conn, *args)
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+            return result
+        finally:
+            self._connections.put(conn)
+
+    async def run(self, fn: Callable, *args):
+        """Run a read-only function"""
+        return await asyncio.to_thread(self._call, fn, False, *args)
+
+    async def write(self, fn: Callable, *args):
+        """Run a function inside an immediate write transaction"""
+        return await asyncio.to_thread(self._call, fn, True, *args)
+
+
+def _bump(conn: sqlite3.Connection, collection: str):
+    conn.execute(
+        "INSERT INTO generations (collection, generation) VALUES (?, 1) "
+        "ON CONFLICT (collection) DO UPDATE SET generation = generation + 1",
+        (collection,),
+    )
+
+
+def _add_to_rollups(conn: sqlite3.Connection, session: Dict):
+    """Add a session to its day and week progress rollups (inside the session's write transaction)"""
+    buckets = progress_buckets(session.get("completed_at"))
+    if buckets is None:
+        return
+    rollup = session_rollup(session)
+    for granularity in GRANULARITIES:
+        key = (granularity, session["exercise_id"], buckets[granularity])
+        conn.execute(
+            "INSERT INTO progress_rollups (granularity, exercise_id, bucket, sessions, reps, target_reps, "
+            "sessions_at_target, duration, issues) VALUES (?, ?, ?, 1, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (granularity, exercise_id, bucket) DO UPDATE SET "
+            "sessions = sessions + 1, reps = reps + excluded.reps, target_reps = target_reps + excluded.target_reps, "
+            "sessions_at_target = sessions_at_target + excluded.sessions_at_target, "
+            "duration = duration + excluded.duration, issues = issues + excluded.issues",
+            (*key, rollup["reps"], rollup["target_reps"], rollup["sessions_at_target"], rollup["duration"],
+             rollup["issues"]),
+        )
+        conn.executemany(
+            "INSERT INTO progress_issue_rollups (granularity, exercise_id, bucket, dimension, name, count) "
+            "VALUES (?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (granularity, exercise_id, bucket, dimension, name) DO UPDATE SET count = count + excluded.count",
+            [(*key, dimension, name, count) for dimension in ("severity", "type")
+             for name, count in rollup[dimension].items()],
+        )
+
+
+def _iter_session_rows(conn: sqlite3.Connection) -> Iterator[Dict]:
+    for row in conn.execute("SELECT id, data FROM recorded_sessions ORDER BY id"):
+        yield {**json.loads(row[1]), "id": row[0]}
+
+
+def _assigned_row(row) -> Dict:
+    return {**json.loads(row[0]), "target_reps": row[1], "completed": bool(row[2])}
+
+
+class SQLiteRepository(Repository):
+    """Embedded SQLite (WAL mode) backend; data survives restarts"""
+
+    def __init__(self, path: str, pool_size: int = 4):
+        self.pool = SQLiteConnectionPool(path, pool_size)
+
+    async def open(self):
+        self.pool.open()
+        self.epoch = await self.pool.write(self._create_schema)
+
+    async def close(self):
+        self.pool.close()
+
+    @staticmethod
+    def _create_schema(conn: sqlite3.Connection):
+        for statement in SCHEMA:
+            conn.execute(statement)
+        conn.execute(
+            "INSERT INTO sqlite_sequence (name, seq) SELECT 'custom_exercises', ? "
+            "WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = 'custom_exercises')",
+            (FIRST_CUSTOM_EXERCISE_ID - 1,),
+        )
+        conn.execute(
+            "INSERT OR IGNORE INTO generations (collection, generation) VALUES ('_epoch', ?)",
+            (random.getrandbits(31),),
+        )
+        # Databases created before the rollups existed: build them from the stored sessions once
+        if conn.execute("INSERT OR IGNORE INTO generations (collection, generation) VALUES ('_rollups', 1)").rowcount:
+            for session in list(_iter_session_rows(conn)):
+                _add_to_rollups(conn, session)
+        return "%08x" % conn.execute("SELECT generation FROM generations WHERE collection = '_epoch'").fetchone()[0]
+
+    # Custom exercises
+
+    async def list_custom_exercises(self, after_id: int = 0) -> List[Dict]:
+        def run(conn):
+            rows = conn.execute(
+                "SELECT id, data FROM custom_exercises WHERE id > ? ORDER BY id", (after_id,)
+            ).fetchall()
+            return [{"id": row[0], **json.loads(row[1])} for row in rows]
+        return await self.pool.run(run)
+
+    async def get_custom_exercise(self, exercise_id: int) -> Optional[Dict]:
+        def run(conn):
+            row = conn.execute("SELECT id, data FROM custom_exercises WHERE id = ?", (exercise_id,)).fetchone()
+            return {"id": row[0], **json.loads(row[1])} if row else None
+        return await self.pool.run(run)
+
+    async def add_custom_exercise(self, exercise: Dict) -> Dict:
+        def run(conn):
+            cursor = conn.execute(
+                "INSERT INTO custom_exercises (name, data) VALUES (?, ?)",
+                (exercise["name"], json.dumps(exercise)),
+            )
+            _bump(conn, "custom_exercises")
+            return {"id": cursor.lastrowid, **exercise}
+        return await self.pool.write(run)
+
+    # Assigned exercises
+
+    async def list_assigned_exercises(self) -> List[Dict]:
+        def run(conn):
+            rows = conn.execute(
+                "SELECT data, target_reps, completed FROM assigned_exercises ORDER BY position"
+            ).fetchall()
+            return [_assigned_row(row) for row in rows]
+        return await self.pool.run(run)
+
+    async def assign_exercises(self, assignments: List[Tuple[Dict, int]]) -> List[Dict]:
+        def run(conn):
+            conn.executemany(
+                "INSERT INTO assigned_exercises (exercise_id, target_reps, completed, data) VALUES (?, ?, 0, ?) "
+                "ON CONFLICT (exercise_id) DO UPDATE SET target_reps = excluded.target_reps, completed = 0",
+                [(exercise["id"], target_reps, json.dumps(exercise)) for exercise, target_reps in assignments],
+            )
+            _bump(conn, "assigned_exercises")
+            rows = conn.execute(
+                "SELECT data, target_reps, completed FROM assigned_exercises ORDER BY position"
+            ).fetchall()
+            return [_assigned_row(row) for row in rows]
+        return await self.pool.write(run)
+
+    async def complete_exercise(self, exercise_id: int) -> Optional[Dict]:
+        def run(conn):
+            cursor = conn.execute("UPDATE assigned_exercises SET completed = 1 WHERE exercise_id = ?", (exercise_id,))
+            if cursor.rowcount:
+                _bump(conn, "assigned_exercises")
+            row = conn.execute(
+                "SELECT data, target_reps, completed FROM assigned_exercises WHERE exercise_id = ?",
+                (exercise_id,),
+            ).fetchone()
+            return _assigned_row(row) if row else None
+        return await self.pool.write(run)
+
+    # Recorded sessions
+
+    async def add_session(self, session: Dict) -> Dict:
+        def run(conn):
+            cursor = conn.execute(
+                "INSERT INTO recorded_sessions (exercise_id, completed_at, data) VALUES (?, ?, ?)",
+                (session["exercise_id"], session.get("completed_at"), json.dumps(session)),
+            )
+            _add_to_rollups(conn, session)
+            _bump(conn, "sessions")
+            return {**session, "id": cursor.lastrowid}
+        return await self.pool.write(run)
+
+    async def list_sessions(self) -> List[Dict]:
+        def run(conn):
+            rows = conn.execute("SELECT id, data FROM recorded_sessions ORDER BY id").fetchall()
+            return [{**json.loads(row[1]), "id": row[0]} for row in rows]
+        return await self.pool.run(run)
+
+    async def get_session(self, session_id: int) -> Optional[Dict]:
+        def run(conn):
+            row = conn.execute("SELECT id, data FROM recorded_sessions WHERE id = ?", (session_id,)).fetchone()
+            return {**json.loads(row[1]), "id": row[0]} if row else None
+        return await self.pool.run(run)
+
+    # Progress rollups
+
+    async def progress(self, granularity: str, exercise_id: Optional[int] = None, since: Optional[str] = None,
+                       until: Optional[str] = None) -> Dict[int, List[Dict]]:
+        def run(conn):
+            # NULL parameters disable the corresponding filter
+            where = ("granularity = ? AND (? IS NULL OR exercise_id = ?) AND (? IS NULL OR bucket >= ?) "
+                     "AND (? IS NULL OR bucket < ?)")
+            params = (granularity, exercise_id, exercise_id, since, since, until, until)
+            totals: Dict[Tuple[int, str], Dict] = {}
+            for row in conn.execute(
+                "SELECT exercise_id, bucket, sessions, reps, target_reps, sessions_at_target, duration, issues "
+                f"FROM progress_rollups WHERE {where} ORDER BY exercise_id, bucket", params
+            ):
+                totals[row[0], row[1]] = {
+                    "sessions": row[2], "reps": row[3], "target_reps": row[4], "sessions_at_target": row[5],
+                    "duration": row[6], "issues": row[7], "severity": {}, "type": {},
+                }
+            for row in conn.execute(
+                f"SELECT exercise_id, bucket, dimension, name, count FROM progress_issue_rollups WHERE {where}", params
+            ):
+                if (row[0], row[1]) in totals:
+                    totals[row[0], row[1]][row[2]][row[3]] = row[4]
+
+            result: Dict[int, List[Dict]] = {}
+            for (rollup_exercise, bucket), bucket_totals in totals.items():
+                result.setdefault(rollup_exercise, []).append(progress_point(bucket, bucket_totals))
+            return result
+        return await self.pool.run(run)
+
+    # Pose recordings
+
+    async def save_pose_recording(self, session_id: int, info: Dict, data: bytes, analysis: Optional[Dict] = None):
+        def run(conn):
+            conn.execute(
+                "INSERT OR REPLACE INTO pose_recordings (session_id, info, data, analysis) VALUES (?, ?, ?, ?)",
+                (session_id, json.dumps(info), data, json.dumps(analysis) if analysis is not None else None),
+            )
+        await self.pool.write(run)
+
+    async def get_pose_recording(self, session_id: int) -> Optional[bytes]:
+        def run(conn):
+            row = conn.execute("SELECT data FROM pose_recordings WHERE session_id = ?", (session_id,)).fetchone()
+            return row[0] if row else None
+        return await self.pool.run(run)
+
+    async def get_pose_analysis(self, session_id: int) -> Optional[Dict]:
+        def run(conn):
+            row = conn.execute("SELECT analysis FROM pose_recordings WHERE session_id = ?", (session_id,)).fetchone()
+            return json.loads(row[0]) if row and row[0] else None
+        return await self.pool.run(run)
+
+    async def save_pose_analysis(self, session_id: int, analysis: Dict):
+        def run(conn):
+            conn.execute("UPDATE pose_recordings SET analysis = ? WHERE session_id = ?", (json.dumps(analysis), session_id))
+        await self.pool.write(run)
+
+    async def list_pose_recordings(self, after_session_id: int = 0, limit: int = 100) -> List[Dict]:
+        def run(conn):
+            rows = conn.execute(
+                "SELECT session_id, info, data FROM pose_recordings WHERE session_id > ? ORDER BY session_id LIMIT ?",
+                (after_session_id, limit),
+            ).fetchall()
+            return [{"session_id": row[0], "info": json.loads(row[1]), "data": row[2]} for row in rows]
+        return await self.pool.run(run)
+
+    async def save_pose_stream(self, stream_id: str, info: Dict, data: bytes, analysis: Optional[Dict]):
+        def run(conn):
+            now = time.time()
+            # Streams whose session was never saved are dropped after a day
+            conn.execute("DELETE FROM pose_streams WHERE created_at < ?", (now - POSE_STREAM_RETENTION,))
+            conn.execute(
+                "INSERT OR REPLACE INTO pose_streams (stream_id, created_at, info, data, analysis) VALUES (?, ?, ?, ?, ?)",
+                (stream_id, now, json.dumps(info), data, json.dumps(analysis) if analysis is not None else None),
+            )
+        await self.pool.write(run)
+
+    async def attach_pose_stream(self, stream_id: str, session_id: int) -> Optional[Dict]:
+        def run(conn):
+            row = conn.execute(
+                "SELECT info, data, analysis FROM pose_streams WHERE stream_id = ?", (stream_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "INSERT OR REPLACE INTO pose_recordings (session_id, info, data, analysis) VALUES (?, ?, ?, ?)",
+                (session_id, *row),
+            )
+            conn.execute("DELETE FROM pose_streams WHERE stream_id = ?", (stream_id,))
+            return {"info": json.loads(row[0]), "analysis": json.loads(row[2]) if row[2] else None}
+        return await self.pool.write(run)
+
+    # Analysis jobs
+
+    async def save_analysis_job(self, job: Dict):
+        def run(conn):
+            # Jobs finished more than a day ago are dropped
+            conn.execute("DELETE FROM analysis_jobs WHERE finished_at < ?", (time.time() - ANALYSIS_JOB_RETENTION,))
+            conn.execute(
+                "INSERT INTO analysis_jobs (job_id, finished_at, data) VALUES (?, ?, ?) "
+                "ON CONFLICT (job_id) DO UPDATE SET finished_at = excluded.finished_at, data = excluded.data "
+                "WHERE analysis_jobs.finished_at IS NULL",
+                (job["job_id"], job.get("finished_at"), json.dumps(job)),
+            )
+        await self.pool.write(run)
+
+    async def get_analysis_job(self, job_id: str) -> Optional[Dict]:
+        def run(conn):
+            row = conn.execute("SELECT data FROM analysis_jobs WHERE job_id = ?", (job_id,)).fetchone()
+            return json.loads(row[0]) if row else None
+        return await self.pool.run(run)
+
+    async def cancel_analysis_job(self, job_id: str) -> Optional[Dict]:
+        def run(conn):
+            conn.execute(
+                "UPDATE analysis_jobs SET cancel_requested = 1 WHERE job_id = ? AND finished_at IS NULL", (job_id,)
+            )
+            row = conn.execute("SELECT data FROM analysis_jobs WHERE job_id = ?", (job_id,)).fetchone()
+            return json.loads(row[0]) if row else None
+        return await self.pool.write(run)
+
+    async def cancel_requested_analysis_jobs(self) -> List[str]:
+        def run(conn):
+            rows = conn.execute(
+                "SELECT job_id FROM analysis_jobs WHERE finished_at IS NULL AND cancel_requested = 1"
+            ).fetchall()
+            return [row[0] for row in rows]
+        return await self.pool.run(run)
+
+    # Meetings
+
+    async def add_meeting(self, meeting: Dict) -> Dict:
+        def run(conn):
+            cursor = conn.execute(
+                "INSERT INTO meetings (scheduled_date, data) VALUES (?, ?)",
+                (meeting.get("scheduled_date"), json.dumps(meeting)),
+            )
+            _bump(conn, "meetings")
+            return {**meeting, "id": cursor.lastrowid}
+        return await self.pool.write(run)
+
+    async def list_meetings(self) -> List[Dict]:
+        def run(conn):
+            rows = conn.execute("SELECT id, data FROM meetings ORDER BY id").fetchall()
+            return [{**json.loads(row[1]), "id": row[0]} for row in rows]
+        return await self.pool.run(run)
+
+    async def delete_meeting(self, meeting_id: int):
+        def run(conn):
+            conn.execute("DELETE FROM meetings WHERE id = ?", (meeting_id,))
+            _bump(conn, "meetings")
+        await self.pool.write(run)
+
+    # Generations
+
+    async def generation(self, collection: str) -> int:
+        def run(conn):
+            row = conn.execute("SELECT generation FROM generations WHERE collection = ?", (collection,)).fetchone()
+            return row[0] if row else 0
+        return await self.pool.run(run)
+
+
+def create_repository() -> Repository:
+    """Build the repository selected by STORAGE_BACKEND (sqlite or memory)"""
+    backend = os.getenv("STORAGE_BACKEND", "sqlite").lower()
+    if backend == "memory":
+        return InMemoryRepository()
+    if backend == "sqlite":
+        return SQLiteRepository(
+            os.getenv("PHYSIOLENS_DB", "physiolens.db"),
+            pool_size=int(os.getenv("PHYSIOLENS_DB_POOL_SIZE", "4")),
+        )
+    raise ValueError(f"Unknown STORAGE_BACKEND: {backend}")
+
+
+# Shared instance used by main.py
+storage = create_repository()
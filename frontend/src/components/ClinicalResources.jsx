@@ -1,40 +1,69 @@
-import { useState, useEffect } from 'react'
+import { useState, useEffect, useRef } from 'react'
 
 function ClinicalResources({ exerciseName }) {
     const [resources, setResources] = useState([])
     const [loading, setLoading] = useState(false)
     const [error, setError] = useState(null)
     const [loaded, setLoaded] = useState(false)
+    const abortRef = useRef(null)
 
-    // Reset state when exerciseName changes
+    // Reset state (and stop any search still streaming) when exerciseName changes
     useEffect(() => {
+        abortRef.current?.abort()
         setResources([])
         setLoaded(false)
         setError(null)
         setLoading(false)
     }, [exerciseName])
 
+    // Articles arrive as server-sent "resource" events while the search runs
     const fetchResources = async () => {
+        const controller = new AbortController()
+        abortRef.current = controller
         setLoading(true)
         setError(null)
+        setResources([])
         try {
-            const response = await fetch('http://localhost:8000/api/research/resources', {
+            const response = await fetch('http://localhost:8000/api/research/resources/stream', {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json',
                 },
-                body: JSON.stringify({ query: exerciseName })
+                body: JSON.stringify({ query: exerciseName }),
+                signal: controller.signal
             })
 
             if (!response.ok) throw new Error('Failed to fetch resources')
 
-            const data = await response.json()
-            setResources(data.resources || [])
+            const reader = response.body.getReader()
+            const decoder = new TextDecoder()
+            let buffer = ''
+            for (;;) {
+                const { done, value } = await reader.read()
+                if (done) break
+                buffer += decoder.decode(value, { stream: true })
+                const events = buffer.split('\n\n')
+                buffer = events.pop()
+                for (const block of events) {
+                    const event = block.match(/^event: (.*)$/m)?.[1]
+                    const data = block.match(/^data: (.*)$/m)?.[1]
+                    if (!data) continue
+                    if (event === 'resource') {
+                        const resource = JSON.parse(data)
+                        setResources(prev => [...prev, resource])
+                    } else if (event === 'error') {
+                        throw new Error(JSON.parse(data).detail || 'Failed to fetch resources')
+                    }
+                }
+            }
             setLoaded(true)
         } catch (err) {
-            setError(err.message)
+            if (err.name !== 'AbortError') setError(err.message)
         } finally {
-            setLoading(false)
+            if (abortRef.current === controller) {
+                abortRef.current = null
+                setLoading(false)
+            }
         }
     }
 
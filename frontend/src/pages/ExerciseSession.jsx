@@ -10,6 +10,7 @@ import { getExerciseConfig, getCameraType } from '../utils/exerciseConfigs'
 import { createRepCounter } from '../utils/repCounters'
 import { createFormAnalyzer } from '../utils/formAnalysis'
 import { checkUpperBodyFraming, checkFullBodyFraming } from '../utils/poseUtils'
+import { PoseFrameStream, uploadPoseFrames } from '../utils/poseFrames'
 import { useMeetingMode } from '../contexts/MeetingModeContext'
 import '../styles/ExerciseSession.css'
 
@@ -36,6 +37,7 @@ function ExerciseSession() {
   const recordedChunksRef = useRef([])
   const warningLogRef = useRef([])
   const poseDataLogRef = useRef([])
+  const poseStreamRef = useRef(null)
 
   const isLiveRef = useRef(false);
   const isRecordingRef = useRef(false);
@@ -285,10 +287,12 @@ function ExerciseSession() {
 
       // NEW: Record pose data if recording is enabled
       if (isRecordingRef.current && isLiveRef.current) {
-        poseDataLogRef.current.push({
+        const frame = {
           timestamp: timerValueRef.current,
           landmarks: results.poseLandmarks
-        })
+        }
+        poseDataLogRef.current.push(frame)
+        poseStreamRef.current?.push(frame)
       }
 
       // 1. Check Camera Positioning
@@ -428,7 +432,8 @@ function ExerciseSession() {
             const warningEvent = {
               timestamp: timerValueRef.current,
               message: warning.message,
-              severity: warning.severity
+              severity: warning.severity,
+              type: warning.type
             };
             warningLogRef.current.push(warningEvent);
             console.log(`⚠️ Warning logged:`, warning.message);
@@ -523,6 +528,7 @@ function ExerciseSession() {
 
       recorder.start(1000)
       mediaRecorderRef.current = recorder
+      poseStreamRef.current = new PoseFrameStream(parseInt(exerciseId))
       setMediaRecorder(recorder)
 
       console.log('🎥 Recording started')
@@ -568,6 +574,10 @@ function ExerciseSession() {
       existingSessions.push(sessionData)
       localStorage.setItem('recordedSessions', JSON.stringify(existingSessions))
 
+      // End the live pose stream first so the backend can attach it to the session
+      const poseStreamId = poseStreamRef.current ? await poseStreamRef.current.finish() : null
+      poseStreamRef.current = null
+
       const response = await fetch('http://localhost:8000/save-recording-session', {
         method: 'POST',
         headers: {
@@ -580,12 +590,23 @@ function ExerciseSession() {
           duration: timerValueRef.current,
           rep_count: repCountValueRef.current,
           target_reps: targetReps,
-          warnings: warningLogRef.current
+          warnings: warningLogRef.current,
+          pose_stream_id: poseStreamId
         })
       })
 
       if (response.ok) {
         console.log('✅ Session saved to backend')
+        const { session_id, analysis } = await response.json()
+        if (analysis) {
+          console.log('🦴 Pose frames streamed and analyzed:', analysis.totalIssues, 'issues')
+        } else {
+          // Stream unavailable - upload the whole recording instead
+          const upload = await uploadPoseFrames(session_id, poseDataLogRef.current, parseInt(exerciseId), timerValueRef.current)
+          if (upload) {
+            console.log('🦴 Pose frames uploaded:', upload.uploaded_bytes, 'bytes')
+          }
+        }
       }
 
       console.log('🎉 Session recorded and saved successfully!')
@@ -0,0 +1,153 @@
+/**
+ * Packed Pose Frame Encoding
+ * Binary upload format for recorded landmarks (see backend/services/pose_frames.py)
+ */
+
+const MAGIC = [0x50, 0x4c, 0x50, 0x46] // "PLPF"
+const VERSION = 1
+const HEADER_SIZE = 24
+const LANDMARK_COUNT = 33
+const CHANNELS = 4
+const FLAG_TIMESTAMPS = 0x01
+
+/**
+ * Pack recorded pose frames as little-endian float32
+ * @param {Array} poseData - Array of {timestamp, landmarks} objects
+ * @param {number} exerciseId - Exercise the recording belongs to
+ * @param {number} fps - Capture rate
+ * @returns {ArrayBuffer} Header, per-frame timestamps, then frames x 33 x (x, y, z, visibility)
+ */
+export function encodePoseFrames(poseData, exerciseId, fps) {
+  const frames = poseData.length
+  const buffer = new ArrayBuffer(HEADER_SIZE + frames * 4 + frames * LANDMARK_COUNT * CHANNELS * 4)
+  const view = new DataView(buffer)
+
+  MAGIC.forEach((byte, i) => view.setUint8(i, byte))
+  view.setUint8(4, VERSION)
+  view.setUint8(5, 32)
+  view.setUint8(6, LANDMARK_COUNT)
+  view.setUint8(7, CHANNELS)
+  view.setUint8(8, FLAG_TIMESTAMPS)
+  view.setFloat32(12, fps, true)
+  view.setUint32(16, exerciseId, true)
+  view.setUint32(20, frames, true)
+
+  let offset = HEADER_SIZE
+  for (const frame of poseData) {
+    view.setFloat32(offset, frame.timestamp, true)
+    offset += 4
+  }
+
+  for (const frame of poseData) {
+    for (let i = 0; i < LANDMARK_COUNT; i++) {
+      const landmark = frame.landmarks?.[i]
+      view.setFloat32(offset, landmark ? landmark.x : NaN, true)
+      view.setFloat32(offset + 4, landmark ? landmark.y : NaN, true)
+      view.setFloat32(offset + 8, landmark ? landmark.z : NaN, true)
+      view.setFloat32(offset + 12, landmark?.visibility ?? NaN, true)
+      offset += 16
+    }
+  }
+
+  return buffer
+}
+
+/**
+ * Upload recorded pose frames for a saved session (gzip-compressed when supported)
+ * @param {number} sessionId - Backend session ID
+ * @param {Array} poseData - Array of {timestamp, landmarks} objects
+ * @param {number} exerciseId - Exercise ID
+ * @param {number} duration - Recording duration in seconds
+ */
+export async function uploadPoseFrames(sessionId, poseData, exerciseId, duration) {
+  if (!poseData.length) return null
+
+  const fps = duration > 0 ? poseData.length / duration : 30
+  let body = new Blob([encodePoseFrames(poseData, exerciseId, fps)])
+  if (typeof CompressionStream !== 'undefined') {
+    body = await new Response(body.stream().pipeThrough(new CompressionStream('gzip'))).blob()
+  }
+
+  const response = await fetch(`http://localhost:8000/recorded-sessions/${sessionId}/pose-frames`, {
+    method: 'POST',
+    headers: {
+      'Content-Type': 'application/octet-stream',
+    },
+    body
+  })
+
+  return response.ok ? response.json() : null
+}
+
+/**
+ * Streams pose frames to the backend while the session is recorded
+ * Frames are sent in small batches over a WebSocket; finish() ends the stream
+ * and returns the stream ID to pass to /save-recording-session
+ */
+export class PoseFrameStream {
+  constructor(exerciseId, fps = 30, batchSize = 30) {
+    this.exerciseId = exerciseId
+    this.fps = fps
+    this.batchSize = batchSize
+    this.batch = []
+    this.streamId = null
+    this.failed = false
+    this.finalized = null
+
+    this.socket = new WebSocket(`ws://localhost:8000/ws/pose-stream?exercise_id=${exerciseId}&fps=${fps}`)
+    this.socket.binaryType = 'arraybuffer'
+    this.ready = new Promise((resolve) => {
+      this.socket.onmessage = (event) => {
+        const message = JSON.parse(event.data)
+        if (message.type === 'ready') {
+          this.streamId = message.stream_id
+          resolve(true)
+        } else if (message.type === 'finalized') {
+          this.finalized?.(message)
+        } else if (message.type === 'error') {
+          console.error('❌ Pose stream error:', message.detail)
+          this.failed = true
+        }
+      }
+      this.socket.onerror = () => {
+        this.failed = true
+        resolve(false)
+      }
+      this.socket.onclose = () => {
+        this.failed = true
+        this.finalized?.(null)
+        resolve(false)
+      }
+    })
+  }
+
+  /**
+   * Queue one {timestamp, landmarks} frame, sending a batch when full
+   */
+  push(frame) {
+    this.batch.push(frame)
+    if (this.batch.length >= this.batchSize) {
+      this.flush()
+    }
+  }
+
+  flush() {
+    if (!this.batch.length || this.failed || this.socket.readyState !== WebSocket.OPEN) return
+    this.socket.send(encodePoseFrames(this.batch, this.exerciseId, this.fps))
+    this.batch = []
+  }
+
+  /**
+   * Send remaining frames and end the stream
+   * @returns {string|null} Stream ID once the backend has stored the recording, or null on failure
+   */
+  async finish() {
+    if (!(await this.ready) || this.failed || this.socket.readyState !== WebSocket.OPEN) return null
+
+    this.flush()
+    const finalized = new Promise((resolve) => { this.finalized = resolve })
+    this.socket.send(JSON.stringify({ type: 'end' }))
+    const message = await finalized
+    return message ? message.stream_id : null
+  }
+}